@@ -1,7 +1,7 @@
 # article/admin.py
 from django.contrib import admin
-from .models import Article, ArticleTranslation
-from django.db.models import Count, Q
+from .models import Article, ArticleTranslation, TranslationJob, TranslationMemory
+from . import search, digest_cache, facets
 from django.contrib.admin.helpers import ActionForm
 from django import forms
 from taggit.models import Tag, TaggedItem
@@ -25,9 +25,7 @@ class TagListFilter(admin.SimpleListFilter):
 
         # Get only the tags that are used for this model
         tag_ids = TaggedItem.objects.filter(content_type=content_type).values_list('tag_id', flat=True)
-        tags = Tag.objects.filter(id__in=tag_ids)
-
-        return [(tag.id, tag.name) for tag in tags]
+        return list(Tag.objects.filter(id__in=tag_ids).values_list('id', 'name'))
 
     def queryset(self, request, queryset):
         if self.value():
@@ -35,6 +33,11 @@ class TagListFilter(admin.SimpleListFilter):
         return queryset
 
 
+def _is_changelist(request) -> bool:
+    match = request.resolver_match
+    return bool(match and match.url_name and match.url_name.endswith("_changelist"))
+
+
 class ArticleTranslationInline(admin.StackedInline):
     model = ArticleTranslation
     extra = 0
@@ -52,30 +55,54 @@ class ArticleAdmin(admin.ModelAdmin):
 
     # --- Actions ---
 
-    
-    # show counts efficiently
+    # keep the search index in step with admin edits
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        search.index_article(obj)
+
+    def save_formset(self, request, form, formset, change):
+        super().save_formset(request, form, formset, change)
+        for tr in ArticleTranslation.objects.filter(article=form.instance):
+            search.index_translation(tr)
+
+    # admin edits may move dates or change tags -> rebuild every cached digest + sidebar
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        digest_cache.invalidate()
+        facets.invalidate()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        digest_cache.invalidate()
+        facets.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        digest_cache.invalidate()
+        facets.invalidate()
+
+    # translation flags come from the ArticleListing read model: one join, no counts.
+    # The changelist only shows titles, so bodies are deferred there.
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(
-            cnt_ja=Count("translations", filter=Q(translations__language="ja"), distinct=True),
-            cnt_zh=Count("translations", filter=Q(translations__language="zh"), distinct=True),
-            cnt_en=Count("translations", filter=Q(translations__language="en"), distinct=True),
-        )
+        qs = super().get_queryset(request).select_related("listing")
+        return qs.listing() if _is_changelist(request) else qs
+
+    @staticmethod
+    def _has(obj, lang):
+        row = getattr(obj, "listing", None)
+        return "-" if obj.language == lang else int(bool(row and getattr(row, f"has_{lang}")))
 
-    @admin.display(description="JA", ordering="cnt_ja")
+    @admin.display(description="JA", ordering="listing__has_ja")
     def col_ja(self, obj):
-        from builtins import int as _int
-        return "-" if obj.language == "ja" else _int(getattr(obj, "cnt_ja", 0) or 0)
+        return self._has(obj, "ja")
 
-    @admin.display(description="ZH", ordering="cnt_zh")
+    @admin.display(description="ZH", ordering="listing__has_zh")
     def col_zh(self, obj):
-        from builtins import int as _int
-        return "-" if obj.language == "zh" else _int(getattr(obj, "cnt_zh", 0) or 0)
+        return self._has(obj, "zh")
 
-    @admin.display(description="EN", ordering="cnt_en")
+    @admin.display(description="EN", ordering="listing__has_en")
     def col_en(self, obj):
-        from builtins import int as _int
-        return "-" if obj.language == "en" else _int(getattr(obj, "cnt_en", 0) or 0)
+        return self._has(obj, "en")
 
 
 @admin.register(ArticleTranslation)
@@ -84,5 +111,37 @@ class ArticleTranslationAdmin(admin.ModelAdmin):
     list_filter = ("language", "updated")
     search_fields = ("article__title", "title_translated", "text_translated")
     ordering = ("-updated",)
-    
+    list_select_related = ("article",)
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if _is_changelist(request):
+            qs = qs.listing().defer("article__text", "article__search_vector")
+        return qs
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        search.index_translation(obj)
+
+
+@admin.register(TranslationJob)
+class TranslationJobAdmin(admin.ModelAdmin):
+    list_display = ("article", "language", "status", "attempts", "updated")
+    list_filter = ("status", "language")
+    ordering = ("-updated",)
+    raw_id_fields = ("article",)
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        n = queryset.update(status="pending", attempts=0, error="", run_after=timezone.now())
+        self.message_user(request, f"{n} job(s) re-queued.")
+
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(admin.ModelAdmin):
+    list_display = ("source_text", "translated", "language", "provider", "hits", "last_used")
+    list_filter = ("language", "provider")
+    search_fields = ("source_text", "translated")
+    ordering = ("-last_used",)
@@ -0,0 +1,245 @@
+# article/api.py
+"""
+Read-only JSON API for internal tools and the clipper.
+
+    GET api/articles/             list: ?q= ?tag= ?period= as on the HTML list,
+                                  ?lang=en,zh picks the title languages,
+                                  keyset pages via ?cursor= (see article/pagination.py)
+    GET api/articles/<id>/        one article with body + translations in ?lang=
+    GET api/changes/?since=<ISO>  articles created/updated after `since` (the article,
+                                  a translation or its tags), oldest change first;
+                                  at-least-once, see changes()
+    GET api/changelog/?after=<seq>  change log entries after seq N, for replicas
+                                  (see article/changelog.py)
+
+Every response carries a strong ETag (sha1 of the body) and Last-Modified
+(newest Article.updated in it; translation writes and tag changes bump the
+article's `updated`, see the receivers at the bottom), so a client
+repeating a request with If-None-Match / If-Modified-Since gets an empty 304
+until something it would see has changed. Language comes from the query
+string only, never the session, so responses don't vary on Cookie.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from taggit.models import TaggedItem
+
+from . import changelog
+from .listing import LANGS
+from .models import Article
+from .pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .views import filter_articles
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _langs(request):
+    """?lang=en,zh -> ['en', 'zh'] (unknown codes dropped); all languages by default."""
+    asked = [l for l in request.GET.get("lang", "").split(",") if l in LANGS]
+    return asked or list(LANGS)
+
+
+def _page_size(request):
+    try:
+        return max(1, min(int(request.GET.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+
+
+def _json_response(request, data, last_modified=None):
+    """JSON with a strong body ETag + Last-Modified; 304 when the client's copy is current."""
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+    response = HttpResponse(body, content_type="application/json")
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    response["ETag"] = etag
+    timestamp = None
+    if last_modified is not None:
+        timestamp = int(last_modified.timestamp())
+        response["Last-Modified"] = http_date(timestamp)
+    # cacheable, but revalidated on every use
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=etag, last_modified=timestamp, response=response)
+
+
+def _annotated(queryset):
+    """Tag names, in the same query as the articles."""
+    ct = ContentType.objects.get_for_model(Article)
+    return queryset.annotate(
+        tag_names=ArraySubquery(
+            TaggedItem.objects.filter(content_type=ct, object_id=OuterRef("pk"))
+            .order_by("tag__name").values("tag__name")
+        ),
+    )
+
+
+def _summary(article, langs) -> dict:
+    row = getattr(article, "listing", None)
+    return {
+        "id": article.id,
+        "url": article.url,
+        "detail_url": article.get_absolute_url(),
+        "publish": article.publish,
+        "created": article.created,
+        "updated": article.updated,
+        "tags": article.tag_names,
+        "languages": [l for l in LANGS if l == "ja" or (row and getattr(row, f"has_{l}"))],
+        "titles": {l: row.title_for(l) if row else article.title for l in langs},
+        "excerpt": article.excerpt,
+    }
+
+
+def _page_data(page, rows, langs) -> dict:
+    return {
+        "results": [_summary(a, langs) for a in rows],
+        "next": page.next_cursor,
+        "previous": page.prev_cursor,
+    }
+
+
+@require_safe
+def article_list(request):
+    langs = _langs(request)
+    queryset = filter_articles(
+        _annotated(Article.objects.listing().select_related("listing")), request.GET
+    )
+    ordering = ["-publish", "-created"]
+    if "rank" in queryset.query.annotations:
+        ordering.insert(0, "-rank")
+    page = KeysetPaginator(queryset, _page_size(request), ordering).page(request.GET.get("cursor"))
+    rows = page.object_list
+    last_modified = max((a.updated for a in rows), default=None)
+    return _json_response(request, _page_data(page, rows, langs), last_modified)
+
+
+@require_safe
+def article_detail(request, pk):
+    langs = _langs(request)
+    article = (
+        _annotated(Article.objects.defer("text_plain", "search_vector").select_related("listing"))
+        .filter(pk=pk).first()
+    )
+    if article is None:
+        raise Http404("No article found matching the query")
+
+    data = _summary(article, langs)
+    data["translations"] = {}
+    if "ja" in langs:
+        data["translations"]["ja"] = {"title": article.title, "text": article.text, "updated": article.updated}
+    translations = (
+        article.translations.filter(language__in=[l for l in langs if l != "ja"])
+        .defer("text_plain", "search_vector")
+    )
+    for tr in translations:
+        data["translations"][tr.language] = {
+            "title": tr.title_translated or article.title,
+            "text": tr.text_translated,
+            "updated": tr.updated,
+        }
+    return _json_response(request, data, article.updated)
+
+
+@require_safe
+def changes(request):
+    """
+    Changefeed: ?since=<ISO datetime or date> (or a ?cursor= from a previous
+    response). Ordered by change time then id; "next" is always set to the
+    position after the last row, so a poller just keeps following it.
+
+    Article.updated is stamped before the writing transaction commits, so a
+    row can become visible after a poller has already paged past its
+    timestamp. To catch those, a request with a cursor also re-reads the
+    API_CHANGES_OVERLAP_SECONDS before the cursor (at most MAX_PAGE_SIZE
+    rows, newest kept) and returns them ahead of the page. Rows are
+    therefore sent more than once, and clients upsert by id. A write whose
+    transaction stays open longer than the overlap can still be missed.
+    Replicas that need every change in commit order should follow
+    api/changelog/ instead.
+    """
+    cursor = request.GET.get("cursor")
+    raw_since = request.GET.get("since")
+    if cursor and not raw_since:
+        # the cursor's change time bounds the scan the same way ?since= does
+        try:
+            raw_since = decode_cursor(cursor)[1][0]
+        except (InvalidCursor, IndexError):
+            return HttpResponseBadRequest("invalid cursor")
+    if not raw_since:
+        return HttpResponseBadRequest("since or cursor is required")
+    try:
+        since = parse_datetime(raw_since)
+        if since is None and parse_date(raw_since):
+            since = parse_datetime(raw_since + "T00:00:00")
+    except (ValueError, TypeError):
+        since = None
+    if since is None:
+        return HttpResponseBadRequest("since: expected an ISO 8601 date or datetime")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+
+    langs = _langs(request)
+    # Article.updated is the article's change time (translations and tags included): one index range
+    base = _annotated(Article.objects.listing().select_related("listing"))
+
+    paginator = KeysetPaginator(base.filter(updated__gte=since), _page_size(request), ["updated"])
+    page = paginator.page(cursor)
+    rows = fresh = page.object_list
+    overlap = timedelta(seconds=getattr(settings, "API_CHANGES_OVERLAP_SECONDS", 60))
+    if cursor and overlap:
+        # late commits behind the cursor (see docstring); a bounded range on the same index
+        late = (
+            base.filter(updated__gte=since - overlap, updated__lte=since)
+            .exclude(pk__in=[a.pk for a in rows])
+            .order_by("-updated", "-id")[:MAX_PAGE_SIZE]
+        )
+        rows = list(late)[::-1] + rows
+    data = _page_data(page, rows, langs)
+    data["previous"] = None  # forward only: the feed is read oldest to newest
+    if fresh:
+        data["next"] = encode_cursor([fresh[-1].updated, fresh[-1].id], "n")
+    else:
+        data["next"] = cursor or encode_cursor([since, 0], "n")
+    last_modified = max((a.updated for a in rows), default=None)
+    return _json_response(request, data, last_modified)
+
+
+@require_safe
+def changelog_feed(request):
+    """Entries with seq > ?after= (default 0); "next" is the seq to pass as ?after= next time."""
+    try:
+        after = int(request.GET.get("after", 0))
+        limit = max(1, min(int(request.GET.get("limit", changelog.PAGE_SIZE)), changelog.PAGE_SIZE))
+    except ValueError:
+        return HttpResponseBadRequest("after and limit must be integers")
+    entries = changelog.page(after, limit)
+    data = {"results": entries, "next": entries[-1]["seq"] if entries else after}
+    return _json_response(request, data, max((e["at"] for e in entries), default=None))
+
+
+def touch(*article_ids) -> None:
+    """Mark articles as changed now (bulk translation writes send no signals)."""
+    if article_ids:
+        Article.objects.filter(pk__in=article_ids).update(updated=timezone.now())
+
+
+# signal receivers (connected in ArticleConfig.ready): translation writes and tag changes count as updates
+def translation_changed(sender, instance, **kwargs):
+    touch(instance.article_id)
+
+
+def tags_changed(sender, instance, **kwargs):
+    if kwargs.get("action", "").startswith("post_") and isinstance(instance, Article):
+        touch(instance.pk)
@@ -4,3 +4,59 @@ from django.apps import AppConfig
 class ArticleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'article'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import m2m_changed, post_delete, post_save
+        from taggit.models import Tag
+        from . import api, changelog, digest_cache, facets, listing, page_cache, perf
+        from .models import Article, ArticleTranslation
+
+        # tag renames/deletes (taggit admin) change the sidebar
+        post_save.connect(facets.invalidate, sender=Tag, dispatch_uid="article_facets_tag_save")
+        post_delete.connect(facets.invalidate, sender=Tag, dispatch_uid="article_facets_tag_delete")
+
+        # any write to an article, its translations or tags purges the cached pages showing it
+        post_save.connect(page_cache.article_changed, sender=Article, dispatch_uid="article_page_save")
+        post_delete.connect(page_cache.article_changed, sender=Article, dispatch_uid="article_page_delete")
+        post_save.connect(page_cache.translation_changed, sender=ArticleTranslation,
+                          dispatch_uid="article_page_tr_save")
+        post_delete.connect(page_cache.translation_changed, sender=ArticleTranslation,
+                            dispatch_uid="article_page_tr_delete")
+        m2m_changed.connect(page_cache.tags_changed, sender=Article.tags.through,
+                            dispatch_uid="article_page_tags")
+        post_save.connect(page_cache.tag_changed, sender=Tag, dispatch_uid="article_page_tag_save")
+        post_delete.connect(page_cache.tag_changed, sender=Tag, dispatch_uid="article_page_tag_delete")
+
+        # weekly digests of the article's date (ingest also invalidates explicitly)
+        post_save.connect(digest_cache.article_changed, sender=Article, dispatch_uid="article_digest_save")
+        post_delete.connect(digest_cache.article_changed, sender=Article, dispatch_uid="article_digest_delete")
+        m2m_changed.connect(digest_cache.tags_changed, sender=Article.tags.through,
+                            dispatch_uid="article_digest_tags")
+
+        # ArticleListing read model
+        post_save.connect(listing.article_saved, sender=Article, dispatch_uid="article_listing_save")
+        post_save.connect(listing.translation_saved, sender=ArticleTranslation,
+                          dispatch_uid="article_listing_tr_save")
+        post_delete.connect(listing.translation_deleted, sender=ArticleTranslation,
+                            dispatch_uid="article_listing_tr_delete")
+
+        # Article.updated also moves when translations or tags change (API changefeed)
+        post_save.connect(api.translation_changed, sender=ArticleTranslation, dispatch_uid="article_api_tr_save")
+        post_delete.connect(api.translation_changed, sender=ArticleTranslation,
+                            dispatch_uid="article_api_tr_delete")
+        m2m_changed.connect(api.tags_changed, sender=Article.tags.through,
+                            dispatch_uid="article_api_tags")
+
+        # append-only change log for replicas (article/changelog.py)
+        post_save.connect(changelog.article_saved, sender=Article, dispatch_uid="article_changelog_save")
+        post_delete.connect(changelog.article_deleted, sender=Article, dispatch_uid="article_changelog_delete")
+        post_save.connect(changelog.translation_saved, sender=ArticleTranslation,
+                          dispatch_uid="article_changelog_tr_save")
+        post_delete.connect(changelog.translation_deleted, sender=ArticleTranslation,
+                            dispatch_uid="article_changelog_tr_delete")
+        m2m_changed.connect(changelog.tags_changed, sender=Article.tags.through,
+                            dispatch_uid="article_changelog_tags")
+
+        # per-request query count/time for article.perf.PerfMiddleware
+        connection_created.connect(perf.install, dispatch_uid="article_perf_install")
@@ -0,0 +1,91 @@
+# article/bench.py
+"""
+In-process request timing for the benchmark commands.
+
+Requests go through the full middleware stack with Django's test Client
+(no network, no server), and after each one the request_finished cleanup a
+real server runs is replayed, so a non-pooled connection is really closed
+and reopened and a pooled one goes back to its pool.
+"""
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.test import Client
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))   # ceil
+    return ordered[int(rank) - 1]
+
+
+def summarize(timings_ms, queries=None) -> dict:
+    out = {
+        "requests": len(timings_ms),
+        "mean_ms": round(statistics.fmean(timings_ms), 2),
+        "p50_ms": round(percentile(timings_ms, 50), 2),
+        "p95_ms": round(percentile(timings_ms, 95), 2),
+        "max_ms": round(max(timings_ms), 2),
+    }
+    if queries:
+        out["queries_p50"] = percentile(queries, 50)
+        out["queries_max"] = max(queries)
+    return out
+
+
+class _Client(Client):
+    """Sends every request over HTTPS, so SECURE_SSL_REDIRECT doesn't answer with a 301."""
+    def generic(self, *args, **kwargs):
+        kwargs["secure"] = True
+        return super().generic(*args, **kwargs)
+
+
+def client() -> Client:
+    """A Client whose Host header passes ALLOWED_HOSTS and whose requests are HTTPS."""
+    host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+    return _Client(HTTP_HOST=host)
+
+
+def time_requests(send, n: int, warmup: int = 0, queries: list | None = None) -> list[float]:
+    """
+    Call send(i) -> response for i in range(warmup + n); returns the
+    wall time of the last n in milliseconds. Any status >= 300 raises.
+    With a `queries` list, the default-database query count of each timed
+    request is appended to it.
+    """
+    timings = []
+    count = [0]
+
+    def counter(execute, sql, params, many, context):
+        count[0] += 1
+        return execute(sql, params, many, context)
+
+    # an execute wrapper, not CaptureQueriesContext: that one connects before the clock starts
+    with connection.execute_wrapper(counter):
+        for i in range(warmup + n):
+            count[0] = 0
+            start = time.perf_counter()
+            response = send(i)
+            b"".join(response) if response.streaming else response.content
+            close_old_connections()     # what request_finished does under gunicorn
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 300:
+                raise RuntimeError(f"request {i} failed with {response.status_code}")
+            if i >= warmup:
+                timings.append(elapsed)
+                if queries is not None:
+                    queries.append(count[0])
+    return timings
+
+
+def reingest_payload(article) -> str:
+    """receive_article body for an existing article: token check + dedup lookup, no write."""
+    p = article.publish
+    return json.dumps({
+        "title": article.title, "url": article.url, "publish": f"{p.year}/{p.month}/{p.day}",
+        "text": "", "secret_token": settings.ARTICLE_SECRET_TOKEN,
+    })
@@ -0,0 +1,70 @@
+# article/canonical.py
+"""
+Canonical identity of a clipped article, used for ingest dedup.
+
+Nikkei articles are keyed by their article ID ("nikkei:DGXZQO..."), taken
+from the same places derive_nikkei_translation_urls looks at: the ng=
+query param, /article/<ID>/ in the path, or a DGXZ... token anywhere.
+Other URLs fall back to a hash of the normalized URL ("url:<sha1>").
+"""
+import hashlib
+import re
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlparse, urlunparse
+
+# query params that never change which article a URL points to
+TRACKING_PARAMS = {"fbclid", "gclid", "n_cid", "ref"}
+
+
+def nikkei_article_id(url: str) -> str | None:
+    """Nikkei article ID from an article/translation URL, or None."""
+    if not url:
+        return None
+    try:
+        u = urlparse(url)
+    except Exception:
+        return None
+
+    if not u.netloc.endswith("nikkei.com"):
+        return None
+
+    # 1) from query ?ng=ID (already a translation link or similar)
+    qs = parse_qs(u.query or "")
+    article_id = qs.get("ng", [None])[0]
+
+    # 2) from path /article/<ID>/
+    if not article_id:
+        m = re.search(r"/article/([A-Z0-9]+)/?", u.path or "")
+        if m:
+            article_id = m.group(1)
+
+    # 3) last fallback: look for DGXZ*-style ID anywhere
+    if not article_id:
+        m = re.search(r"(DGXZ[A-Z0-9]+)", url)
+        if m:
+            article_id = m.group(1)
+
+    return article_id or None
+
+
+def normalize_url(url: str) -> str:
+    """Lowercase scheme/host, drop www., fragment, tracking params and trailing slash; sort the query."""
+    u = urlparse(url.strip())
+    host = (u.hostname or "").lower().removeprefix("www.")
+    if u.port and u.port not in (80, 443):
+        host = f"{host}:{u.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(u.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    path = u.path.rstrip("/") or "/"
+    return urlunparse(("https" if u.scheme in ("http", "https") else u.scheme, host, path, "", urlencode(query), ""))
+
+
+def canonical_key(url: str) -> str | None:
+    """'nikkei:<ID>', 'url:<sha1 of normalized url>', or None without a URL."""
+    if not (url or "").strip():
+        return None
+    article_id = nikkei_article_id(url)
+    if article_id:
+        return f"nikkei:{article_id}"
+    return "url:" + hashlib.sha1(normalize_url(url).encode()).hexdigest()
@@ -0,0 +1,157 @@
+# article/changelog.py
+"""
+Append-only change log for downstream replicas (reporting DB, mirror site).
+
+Every insert/update/delete of an Article or ArticleTranslation and every
+change to an article's tags appends a ChangeLogEntry. Model saves and
+m2m changes are picked up by signals (see ArticleConfig.ready); bulk
+writes that bypass signals call record() themselves.
+
+A replica keeps the last seq it applied and asks for the entries after it
+(api/changelog/?after=N, or `manage.py dump_changes --since N`), so a sync
+costs time proportional to what changed, not to the archive size. Entries
+carry the row's current state, fetched in a few batched queries per page;
+when an object appears several times in one page only its last entry
+carries the data.
+
+Ordering: writers take a transaction-level advisory lock before they
+append, so sequence numbers are handed out in commit order and a reader
+can never see seq N+1 before seq N has committed (or rolled back).
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import connection, transaction
+from django.db.models import OuterRef
+
+from taggit.models import TaggedItem
+
+from .models import Article, ArticleTranslation, ChangeLogEntry
+
+LOCK_KEY = 0x61727469636c65    # pg_advisory_xact_lock key shared by all writers
+PAGE_SIZE = 500
+
+
+def record(model: str, action: str, pairs) -> None:
+    """Append one entry per (object_id, article_id) pair."""
+    pairs = [(o, a) for o, a in pairs if o is not None]
+    if not pairs:
+        return
+    with transaction.atomic(savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [LOCK_KEY])
+        ChangeLogEntry.objects.bulk_create([
+            ChangeLogEntry(model=model, action=action, object_id=object_id, article_id=article_id)
+            for object_id, article_id in pairs
+        ])
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def _article_data(ids) -> dict:
+    ct = ContentType.objects.get_for_model(Article)
+    rows = (
+        Article.objects.filter(id__in=ids)
+        .defer("text_plain", "search_vector")
+        .annotate(tag_names=ArraySubquery(
+            TaggedItem.objects.filter(content_type=ct, object_id=OuterRef("pk"))
+            .order_by("tag__name").values("tag__name")
+        ))
+    )
+    return {
+        a.id: {
+            "id": a.id, "title": a.title, "slug": a.slug, "language": a.language, "url": a.url,
+            "publish": a.publish, "created": a.created, "updated": a.updated,
+            "text": a.text, "tags": a.tag_names,
+        }
+        for a in rows
+    }
+
+
+def _translation_data(ids) -> dict:
+    rows = ArticleTranslation.objects.filter(id__in=ids).defer("text_plain", "search_vector")
+    return {
+        tr.id: {
+            "id": tr.id, "article_id": tr.article_id, "language": tr.language,
+            "title": tr.title_translated, "text": tr.text_translated,
+            "created": tr.created, "updated": tr.updated,
+        }
+        for tr in rows
+    }
+
+
+def _tag_data(article_ids) -> dict:
+    ct = ContentType.objects.get_for_model(Article)
+    tags = {}
+    for object_id, name in (
+        TaggedItem.objects.filter(content_type=ct, object_id__in=article_ids)
+        .order_by("tag__name").values_list("object_id", "tag__name")
+    ):
+        tags.setdefault(object_id, []).append(name)
+    return {i: {"tags": tags.get(i, [])} for i in article_ids}
+
+
+_LOADERS = {"article": _article_data, "translation": _translation_data, "tags": _tag_data}
+
+
+def serialize(entries) -> list[dict]:
+    """
+    Entries as dicts with the current state of their object under "data"
+    (None for deletes, objects gone since, and all but the last entry of an
+    object within this batch). At most one query per model.
+    """
+    last = {}
+    for e in entries:
+        last[(e.model, e.object_id)] = e.seq
+    wanted = {}
+    for (model, object_id), _ in last.items():
+        wanted.setdefault(model, set()).add(object_id)
+    state = {model: _LOADERS[model](ids) for model, ids in wanted.items()}
+
+    out = []
+    for e in entries:
+        data = None
+        if e.action != "delete" and last[(e.model, e.object_id)] == e.seq:
+            data = state[e.model].get(e.object_id)
+        out.append({
+            "seq": e.seq, "at": e.at, "model": e.model, "action": e.action,
+            "object_id": e.object_id, "article_id": e.article_id, "data": data,
+        })
+    return out
+
+
+def page(after: int = 0, limit: int = PAGE_SIZE) -> list[dict]:
+    """Up to `limit` serialized entries with seq > after (primary-key range scan)."""
+    return serialize(list(ChangeLogEntry.objects.filter(seq__gt=after).order_by("seq")[:limit]))
+
+
+def iter_changes(after: int = 0, chunk_size: int = PAGE_SIZE):
+    """All serialized entries with seq > after, read page by page."""
+    while True:
+        batch = page(after, chunk_size)
+        if not batch:
+            return
+        yield from batch
+        after = batch[-1]["seq"]
+
+
+# signal receivers (connected in ArticleConfig.ready)
+def article_saved(sender, instance, created, **kwargs):
+    record("article", "insert" if created else "update", [(instance.pk, instance.pk)])
+
+
+def article_deleted(sender, instance, **kwargs):
+    record("article", "delete", [(instance.pk, instance.pk)])
+
+
+def translation_saved(sender, instance, created, **kwargs):
+    record("translation", "insert" if created else "update", [(instance.pk, instance.article_id)])
+
+
+def translation_deleted(sender, instance, **kwargs):
+    record("translation", "delete", [(instance.pk, instance.article_id)])
+
+
+def tags_changed(sender, instance, **kwargs):
+    if kwargs.get("action", "").startswith("post_") and isinstance(instance, Article):
+        record("tags", "update", [(instance.pk, instance.pk)])
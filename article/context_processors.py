@@ -1,7 +1,8 @@
+from .lang import get_lang
+
+
 def active_lang(request):
-    lang = request.session.get("lang", "ja").lower()
-    if lang in {"cn", "zh-cn", "zh-hans"}:
-        lang = "zh"
+    lang = get_lang(request)
 
     # fi: flag-icons country code (jp, cn, us)
     flags = [
@@ -0,0 +1,165 @@
+# article/digest.py
+"""
+Weekly digest: JA articles of a date window grouped by tag.
+
+One data model (DigestSection / DigestItem) is built here and shared by the
+HTML page and every export format in article/exports.py, so the grouping
+rules (tag order, excluded tags, newest first, title/excerpt/link choice)
+live in exactly one place.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Case, IntegerField, Value, When
+
+from taggit.models import Tag
+
+from .canonical import nikkei_article_id
+from .models import Article
+from .text import clean_title, excerpt_ja
+
+EXCLUDED_TAGS = {"unknown", "unknow"}   # case-insensitive
+
+
+@dataclass
+class DigestItem:
+    article_id: int
+    publish: date
+    title: str
+    excerpt: str
+    url: str
+    url_en: str | None = None
+    url_zh: str | None = None
+
+
+@dataclass
+class DigestSection:
+    tag_name: str
+    articles: list[DigestItem] = field(default_factory=list)
+    truncated: bool = False     # the row cap was hit inside this section (always the last one)
+
+
+def derive_nikkei_translation_urls(url: str):
+    """
+    Build Nikkei translation URLs from the original article URL.
+    Returns (en_url, zh_url) or (None, None) if not recognized.
+    """
+    article_id = nikkei_article_id(url)
+    if not article_id:
+        return (None, None)
+
+    base = f"https://www.nikkei.com/news/article-translation/?ng={article_id}"
+    en = base
+    zh = base + "&mta=c"
+    return (en, zh)
+
+
+def format_jp_range(start, end) -> str:
+    """Format date range like '2025年7月21日～27日' (handles cross-month/year)."""
+    if start.year == end.year:
+        if start.month == end.month:
+            return f"{start.year}年{start.month}月{start.day}日～{end.day}日"
+        return f"{start.year}年{start.month}月{start.day}日～{end.month}月{end.day}日"
+    return f"{start.year}年{start.month}月{start.day}日～{end.year}年{end.month}月{end.day}日"
+
+
+def _weekly_tags():
+    """Tags used on Article, sorted case-insensitively, minus 'unknown'/'unknow'."""
+    ct = ContentType.objects.get_for_model(Article)
+    all_tags = (
+        Tag.objects.filter(taggit_taggeditem_items__content_type=ct)
+        .distinct()
+    )
+
+    def keep_tag(t: Tag) -> bool:
+        return (t.name or "").strip().casefold() not in EXCLUDED_TAGS
+
+    return sorted(
+        (t for t in all_tags if keep_tag(t)),
+        key=lambda t: (t.name or "").strip().casefold()
+    )
+
+
+def _item(article_id, publish, url, excerpt, title, listing_title) -> DigestItem:
+    url_en, url_zh = derive_nikkei_translation_urls(url)
+    return DigestItem(
+        article_id=article_id,
+        publish=publish,
+        title=listing_title if listing_title is not None else clean_title(title),
+        excerpt=excerpt,
+        url=url,
+        url_en=url_en,
+        url_zh=url_zh,
+    )
+
+
+def _fill_excerpts(section: DigestSection) -> DigestSection:
+    """Rows older than the stored excerpt column: snippets from their bodies, one query per section."""
+    missing = {item.article_id: item for item in section.articles if item.excerpt is None}
+    if missing:
+        for pk, text in Article.objects.filter(pk__in=missing).values_list("id", "text"):
+            missing[pk].excerpt = excerpt_ja(text)
+    return section
+
+
+def iter_sections(start_date, end_date, limit: int | None = None):
+    """
+    Yield a DigestSection per tag, in tag order, streaming the (article, tag)
+    rows of the window with .iterator() in that same order, so only one
+    section is held at a time.
+
+    With `limit`, stops after that many article rows in total; the last
+    section yielded then has truncated=True.
+    Costs two queries: the tag list and one cursor over the window's rows.
+    Bodies are not loaded: snippets come from the stored excerpt column
+    (rows that predate it cost one extra query per section, see
+    backfill_text_columns).
+    """
+    tags = _weekly_tags()
+    if not tags:
+        return
+
+    # one row per (article, tag) through the TaggedItem join, tag order then newest first
+    tag_pos = Case(
+        *[When(tags__id=t.id, then=Value(i)) for i, t in enumerate(tags)],
+        output_field=IntegerField(),
+    )
+    rows = (
+        Article.objects
+        .filter(
+            language="ja",
+            publish__range=(start_date, end_date),
+            tags__id__in=[t.id for t in tags],
+        )
+        .annotate(tag_pos=tag_pos)
+        .order_by("tag_pos", "-publish", "-created")
+        .values_list("tag_pos", "id", "publish", "url", "excerpt", "title", "listing__title_ja")
+        .iterator(chunk_size=500)
+    )
+
+    row = next(rows, None)
+    emitted = 0
+    for pos, tag in enumerate(tags):
+        section = DigestSection(tag.name)
+        while row is not None and row[0] == pos:
+            if limit is not None and emitted >= limit:
+                rows.close()
+                section.truncated = True
+                yield _fill_excerpts(section)
+                return
+            section.articles.append(_item(*row[1:]))
+            emitted += 1
+            row = next(rows, None)
+        yield _fill_excerpts(section)
+
+
+def build_sections(start_date, end_date) -> list[DigestSection]:
+    """
+    Group JA articles published in [start_date, end_date] by tag.
+
+    Returns a DigestSection for every tag used on Article (sorted, excluding
+    'unknown'/'unknow'); tags without articles in the window get an empty
+    section. Costs two queries regardless of tag count (see iter_sections).
+    """
+    return list(iter_sections(start_date, end_date))
@@ -0,0 +1,95 @@
+# article/digest_cache.py
+"""
+Cache for the weekly digest (grouped structure + rendered DOCX bytes).
+
+Entries are keyed by (start_date, end_date, format) plus a version string
+built from per-publish-date generation counters. receive_article bumps the
+counter of the date it touched, which orphans exactly the cached windows
+that contain that date; everything else stays warm. A brand-new tag adds a
+section to every digest, so it bumps the global counter instead.
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+
+from . import perf
+
+CACHE_ALIAS = "digest"
+TIMEOUT = getattr(settings, "WEEKLY_DIGEST_CACHE_TIMEOUT", 24 * 60 * 60)
+
+_GLOBAL_GEN = "digest:gen"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _as_date(value):
+    # same conversion DateField applies on save (aware datetime -> local date)
+    return models.DateField().to_python(value)
+
+
+def _gen_key(d) -> str:
+    return f"digest:gen:{d.isoformat()}"
+
+
+def _version(start_date, end_date) -> str:
+    days = (end_date - start_date).days
+    keys = [_GLOBAL_GEN] + [_gen_key(start_date + timedelta(days=i)) for i in range(days + 1)]
+    gens = _cache().get_many(keys)
+    raw = "|".join(str(gens.get(k, 0)) for k in keys)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _key(start_date, end_date, fmt: str) -> str:
+    return f"digest:{start_date.isoformat()}:{end_date.isoformat()}:{fmt}:{_version(start_date, end_date)}"
+
+
+def get(start_date, end_date, fmt: str):
+    """Cached value for the window/format, or None."""
+    value = _cache().get(_key(start_date, end_date, fmt))
+    perf.cache_lookup("digest", value is not None)
+    return value
+
+
+def set(start_date, end_date, fmt: str, value) -> None:
+    _cache().set(_key(start_date, end_date, fmt), value, TIMEOUT)
+
+
+def get_or_build(start_date, end_date, fmt: str, build):
+    """Return the cached value for the window/format, calling build() on a miss."""
+    key = _key(start_date, end_date, fmt)
+    value = _cache().get(key)
+    perf.cache_lookup("digest", value is not None)
+    if value is None:
+        value = build()
+        _cache().set(key, value, TIMEOUT)
+    return value
+
+
+def invalidate(publish_date=None, new_tag: bool = False) -> None:
+    """
+    Drop cached digests affected by a write.
+      - publish_date: the article's date; windows containing it are rebuilt
+      - new_tag / no date: every window is rebuilt
+    """
+    if new_tag or publish_date is None:
+        key = _GLOBAL_GEN
+    else:
+        key = _gen_key(_as_date(publish_date))
+    # monotonic stamp instead of incr(): survives a missing/evicted counter
+    _cache().set(key, time.time_ns(), None)
+
+
+# signal receivers (connected in ArticleConfig.ready): admin edits, not just ingest
+def article_changed(sender, instance, **kwargs):
+    invalidate(instance.publish)
+
+
+def tags_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith("post_"):
+        invalidate(None if reverse else instance.publish)
@@ -0,0 +1,315 @@
+# article/exports.py
+"""
+Export formats of the weekly digest, selected with ?export=<format>.
+
+Every renderer takes the same inputs: an iterable of DigestSection (usually
+the live iter_sections cursor) plus the window dates. Text formats are
+generators of bytes chunks, emitted section by section as rows arrive, so
+memory stays flat whatever the window size. DOCX has to be assembled
+before it can be zipped; it is written to a spooled temp file instead and
+the file is returned. Either result can be handed to FileResponse as is
+under WSGI; under ASGI wrap it in aiter_chunks() first.
+
+Adding a format = one function decorated with @register.
+"""
+import csv
+import json
+import tempfile
+from functools import partial
+from dataclasses import asdict, dataclass
+from email.header import Header
+from email.utils import formatdate
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.utils.html import escape
+
+from .digest import format_jp_range
+
+HEADER_TITLE = "CP提携先企業動向まとめ"
+HEADER_ORG = "日本正大光明 投資部"
+NO_NEWS = "今週主要なニュースなし"
+DOCX_SPOOL_BYTES = 8 * 1024 * 1024     # larger documents spill to disk
+FILE_BLOCK_BYTES = 64 * 1024
+
+
+def truncation_notice(count: int) -> str:
+    return f"（件数が多いため以降は省略しました / truncated after {count} articles）"
+
+
+@dataclass(frozen=True)
+class Renderer:
+    render: Callable            # (sections, start_date, end_date) -> iterable of bytes | binary file
+    content_type: str
+    extension: str
+
+
+RENDERERS: dict[str, Renderer] = {}
+
+
+def register(fmt: str, content_type: str, extension: str):
+    def decorator(fn):
+        RENDERERS[fmt] = Renderer(fn, content_type, extension)
+        return fn
+    return decorator
+
+
+async def aiter_chunks(content):
+    """
+    A renderer's result (bytes iterator or binary file) as an async iterator.
+
+    Under ASGI, Django sends a sync streaming body with
+    sync_to_async(list)(...), i.e. reads it completely before the first
+    byte goes out. Here each chunk is produced in its own sync_to_async
+    call instead. The calls are thread-sensitive, so they run on the
+    request's thread and the iter_sections cursor keeps its connection.
+    """
+    if hasattr(content, "read"):
+        it, close = iter(partial(content.read, FILE_BLOCK_BYTES), b""), content.close
+    else:
+        it = iter(content)
+        close = getattr(it, "close", None)
+    produce = sync_to_async(next)
+    try:
+        while (chunk := await produce(it, None)) is not None:
+            yield chunk
+    finally:
+        if close is not None:
+            await sync_to_async(close)()
+
+
+# -----------------------------
+# Markdown
+# -----------------------------
+_MD_SPECIAL = str.maketrans({c: "\\" + c for c in "\\`*_[]<>#"})
+
+
+def _md(text: str) -> str:
+    return (text or "").translate(_MD_SPECIAL)
+
+
+@register("md", "text/markdown; charset=utf-8", "md")
+def render_markdown(sections, start_date, end_date):
+    yield (
+        f"# {HEADER_TITLE}\n\n"
+        f"**{format_jp_range(start_date, end_date)}**  \n"
+        f"**{HEADER_ORG}**\n"
+    ).encode()
+
+    count, truncated = 0, False
+    for section in sections:
+        truncated = section.truncated
+        lines = [f"\n## {_md(section.tag_name)}\n"]
+        if not section.articles:
+            lines.append(f"\n{NO_NEWS}\n")
+        for a in section.articles:
+            count += 1
+            lines.append(f"\n**{a.publish:%Y-%m-%d}**  \n**{_md(a.title)}**  \n")
+            if a.excerpt:
+                lines.append(f"{_md(a.excerpt)}  \n")
+            translations = [f"[{label}]({u})" for label, u in
+                            (("English translation", a.url_en), ("中訳", a.url_zh)) if u]
+            links = f"[原文]({a.url})" if a.url else ""
+            if translations:
+                links += f" ({' / '.join(translations)})"
+            if links:
+                lines.append(links.strip() + "\n")
+        yield "".join(lines).encode()
+
+    if truncated:
+        yield f"\n{truncation_notice(count)}\n".encode()
+
+
+# -----------------------------
+# CSV (one row per article; UTF-8 with BOM so Excel reads the Japanese)
+# -----------------------------
+CSV_COLUMNS = ("tag", "publish", "title", "excerpt", "url", "url_en", "url_zh")
+
+
+class _Echo:
+    """File-like whose write() returns the line, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+@register("csv", "text/csv; charset=utf-8", "csv")
+def render_csv(sections, start_date, end_date):
+    writer = csv.writer(_Echo())
+    yield ("\ufeff" + writer.writerow(CSV_COLUMNS)).encode()
+    for section in sections:
+        yield "".join(
+            writer.writerow((section.tag_name, a.publish.isoformat(), a.title, a.excerpt,
+                             a.url, a.url_en or "", a.url_zh or ""))
+            for a in section.articles
+        ).encode()
+
+
+# -----------------------------
+# JSON
+# -----------------------------
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+@register("json", "application/json", "json")
+def render_json(sections, start_date, end_date):
+    yield f'{{"start":"{start_date.isoformat()}","end":"{end_date.isoformat()}","sections":['.encode()
+    truncated = False
+    for i, section in enumerate(sections):
+        truncated = section.truncated
+        data = {"tag_name": section.tag_name, "articles": [asdict(a) for a in section.articles]}
+        yield (("," if i else "") + _json(data)).encode()
+    yield f'],"truncated":{_json(truncated)}}}'.encode()
+
+
+# -----------------------------
+# HTML e-mail (.eml draft: opens ready to send in Outlook / Thunderbird)
+# -----------------------------
+@register("eml", "message/rfc822", "eml")
+def render_eml(sections, start_date, end_date):
+    date_line = format_jp_range(start_date, end_date)
+    subject = Header(f"{HEADER_TITLE} {date_line}", "utf-8").encode()
+    yield (
+        "MIME-Version: 1.0\r\n"
+        f"Date: {formatdate(localtime=True)}\r\n"
+        f"Subject: {subject}\r\n"
+        "X-Unsent: 1\r\n"
+        'Content-Type: text/html; charset="utf-8"\r\n'
+        "Content-Transfer-Encoding: 8bit\r\n"
+        "\r\n"
+        '<!DOCTYPE html>\r\n<html><head><meta charset="utf-8"></head><body>\r\n'
+        f"<p><b>{HEADER_TITLE}</b><br><b>{date_line}</b><br><b>{HEADER_ORG}</b></p>\r\n"
+    ).encode()
+
+    count, truncated = 0, False
+    for section in sections:
+        truncated = section.truncated
+        parts = [f"<h2>{escape(section.tag_name)}</h2>\r\n"]
+        if not section.articles:
+            parts.append(f"<p>{NO_NEWS}</p>\r\n")
+        for a in section.articles:
+            count += 1
+            parts.append(f"<p>{a.publish:%Y-%m-%d}<br><b>{escape(a.title)}</b></p>\r\n")
+            if a.excerpt:
+                parts.append(f'<p style="margin:0">{escape(a.excerpt)}</p>\r\n')
+            links = []
+            if a.url:
+                links.append(f'<a href="{escape(a.url)}">原文</a>')
+            translations = [f'<a href="{escape(u)}">{label}</a>' for label, u in
+                            (("English translation", a.url_en), ("中訳", a.url_zh)) if u]
+            if translations:
+                links.append(f"({' / '.join(translations)})")
+            if links:
+                parts.append(f'<p style="margin:0 0 10pt">{" ".join(links)}</p>\r\n')
+        yield "".join(parts).encode()
+
+    if truncated:
+        yield f"<p>{truncation_notice(count)}</p>\r\n".encode()
+    yield b"</body></html>\r\n"
+
+
+# -----------------------------
+# DOCX
+# -----------------------------
+def add_hyperlink(paragraph, url: str, text: str | None = None):
+    """Insert a clickable hyperlink into a python-docx paragraph."""
+    if not url:
+        return
+    from docx.oxml.shared import OxmlElement, qn
+    from docx.opc.constants import RELATIONSHIP_TYPE
+
+    if text is None:
+        text = url
+
+    part = paragraph.part
+    r_id = part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.set(qn("r:id"), r_id)
+
+    run = OxmlElement("w:r")
+    rPr = OxmlElement("w:rPr")
+
+    # underline + blue
+    u = OxmlElement("w:u"); u.set(qn("w:val"), "single"); rPr.append(u)
+    color = OxmlElement("w:color"); color.set(qn("w:val"), "0000FF"); rPr.append(color)
+
+    run.append(rPr)
+    t = OxmlElement("w:t"); t.text = text
+    run.append(t)
+    hyperlink.append(run)
+
+    paragraph._p.append(hyperlink)
+
+
+@register("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "docx")
+def render_docx(sections, start_date, end_date):
+    """
+    DOCX with clickable original / EN / ZH links, written to a spooled temp
+    file (spills to disk past DOCX_SPOOL_BYTES). Returns the file, rewound.
+    """
+    from docx import Document
+    from docx.shared import Pt  # <- for tight paragraph spacing
+
+    doc = Document()
+
+    # 3-line bold header with selected dates
+    date_line = format_jp_range(start_date, end_date)
+    for line in (HEADER_TITLE, date_line, HEADER_ORG):
+        p = doc.add_paragraph()
+        p.add_run(line).bold = True
+
+    count, truncated = 0, False
+    for section in sections:
+        truncated = section.truncated
+
+        doc.add_heading(section.tag_name, level=2)
+
+        if not section.articles:
+            doc.add_paragraph(NO_NEWS)
+            continue
+
+        for a in section.articles:
+            count += 1
+            # date (bold) + NEW line + title (bold)
+            p = doc.add_paragraph()
+            r1 = p.add_run(a.publish.strftime("%Y-%m-%d"))
+            r1.add_break()
+            p.add_run(a.title).bold = True
+            p.paragraph_format.space_after = Pt(3)
+            # excerpt with no extra spacing after
+            if a.excerpt:
+                p_snip = doc.add_paragraph(a.excerpt)
+                p_snip.paragraph_format.space_after = Pt(0)
+
+            # ONE LINE: 原文 (English translation / 中訳)
+            if a.url or a.url_en or a.url_zh:
+                p_links = doc.add_paragraph()
+                fmt = p_links.paragraph_format
+                fmt.space_before = Pt(0)
+                fmt.space_after = Pt(0)
+
+                if a.url:
+                    add_hyperlink(p_links, a.url, "原文")
+
+                if a.url_en or a.url_zh:
+                    p_links.add_run(" (")
+                    wrote_any = False
+                    if a.url_en:
+                        add_hyperlink(p_links, a.url_en, "English translation")
+                        wrote_any = True
+                    if a.url_zh:
+                        if wrote_any:
+                            p_links.add_run(" / ")
+                        add_hyperlink(p_links, a.url_zh, "中訳")
+                    p_links.add_run(")")
+                p_links.paragraph_format.space_after = Pt(10)
+
+    if truncated:
+        doc.add_paragraph(truncation_notice(count))
+
+    out = tempfile.SpooledTemporaryFile(max_size=DOCX_SPOOL_BYTES)
+    doc.save(out)
+    out.seek(0)
+    return out
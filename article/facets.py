@@ -0,0 +1,80 @@
+# article/facets.py
+"""
+Sidebar facets for the article list: period counts + per-tag article counts.
+
+Both are computed in one pass (a single conditional-aggregate query for the
+periods, one grouped query for the tags) and cached per day in the shared
+digest cache, so list pages normally pay a single cache read for the
+sidebar. Writes (ingest, admin edits, tag changes) drop the entry; the
+timeout only bounds staleness for writes that bypass those paths.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.utils.timezone import now
+
+from . import perf
+from .digest_cache import CACHE_ALIAS
+
+TIMEOUT = getattr(settings, "FACET_CACHE_TIMEOUT", 10 * 60)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _key(today) -> str:
+    return f"facets:{today.isoformat()}"
+
+
+def compute(today) -> dict:
+    """Period counts and per-tag counts straight from the database (2 queries)."""
+    from taggit.models import TaggedItem
+    from .models import Article
+
+    periods = Article.objects.aggregate(
+        any=Count("id"),
+        days7=Count("id", filter=Q(publish__gte=today - timedelta(days=7))),
+        month=Count("id", filter=Q(publish__year=today.year, publish__month=today.month)),
+        year=Count("id", filter=Q(publish__year=today.year)),
+    )
+    ct = ContentType.objects.get_for_model(Article)
+    tags = list(
+        TaggedItem.objects.filter(content_type=ct)
+        .values("tag_id")
+        .annotate(article_count=Count("id"))
+        .values_list("tag_id", "tag__name", "tag__slug", "article_count")
+        .order_by("tag_id")
+    )
+    return {
+        "periods": [
+            ("", "- Any time", periods["any"]),
+            ("7days", "- Past 7 days", periods["days7"]),
+            ("month", "- This month", periods["month"]),
+            ("year", "- This year", periods["year"]),
+        ],
+        "tags": [
+            {"id": tag_id, "name": name, "slug": slug, "article_count": count}
+            for tag_id, name, slug, count in tags
+        ],
+    }
+
+
+def get_facets() -> dict:
+    """Cached facets for today: {"periods": [(code, label, count)], "tags": [{id, name, slug, article_count}]}."""
+    today = now().date()
+    key = _key(today)
+    value = _cache().get(key)
+    perf.cache_lookup("facets", value is not None)
+    if value is None:
+        value = compute(today)
+        _cache().set(key, value, TIMEOUT)
+    return value
+
+
+def invalidate(*args, **kwargs) -> None:
+    """Drop today's facets (also usable as a signal receiver)."""
+    _cache().delete(_key(now().date()))
@@ -0,0 +1,92 @@
+# article/jobs.py
+"""
+DB-backed queue for background article translation.
+
+The detail view only enqueues (one TranslationJob per article/language,
+so concurrent opens share a job); the run_translation_jobs worker claims
+pending rows with SELECT ... FOR UPDATE SKIP LOCKED and writes the
+ArticleTranslation when the provider answers.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArticleTranslation, TranslationJob
+from .translators import get_translator
+from . import search
+
+MAX_ATTEMPTS = getattr(settings, "TRANSLATION_JOB_MAX_ATTEMPTS", 3)
+RETRY_BACKOFF = timedelta(seconds=getattr(settings, "TRANSLATION_JOB_RETRY_SECONDS", 30))
+# a 'running' job not touched for this long belongs to a dead worker
+STALE_AFTER = timedelta(seconds=getattr(settings, "TRANSLATION_JOB_STALE_SECONDS", 600))
+
+
+def enqueue_translation(article, language: str) -> TranslationJob:
+    """
+    Get or create the job for (article, language). Called only when the
+    translation is missing, so a 'done' job (translation deleted since) is
+    re-queued. 'failed' is final until reset from the admin.
+    """
+    job, created = TranslationJob.objects.get_or_create(article=article, language=language)
+    if not created and job.status == "done":
+        job.status, job.attempts, job.run_after = "pending", 0, timezone.now()
+        job.save(update_fields=["status", "attempts", "run_after", "updated"])
+    return job
+
+
+def claim_next_job() -> TranslationJob | None:
+    """Atomically move the next due job to 'running' and return it."""
+    now = timezone.now()
+    stale = now - STALE_AFTER
+    with transaction.atomic():
+        job = (
+            TranslationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="pending", run_after__lte=now)
+            .order_by("run_after")
+            .first()
+        )
+        if job is None:
+            job = (
+                TranslationJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status="running", updated__lt=stale)
+                .order_by("updated")
+                .first()
+            )
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.save(update_fields=["status", "attempts", "updated"])
+    return job
+
+
+def run_job(job: TranslationJob, translator=None) -> bool:
+    """Translate and store; returns True when the job finished successfully."""
+    translator = translator or get_translator()
+    article = job.article
+    try:
+        if not ArticleTranslation.objects.filter(article=article, language=job.language).exists():
+            t_title, t_body = translator(article.title, article.text, job.language)
+            tr, created = ArticleTranslation.objects.get_or_create(
+                article=article,
+                language=job.language,
+                defaults=dict(title_translated=t_title, text_translated=t_body),
+            )
+            if created:
+                search.index_translation(tr)
+    except Exception as e:
+        job.status = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+        job.error = str(e)
+        # exponential backoff: 30s, 60s, 120s, ...
+        job.run_after = timezone.now() + RETRY_BACKOFF * (2 ** (job.attempts - 1))
+        job.save(update_fields=["status", "error", "run_after", "updated"])
+        return False
+
+    job.status = "done"
+    job.error = ""
+    job.save(update_fields=["status", "error", "updated"])
+    return True
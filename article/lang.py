@@ -0,0 +1,108 @@
+# article/lang.py
+"""
+Display language without the session.
+
+LanguageMiddleware resolves request.lang from, in order:
+    ?lang=ja|zh|en        (shareable URLs)
+    the signed "lang" cookie (set by the language switcher, views_lang.set_lang,
+                          and when a page is opened with ?lang=)
+    ja
+so anonymous pages never touch the session table.
+
+Caching: a page whose language came from the URL depends on the URL only
+and gets no Vary from us. One resolved from the cookie (or the default)
+gets `Vary: Cookie`; the cookie value is the same for every reader of a
+language (Signer, no timestamp), so a shared cache keeps one copy per
+language rather than one per visitor. The `Vary: Cookie` that
+SessionMiddleware adds whenever a template looks at `user`/`messages` is
+dropped for requests that carry no session, messages or CSRF cookie:
+their session is empty, so the page cannot depend on it.
+"""
+from django.conf import settings
+from django.core import signing
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+DEFAULT = "ja"
+SUPPORTED = ("ja", "zh", "en")
+ALIASES = {"cn": "zh", "zh-cn": "zh", "zh-hans": "zh"}
+
+COOKIE_NAME = getattr(settings, "ARTICLE_LANG_COOKIE_NAME", "lang")
+COOKIE_MAX_AGE = 365 * 24 * 60 * 60
+
+_signer = signing.Signer(salt="article.lang")
+
+
+def normalize(value):
+    """'en', 'EN', 'zh-Hans' -> a supported code; None for anything else."""
+    value = (value or "").strip().lower()
+    value = ALIASES.get(value, value)
+    return value if value in SUPPORTED else None
+
+
+def _from_cookie(request):
+    raw = request.COOKIES.get(COOKIE_NAME)
+    if not raw:
+        return None
+    try:
+        return normalize(_signer.unsign(raw))
+    except signing.BadSignature:
+        return None
+
+
+def get_lang(request) -> str:
+    """The request's display language; marks the response as depending on it."""
+    if not hasattr(request, "lang"):
+        resolve(request)
+    request.lang_used = True
+    return request.lang
+
+
+def resolve(request) -> None:
+    request.lang_cookie = _from_cookie(request)
+    request.lang_in_url = normalize(request.GET.get("lang"))
+    request.lang = request.lang_in_url or request.lang_cookie or DEFAULT
+    request.lang_used = False
+
+
+def set_cookie(response, lang) -> None:
+    response.set_cookie(
+        COOKIE_NAME, _signer.sign(lang), max_age=COOKIE_MAX_AGE,
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax",
+    )
+
+
+def _sessionless(request, response) -> bool:
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and settings.SESSION_COOKIE_NAME not in response.cookies
+        and "messages" not in request.COOKIES
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+class LanguageMiddleware(MiddlewareMixin):
+    """Sets request.lang; must sit above SessionMiddleware (its Vary is rewritten here)."""
+
+    def process_request(self, request):
+        resolve(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, "lang"):
+            return response
+
+        if _sessionless(request, response) and response.has_header("Vary"):
+            vary = [v.strip() for v in response["Vary"].split(",") if v.strip().lower() != "cookie"]
+            if vary:
+                response["Vary"] = ", ".join(vary)
+            else:
+                del response["Vary"]
+
+        if request.lang_used:
+            response.setdefault("Content-Language", request.lang)
+            if request.lang_in_url:
+                if request.lang_in_url != request.lang_cookie:
+                    set_cookie(response, request.lang_in_url)
+            else:
+                patch_vary_headers(response, ["Cookie"])
+        return response
@@ -0,0 +1,74 @@
+# article/listing.py
+"""
+Maintenance of the ArticleListing read model.
+
+One row per article with the whitespace-cleaned title in every language
+and has_<lang> flags, so list-style pages never touch translation bodies.
+Model saves/deletes are picked up by signals (see ArticleConfig.ready);
+bulk writes that bypass signals call sync()/create_for() themselves.
+"""
+from .models import Article, ArticleListing, ArticleTranslation, LANG_CHOICES
+from .text import clean_title
+
+LANGS = [code for code, _ in LANG_CHOICES]
+_FIELDS = ["publish", "created", "title_ja"] + [f"title_{l}" for l in LANGS if l != "ja"] + [f"has_{l}" for l in LANGS]
+
+
+def _row(article_id, publish, created, title, translations=()) -> ArticleListing:
+    row = ArticleListing(article_id=article_id, publish=publish, created=created, title_ja=clean_title(title)[:250])
+    for lang, title_translated in translations:
+        setattr(row, f"has_{lang}", True)
+        if lang != "ja":
+            setattr(row, f"title_{lang}", clean_title(title_translated)[:300])
+    return row
+
+
+def _upsert(rows) -> None:
+    ArticleListing.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["article"], update_fields=_FIELDS
+    )
+
+
+def create_for(articles) -> None:
+    """Rows for freshly inserted articles (no translations yet): one INSERT."""
+    _upsert([_row(a.id, a.publish, a.created, a.title) for a in articles])
+
+
+def sync(article_ids) -> None:
+    """Recompute the rows of these articles from Article + ArticleTranslation (2 reads, 1 upsert)."""
+    ids = {i for i in article_ids if i is not None}
+    if not ids:
+        return
+    trs = {}
+    for article_id, lang, title in ArticleTranslation.objects.filter(article_id__in=ids).values_list(
+        "article_id", "language", "title_translated"
+    ):
+        trs.setdefault(article_id, []).append((lang, title))
+    rows = [
+        _row(a_id, publish, created, title, trs.get(a_id, ()))
+        for a_id, publish, created, title in Article.objects.filter(id__in=ids).values_list(
+            "id", "publish", "created", "title"
+        )
+    ]
+    if rows:
+        _upsert(rows)
+
+
+# signal receivers (connected in ArticleConfig.ready)
+def article_saved(sender, instance, created, **kwargs):
+    if created:
+        create_for([instance])
+    else:
+        sync([instance.pk])
+
+
+def translation_saved(sender, instance, **kwargs):
+    sync([instance.article_id])
+
+
+def translation_deleted(sender, instance, **kwargs):
+    # plain UPDATE: a no-op when the whole article (and its row) is being deleted
+    fields = {f"has_{instance.language}": False}
+    if instance.language != "ja":
+        fields[f"title_{instance.language}"] = ""
+    ArticleListing.objects.filter(article_id=instance.article_id).update(**fields)
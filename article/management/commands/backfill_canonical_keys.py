@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from article.canonical import canonical_key
+from article.models import Article
+
+
+class Command(BaseCommand):
+    help = "Fill Article.canonical_key for existing rows, chunk by chunk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Rows per chunk / bulk_update (default 1000)."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without saving."
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+
+        last_id, updated, dupes = 0, 0, 0
+        while True:
+            chunk = list(
+                Article.objects.filter(id__gt=last_id, canonical_key__isnull=True)
+                .exclude(url="")
+                .order_by("id")
+                .only("id", "url")[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            for a in chunk:
+                a.canonical_key = canonical_key(a.url)
+            keys = {a.canonical_key for a in chunk}
+            taken = dict(
+                Article.objects.filter(canonical_key__in=keys).values_list("canonical_key", "id")
+            )
+
+            to_update = []
+            for a in chunk:
+                if a.canonical_key in taken:
+                    # an older row already owns this key: leave this one NULL and report it
+                    self.stdout.write(f"[{a.id}] duplicate of {taken[a.canonical_key]}: {a.url}")
+                    dupes += 1
+                    continue
+                taken[a.canonical_key] = a.id
+                to_update.append(a)
+
+            if not dry_run:
+                Article.objects.bulk_update(to_update, ["canonical_key"])
+            updated += len(to_update)
+            self.stdout.write(f"-- up to id {last_id}: {updated} keyed, {dupes} duplicates")
+
+        verb = "would be keyed" if dry_run else "keyed"
+        self.stdout.write(f"Done: {updated} {verb}, {dupes} duplicates left without key.")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, Max, OuterRef, Subquery
+
+from article.models import Article, ArticleTranslation
+
+
+class Command(BaseCommand):
+    help = (
+        "Move Article.updated up to the article's newest translation write, for rows from before "
+        "translation writes bumped it (the API changefeed is ordered by Article.updated), chunk by chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Article ids per UPDATE (default 5000)."
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        newest = (
+            ArticleTranslation.objects.filter(article=OuterRef("pk"))
+            .values("article").annotate(m=Max("updated")).values("m")
+        )
+        newer = ArticleTranslation.objects.filter(article=OuterRef("pk"), updated__gt=OuterRef("updated"))
+        top = Article.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+        n = 0
+        for lo in range(0, top, chunk_size):
+            n += (
+                Article.objects.filter(id__gt=lo, id__lte=lo + chunk_size)
+                .filter(Exists(newer))
+                .update(updated=Subquery(newest))
+            )
+            self.stdout.write(f"-- up to id {min(lo + chunk_size, top)}: {n} updated")
+        self.stdout.write(f"Done: {n} articles updated.")
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from article.models import Article, ArticleListing, ArticleTranslation
+from article.text import text_columns
+from article import listing
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the stored plain-text/excerpt columns of Article and ArticleTranslation "
+        "(and missing ArticleListing rows with their cleaned titles), chunk by chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Rows fetched and bulk-updated per chunk (default 500)."
+        )
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Recompute every row, not only rows that were never computed."
+        )
+
+    def _fill(self, model, source, chunk_size, recompute):
+        base = model.objects.all() if recompute else model.objects.filter(text_plain__isnull=True)
+        last_id, n = 0, 0
+        while True:
+            rows = list(base.filter(id__gt=last_id).order_by("id").only("id", source)[:chunk_size])
+            if not rows:
+                break
+            for row in rows:
+                for column, value in text_columns(getattr(row, source)).items():
+                    setattr(row, column, value)
+            model.objects.bulk_update(rows, ["text_plain", "excerpt"])
+            last_id = rows[-1].id
+            n += len(rows)
+            self.stdout.write(f"-- {model.__name__}: {n} rows")
+        return n
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        recompute = options["all"]
+
+        n = self._fill(Article, "text", chunk_size, recompute)
+        self.stdout.write(f"Articles: {n} updated.")
+        n = self._fill(ArticleTranslation, "text_translated", chunk_size, recompute)
+        self.stdout.write(f"Translations: {n} updated.")
+
+        # cleaned titles live in the listing read model
+        missing = list(
+            Article.objects.exclude(id__in=ArticleListing.objects.values("article_id"))
+            .values_list("id", flat=True)
+        )
+        for i in range(0, len(missing), chunk_size):
+            listing.sync(missing[i:i + chunk_size])
+        self.stdout.write(f"Listing rows: {len(missing)} created.")
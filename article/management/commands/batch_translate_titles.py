@@ -1,119 +1,240 @@
-import os
 import json
-import requests
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
 from django.core.management.base import BaseCommand
 from django.db.models import Q
+from django.utils import timezone
 from article.models import ArticleTranslation
+from article.translators import PROVIDERS, translate_titles
+from article import api, changelog, listing, page_cache, search
+from article import translation_memory as tm
 
-from openai import OpenAI
 
 # ==============================
-# Load keys and configs from .env
+# Throttling helpers (shared by worker threads)
 # ==============================
-OPENAI_API_KEY    = os.getenv("OPENAI_API_KEY", "")
-OPENAI_MODEL      = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-OPENAI_BASE_URL   = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+class RateLimiter:
+    """At most `rate` calls per second (0 = unlimited)."""
 
-DEEPSEEK_API_KEY  = os.getenv("DEEPSEEK_API_KEY", "")
-DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
-DEEPSEEK_MODEL    = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
 
-# ==============================
-# OpenAI client for English
-# ==============================
-openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
-
-def translate_title_openai(japanese_title: str) -> str:
-    """Translate Japanese news title into English using OpenAI API."""
-    resp = openai_client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": "Translate the following Japanese news title into natural English."},
-            {"role": "user", "content": japanese_title},
-        ],
-        temperature=0.3,
-    )
-    return resp.choices[0].message.content.strip()
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
 
 
-# ==============================
-# DeepSeek client for Chinese
-# ==============================
-def translate_title_deepseek(japanese_title: str) -> str:
-    """Translate Japanese news title into Chinese using DeepSeek API."""
-    url = f"{DEEPSEEK_BASE_URL}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "model": DEEPSEEK_MODEL,
-        "messages": [
-            {"role": "system", "content": "Translate the following Japanese news title into Simplified Chinese."},
-            {"role": "user", "content": japanese_title},
-        ],
-        "temperature": 0.3,
-    }
-    resp = requests.post(url, headers=headers, json=payload, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["choices"][0]["message"]["content"].strip()
+class Provider:
+    """Per-provider concurrency cap + rate limit."""
+
+    def __init__(self, concurrency: int, rate: float):
+        self.slots = threading.BoundedSemaphore(max(1, concurrency))
+        self.limiter = RateLimiter(rate)
+
+
+def call_with_retry(fn, retries: int, backoff: float):
+    """Call fn(); on error retry with exponential backoff + jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random() / 2))
 
 
 # ==============================
 # Django management command
 # ==============================
 class Command(BaseCommand):
-    help = "Batch translate ArticleTranslation titles (where title_translated is null)."
+    help = (
+        "Batch translate ArticleTranslation titles (where title_translated is null). "
+        "Titles are packed several per provider call and translated concurrently; "
+        "results are written back with bulk_update, chunk by chunk."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--limit", type=int, default=50,
-            help="Max number of rows to process (default 50)."
+            help="Max number of rows to process (default 50, 0 = no limit)."
         )
         parser.add_argument(
             "--dry-run", action="store_true",
             help="Run without saving changes."
         )
+        parser.add_argument(
+            "--batch-size", type=int, default=10,
+            help="Titles packed into one provider call (default 10)."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=200,
+            help="Rows fetched, translated and bulk-updated per chunk (default 200)."
+        )
+        parser.add_argument(
+            "--workers", type=int, default=4,
+            help="Worker threads (default 4)."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=2,
+            help="Max in-flight calls per provider (default 2)."
+        )
+        parser.add_argument(
+            "--rate", type=float, default=2.0,
+            help="Max calls per second per provider (default 2, 0 = unlimited)."
+        )
+        parser.add_argument(
+            "--retries", type=int, default=3,
+            help="Retries per provider call on error (default 3)."
+        )
+        parser.add_argument(
+            "--backoff", type=float, default=1.0,
+            help="Initial retry backoff in seconds (default 1)."
+        )
+        parser.add_argument(
+            "--state-file", default="",
+            help="JSON file recording progress (rows up to last_id are done); resumed from on the next run."
+        )
 
     def handle(self, *args, **options):
         limit = options["limit"]
         dry_run = options["dry_run"]
-
-        qs = ArticleTranslation.objects.filter(
+        batch_size = max(1, options["batch_size"])
+        chunk_size = max(1, options["chunk_size"])
+        retries = options["retries"]
+        backoff = options["backoff"]
+        state_path = Path(options["state_file"]) if options["state_file"] else None
+
+        providers = {
+            lang: Provider(options["concurrency"], options["rate"]) for lang in PROVIDERS
+        }
+
+        state = {"last_id": 0, "updated": 0, "failed": 0}
+        if state_path and state_path.exists():
+            state.update(json.loads(state_path.read_text()))
+            self.stdout.write(f"Resuming after id {state['last_id']}.")
+
+        base = ArticleTranslation.objects.filter(
             Q(title_translated__isnull=True) | Q(title_translated="")
-        ).select_related("article")[:limit]
-
-        count = qs.count()
-        self.stdout.write(f"Found {count} rows with empty titles.")
-
-        for idx, trans in enumerate(qs, start=1):
-            jp_title = trans.article.title
-            if not jp_title:
-                self.stdout.write(f"[{trans.id}:{trans.language}] skipped (no JP title).")
-                continue
-
-            try:
-                if trans.language == "en":
-                    translated = translate_title_openai(jp_title)
-                    provider = f"OpenAI:{OPENAI_MODEL}"
-                elif trans.language == "zh":
-                    translated = translate_title_deepseek(jp_title)
-                    provider = f"DeepSeek:{DEEPSEEK_MODEL}"
-                else:
-                    self.stdout.write(f"[{trans.id}:{trans.language}] skipped (lang not handled).")
-                    continue
-
-                if dry_run:
-                    self.stdout.write(
-                        f"[{trans.id}:{trans.language}] DRY-RUN: {jp_title} → {translated} ({provider})"
+        )
+        total = base.filter(id__gt=state["last_id"]).count()
+        if limit:
+            total = min(total, limit)
+        self.stdout.write(f"Found {total} rows with empty titles.")
+
+        def translate_batch(lang, titles):
+            prov = providers[lang]
+
+            def call():
+                with prov.slots:
+                    # one rate-limit token per provider call, per-title fallbacks included
+                    return translate_titles(titles, lang, throttle=prov.limiter.wait)
+
+            return lang, titles, call_with_retry(call, retries, backoff)
+
+        processed = 0
+        cursor = state["last_id"]
+        retry_from = None   # first row of this run left empty by a failed batch
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            while not limit or processed < limit:
+                take = chunk_size if not limit else min(chunk_size, limit - processed)
+                # keyset over id: cheap, and rows skipped/failed are never re-fetched in this run
+                chunk = list(
+                    base.filter(id__gt=cursor)
+                    .order_by("id")
+                    .values_list("id", "language", "article__title", "article_id")[:take]
+                )
+                if not chunk:
+                    break
+                processed += len(chunk)
+
+                # group translatable rows by language, then pack into batches
+                by_lang = {}
+                article_of = {tr_id: article_id for tr_id, _, _, article_id in chunk}
+                for tr_id, lang, jp_title, _ in chunk:
+                    if not jp_title:
+                        self.stdout.write(f"[{tr_id}:{lang}] skipped (no JP title).")
+                    elif lang not in PROVIDERS:
+                        self.stdout.write(f"[{tr_id}:{lang}] skipped (lang not handled).")
+                    else:
+                        by_lang.setdefault(lang, []).append((tr_id, jp_title))
+
+                # translation memory first (main thread); only unique misses go to the providers
+                results, fresh, futures = {}, {}, []
+                for lang, rows in by_lang.items():
+                    results[lang] = tm.lookup_many([t for _, t in rows], lang, PROVIDERS[lang][1])
+                    todo = list(dict.fromkeys(t for _, t in rows if t not in results[lang]))
+                    futures += [
+                        pool.submit(translate_batch, lang, todo[i:i + batch_size])
+                        for i in range(0, len(todo), batch_size)
+                    ]
+
+                for fut in as_completed(futures):
+                    try:
+                        lang, titles, translated = fut.result()
+                    except Exception as e:
+                        self.stderr.write(f"batch FAILED: {e}")
+                        state["failed"] += 1
+                        continue
+                    fresh.setdefault(lang, []).extend(zip(titles, translated))
+
+                now = timezone.now()
+                to_update, failed = [], []
+                verb = "DRY-RUN" if dry_run else "updated"
+                for lang, rows in by_lang.items():
+                    label = PROVIDERS[lang][1]
+                    new = dict(fresh.get(lang, []))
+                    for tr_id, jp_title in rows:
+                        if jp_title in new:
+                            t, source = new[jp_title], label
+                        elif jp_title in results[lang]:
+                            t, source = results[lang][jp_title], f"memory:{label}"
+                        else:
+                            failed.append(tr_id)  # its batch failed; left empty for a later run
+                            continue
+                        self.stdout.write(f"[{tr_id}:{lang}] {verb}: {jp_title} → {t} ({source})")
+                        to_update.append(ArticleTranslation(id=tr_id, title_translated=t, updated=now))
+                    if not dry_run:
+                        tm.store_many(fresh.get(lang, []), lang, label)
+
+                if to_update and not dry_run:
+                    # search vectors go out in the same UPDATE as the titles
+                    texts = dict(
+                        ArticleTranslation.objects.filter(id__in=[t.id for t in to_update])
+                        .values_list("id", "text_translated")
                     )
-                else:
-                    trans.title_translated = translated
-                    trans.save(update_fields=["title_translated", "updated"])
-                    self.stdout.write(
-                        f"[{trans.id}:{trans.language}] updated: {jp_title} → {translated} ({provider})"
+                    for t in to_update:
+                        t.search_vector = search.translation_vector(t.title_translated, texts[t.id])
+                    ArticleTranslation.objects.bulk_update(
+                        to_update, ["title_translated", "search_vector", "updated"], batch_size=chunk_size
                     )
-
-            except Exception as e:
-                self.stderr.write(f"[{trans.id}:{trans.language}] FAILED: {e}")
+                    listing.sync({article_of[t.id] for t in to_update})   # bulk_update sends no post_save
+                    page_cache.touch(*(article_of[t.id] for t in to_update))
+                    api.touch(*{article_of[t.id] for t in to_update})
+                    changelog.record("translation", "update", [(t.id, article_of[t.id]) for t in to_update])
+                    state["updated"] += len(to_update)
+
+                cursor = chunk[-1][0]
+                if failed and retry_from is None:
+                    retry_from = min(failed)
+                # the saved checkpoint never passes a failed row, so a resumed run retries it
+                state["last_id"] = cursor if retry_from is None else min(cursor, retry_from - 1)
+                if state_path and not dry_run:
+                    state_path.write_text(json.dumps(state))
+                self.stdout.write(f"-- {processed}/{total} rows processed")
+
+        self.stdout.write(
+            f"Done: {state['updated']} updated, {state['failed']} failed batches; "
+            f"translation memory {tm.STATS['hits']} hits / {tm.STATS['misses']} misses."
+        )
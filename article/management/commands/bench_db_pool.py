@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from article import bench
+from article.models import Article
+
+MODES = {
+    # mode -> environment for the child process (read by clipping/settings.py)
+    "pool": {"DB_POOL": "True"},
+    "direct": {"DB_POOL": "False", "DB_CONN_MAX_AGE": "0"},
+}
+# no page/facet/digest cache in the children: every request does its DB work,
+# and the shared cache isn't filled with benchmark pages
+CHILD_ENV = {"DIGEST_CACHE_BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency of the article list and the ingest endpoint with the "
+        "psycopg connection pool (DB_POOL=True) and with one new connection per request. "
+        "Each mode runs in its own process; nothing is written to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=200,
+            help="Timed requests per endpoint and mode (default 200)."
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=10,
+            help="Untimed requests before each run (default 10)."
+        )
+        parser.add_argument(
+            "--modes", default="pool,direct",
+            help="Comma-separated modes to run (default 'pool,direct')."
+        )
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+        parser.add_argument("--child", action="store_true", help="Internal: run the current mode only.")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self.stdout.write(json.dumps(self.run(options["requests"], options["warmup"])))
+            return
+
+        results = {}
+        for mode in options["modes"].split(","):
+            if mode not in MODES:
+                raise CommandError(f"Unknown mode {mode!r} (choose from {', '.join(MODES)}).")
+            child = subprocess.run(
+                [sys.executable, "-m", "django", "bench_db_pool", "--child",
+                 "--requests", str(options["requests"]), "--warmup", str(options["warmup"])],
+                env={**os.environ, **CHILD_ENV, **MODES[mode]}, capture_output=True, text=True,
+            )
+            if child.returncode:
+                raise CommandError(f"{mode} run failed:\n{child.stderr}")
+            results[mode] = json.loads(child.stdout)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for endpoint in ("list", "ingest"):
+            self.stdout.write(f"{endpoint}:")
+            for mode, by_endpoint in results.items():
+                s = by_endpoint.get(endpoint)
+                if s is None:
+                    self.stdout.write(f"  {mode:<7} skipped (no article to re-ingest)")
+                    continue
+                self.stdout.write(
+                    f"  {mode:<7} mean {s['mean_ms']:7.2f} ms   p50 {s['p50_ms']:7.2f} ms   "
+                    f"p95 {s['p95_ms']:7.2f} ms   ({s['requests']} requests)"
+                )
+
+    def run(self, n, warmup) -> dict:
+        client = bench.client()
+        list_url = reverse("article:article_list")
+        out = {"list": bench.summarize(bench.time_requests(lambda i: client.get(list_url), n, warmup))}
+
+        # re-ingesting an existing article: token check, dedup lookup, no write
+        article = Article.objects.listing().filter(canonical_key__isnull=False).order_by("-id").first()
+        if article is not None:
+            payload = bench.reingest_payload(article)
+            ingest_url = reverse("article:receive_article")
+            out["ingest"] = bench.summarize(bench.time_requests(
+                lambda i: client.post(ingest_url, payload, content_type="application/json"), n, warmup
+            ))
+        return out
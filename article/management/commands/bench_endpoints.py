@@ -0,0 +1,156 @@
+import json
+import platform
+import subprocess
+from collections import Counter
+
+import django
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from taggit.models import TaggedItem
+
+from article import bench
+from article.digest_cache import CACHE_ALIAS
+from article.models import Article, ArticleTranslation
+
+SCENARIOS = [
+    "list", "list_q", "list_tag", "list_period", "detail", "detail_en",
+    "weekly_html", "weekly_docx", "receive_article",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main endpoints in-process (p50/p95 latency and queries per request) against "
+        "the current database, e.g. after seed_articles. --output writes JSON that a later run "
+        "can compare against with --baseline. receive_article re-ingests an existing article, "
+        "so nothing is written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=50,
+            help="Timed requests per scenario (default 50)."
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=5,
+            help="Untimed requests before each scenario (default 5)."
+        )
+        parser.add_argument(
+            "--only", default="",
+            help=f"Comma-separated scenarios to run (default all: {', '.join(SCENARIOS)})."
+        )
+        parser.add_argument(
+            "--cache", choices=["off", "on"], default="off",
+            help="'off' (default): page/facet/digest caches disabled, every request does its DB "
+                 "work. 'on': as deployed; after the warmup most requests are cache hits."
+        )
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+        parser.add_argument("--output", default="", help="Also write the JSON results to this file.")
+        parser.add_argument("--baseline", default="", help="JSON from an earlier run to compare against.")
+
+    def handle(self, *args, **options):
+        names = [s for s in options["only"].split(",") if s] or SCENARIOS
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+        article = (
+            Article.objects.listing().filter(translations__language="en", canonical_key__isnull=False)
+            .order_by("-publish", "-id").first()
+        ) or Article.objects.listing().filter(canonical_key__isnull=False).order_by("-publish", "-id").first()
+        if article is None:
+            raise CommandError("No articles to benchmark; run seed_articles first.")
+
+        requests = self._requests(article)
+        caches = settings.CACHES
+        if options["cache"] == "off":
+            caches = {**caches, CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+        results = {}
+        with override_settings(CACHES=caches):
+            for name in names:
+                queries = []
+                timings = bench.time_requests(requests[name], options["requests"], options["warmup"], queries)
+                results[name] = bench.summarize(timings, queries)
+                self.stderr.write(f"-- {name} done")
+
+        report = {"meta": self._meta(options), "results": results}
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            baseline = {}
+            if options["baseline"]:
+                with open(options["baseline"], encoding="utf-8") as f:
+                    baseline = json.load(f)["results"]
+            self._table(results, baseline)
+
+    def _requests(self, article):
+        """Scenario name -> send(i) using the test client."""
+        client = bench.client()
+        list_url = reverse("article:article_list")
+        weekly_url = reverse("article:weekly_news")
+        ct = ContentType.objects.get_for_model(Article)
+        tag_slug = Counter(
+            TaggedItem.objects.filter(content_type=ct).values_list("tag__slug", flat=True)[:10000]
+        ).most_common(1)
+        term = article.title.split("、", 1)[0][:10]   # the company in seeded titles
+        payload = bench.reingest_payload(article)
+        receive_url = reverse("article:receive_article")
+        return {
+            "list": lambda i: client.get(list_url),
+            "list_q": lambda i: client.get(list_url, {"q": term}),
+            "list_tag": lambda i: client.get(list_url, {"tag": tag_slug[0][0] if tag_slug else ""}),
+            "list_period": lambda i: client.get(list_url, {"period": "7days"}),
+            "detail": lambda i: client.get(article.get_absolute_url()),
+            "detail_en": lambda i: client.get(article.get_absolute_url(), {"lang": "en"}),
+            "weekly_html": lambda i: client.get(weekly_url),
+            "weekly_docx": lambda i: client.get(weekly_url, {"export": "docx"}),
+            "receive_article": lambda i: client.post(receive_url, payload, content_type="application/json"),
+        }
+
+    def _meta(self, options) -> dict:
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            "commit": commit,
+            "at": timezone.now().isoformat(timespec="seconds"),
+            "database": connection.vendor,
+            "db_pool": bool(connection.settings_dict["OPTIONS"].get("pool")),
+            "articles": Article.objects.count(),
+            "translations": ArticleTranslation.objects.count(),
+            "requests": options["requests"],
+            "warmup": options["warmup"],
+            "cache": options["cache"],
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        }
+
+    def _table(self, results, baseline):
+        self.stdout.write(f"{'scenario':<16} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for name, s in results.items():
+            line = f"{name:<16} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s.get('queries_p50', 0):>8}"
+            old = baseline.get(name)
+            if old:
+                line += (
+                    f"   p50 {self._delta(old['p50_ms'], s['p50_ms'])}"
+                    f"  p95 {self._delta(old['p95_ms'], s['p95_ms'])}"
+                    f"  queries {old.get('queries_p50', 0)} -> {s.get('queries_p50', 0)}"
+                )
+            self.stdout.write(line)
+
+    @staticmethod
+    def _delta(old, new) -> str:
+        return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from article.models import Article
+from article import listing
+
+
+class Command(BaseCommand):
+    help = "(Re)build the ArticleListing read model from Article + ArticleTranslation."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Articles per chunk (default 1000)."
+        )
+        parser.add_argument(
+            "--missing-only", action="store_true",
+            help="Only build rows for articles that have none yet."
+        )
+
+    def handle(self, *args, **options):
+        chunk = options["chunk_size"]
+        ids = Article.objects.order_by("id").values_list("id", flat=True)
+        if options["missing_only"]:
+            ids = ids.filter(listing__isnull=True)
+
+        last_id, n = 0, 0
+        while True:
+            batch = list(ids.filter(id__gt=last_id)[:chunk])
+            if not batch:
+                break
+            listing.sync(batch)
+            last_id = batch[-1]
+            n += len(batch)
+        self.stdout.write(f"Synced {n} listing rows.")
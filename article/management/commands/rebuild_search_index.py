@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from article.models import Article, ArticleTranslation
+from article import search
+
+
+class Command(BaseCommand):
+    help = "(Re)build the full-text search vectors for Article and ArticleTranslation."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Rows fetched per chunk (default 500)."
+        )
+        parser.add_argument(
+            "--missing-only", action="store_true",
+            help="Only index rows whose search_vector is still empty."
+        )
+
+    def handle(self, *args, **options):
+        chunk = options["chunk_size"]
+        missing_only = options["missing_only"]
+
+        arts = Article.objects.only("id", "title", "text").order_by("id")
+        trs = ArticleTranslation.objects.only("id", "title_translated", "text_translated").order_by("id")
+        if missing_only:
+            arts = arts.filter(search_vector__isnull=True)
+            trs = trs.filter(search_vector__isnull=True)
+
+        n = 0
+        for a in arts.iterator(chunk_size=chunk):
+            search.index_article(a)
+            n += 1
+        self.stdout.write(f"Indexed {n} articles.")
+
+        n = 0
+        for tr in trs.iterator(chunk_size=chunk):
+            search.index_translation(tr)
+            n += 1
+        self.stdout.write(f"Indexed {n} translations.")
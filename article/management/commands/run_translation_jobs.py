@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from article.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Worker: process queued TranslationJob rows (article auto-translation)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Drain the queue once and exit instead of polling."
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=2.0,
+            help="Seconds to wait between polls when the queue is empty (default 2)."
+        )
+        parser.add_argument(
+            "--max-jobs", type=int, default=0,
+            help="Exit after this many jobs (default 0 = no limit)."
+        )
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        sleep = options["sleep"]
+        max_jobs = options["max_jobs"]
+
+        done = 0
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(sleep)
+                continue
+
+            ok = run_job(job)
+            done += 1
+            if ok:
+                self.stdout.write(f"[{job.article_id}:{job.language}] translated.")
+            else:
+                self.stderr.write(f"[{job.article_id}:{job.language}] FAILED ({job.status}): {job.error}")
+
+            if max_jobs and done >= max_jobs:
+                break
+
+        self.stdout.write(f"Processed {done} jobs.")
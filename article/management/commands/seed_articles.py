@@ -0,0 +1,192 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from taggit.models import Tag, TaggedItem
+
+from article import changelog, digest_cache, facets, listing, page_cache, search
+from article.canonical import canonical_key
+from article.models import Article, ArticleTranslation
+from article.text import text_columns
+
+COMPANIES = [
+    "トヨタ自動車", "ソニーグループ", "日立製作所", "三菱商事", "ソフトバンクグループ", "任天堂",
+    "パナソニック", "キーエンス", "ファーストリテイリング", "東京エレクトロン", "三井住友FG", "日本製鉄",
+    "NTT", "KDDI", "本田技研工業", "武田薬品工業", "信越化学工業", "ダイキン工業", "伊藤忠商事", "村田製作所",
+]
+TOPICS = [
+    "EV電池", "半導体製造装置", "生成AI", "データセンター", "再生可能エネルギー", "水素", "海外工場",
+    "自社株買い", "賃上げ", "サプライチェーン", "新型スマートフォン", "脱炭素", "インバウンド需要", "円安",
+]
+ACTIONS = [
+    "に1000億円投資へ", "を増産", "で提携", "の新会社を設立", "事業を売却へ", "で最高益", "の計画を上方修正",
+    "を北米で拡大", "を中国で縮小", "に参入", "の開発を加速", "で値上げ",
+]
+SENTENCES = [
+    "{company}は{date}、{topic}を巡る新たな経営計画を発表した。",
+    "関係者によると、投資額は今後3年間で合計{amount}億円規模になる見通しだ。",
+    "同社の{topic}関連事業の売上高は前年同期比{pct}%増と、市場予想を上回った。",
+    "競合各社も{topic}分野への投資を強化しており、受注競争は一段と激しくなりそうだ。",
+    "円安による輸出採算の改善が業績を押し上げた一方、原材料価格の高止まりが利益を圧迫している。",
+    "{company}の社長は記者会見で「中長期の成長の柱に育てたい」と述べた。",
+    "アナリストの間では、{topic}需要の持続性を慎重にみる声も出ている。",
+    "政府は{topic}の国内生産を後押しするため、補助金の拡充を検討している。",
+    "株式市場では発表を受けて{company}株が一時{pct}%上昇した。",
+    "生産拠点の分散を進め、地政学リスクへの備えを強める。",
+]
+# translations: (title templates, body sentences, topic names in TOPICS order)
+TRANSLATIONS = {
+    "en": (
+        ["{company} to invest in {topic}", "{company} posts record profit on {topic}",
+         "{company} expands {topic} business overseas"],
+        ["{company} announced a new business plan for {topic}.",
+         "Sales in the segment rose {pct}% from a year earlier, beating market forecasts.",
+         "Rivals are also stepping up investment in {topic}, intensifying competition.",
+         "Analysts remain cautious about how long demand will last."],
+        ["EV batteries", "chipmaking equipment", "generative AI", "data centers", "renewable energy",
+         "hydrogen", "overseas plants", "share buybacks", "wage increases", "supply chains",
+         "new smartphones", "decarbonization", "inbound tourism", "the weak yen"],
+    ),
+    "zh": (
+        ["{company}将投资{topic}", "{company}{topic}业务创历史新高", "{company}加速{topic}海外布局"],
+        ["{company}发布了有关{topic}的新经营计划。",
+         "该业务销售额同比增长{pct}%，超出市场预期。",
+         "竞争对手也在加大对{topic}领域的投资，竞争日趋激烈。",
+         "分析人士对需求能否持续持谨慎态度。"],
+        ["电动汽车电池", "半导体设备", "生成式AI", "数据中心", "可再生能源", "氢能", "海外工厂",
+         "股票回购", "加薪", "供应链", "新款智能手机", "脱碳", "入境游需求", "日元贬值"],
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic articles (Japanese bodies, tags, en/zh translations) with bulk inserts, "
+        "for benchmarks (see bench_endpoints). Derived columns, search vectors, the listing read "
+        "model and the change log are filled in as ingest would."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=1000, help="Articles to create (default 1000).")
+        parser.add_argument("--tags", type=int, default=20, help="Distinct tags to use (default 20).")
+        parser.add_argument(
+            "--translated", type=float, default=0.5,
+            help="Share of articles that get en and zh translations (default 0.5)."
+        )
+        parser.add_argument(
+            "--days", type=int, default=90,
+            help="Spread publish dates over this many days back from today (default 90)."
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows per bulk insert (default 500).")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed, for repeatable data.")
+
+    def handle(self, *args, **options):
+        n, chunk = options["articles"], max(1, options["chunk_size"])
+        days = options["days"]
+        if min(n, options["tags"], days) < 1:
+            raise CommandError("--articles, --tags and --days must be at least 1.")
+        rng = random.Random(options["seed"])
+        run = uuid.UUID(int=rng.getrandbits(128)).hex[:8]   # keeps urls/slugs unique across runs
+        user = self._user()
+        tags = self._tags(options["tags"])
+        ct = ContentType.objects.get_for_model(Article)
+        today = timezone.localdate()
+
+        made = translated = 0
+        while made < n:
+            size = min(chunk, n - made)
+            with transaction.atomic():
+                articles = [
+                    self._article(rng, user, run, made + i, today - timedelta(days=rng.randrange(days)))
+                    for i in range(size)
+                ]
+                Article.objects.bulk_create(articles)
+                for a in articles:
+                    a.search_vector = None  # written by the INSERT; drop the expression
+                listing.create_for(articles)
+                changelog.record("article", "insert", [(a.id, a.id) for a in articles])
+
+                TaggedItem.objects.bulk_create([
+                    TaggedItem(content_type=ct, object_id=a.id, tag=tag)
+                    for a in articles for tag in rng.sample(tags, k=min(len(tags), rng.randint(1, 3)))
+                ])
+
+                translations = [
+                    tr for a in articles if rng.random() < options["translated"]
+                    for tr in self._translations(rng, a)
+                ]
+                ArticleTranslation.objects.bulk_create(translations)
+                for tr in translations:
+                    tr.search_vector = None
+                listing.sync({tr.article_id for tr in translations})
+                changelog.record("translation", "insert", [(tr.id, tr.article_id) for tr in translations])
+            made += size
+            translated += len(translations)
+            self.stdout.write(f"-- {made}/{n} articles")
+
+        # bulk inserts send no signals
+        digest_cache.invalidate(new_tag=True)
+        facets.invalidate()
+        page_cache.purge(page_cache.LIST, page_cache.WEEKLY)
+        self.stdout.write(f"Created {made} articles, {translated} translations, {len(tags)} tags.")
+
+    def _user(self):
+        User = get_user_model()
+        user = User.objects.filter(id=1).first()   # the clipper account ingest writes as
+        if user is None:
+            user, _ = User.objects.get_or_create(username="seed")
+        return user
+
+    def _tags(self, m):
+        names = COMPANIES + TOPICS
+        names = names[:m] + [f"テーマ{i}" for i in range(m - len(names))]
+        existing = {t.name: t for t in Tag.objects.filter(name__in=names)}
+        for name in names:
+            if name not in existing:
+                existing[name], _ = Tag.objects.get_or_create(name=name)  # save() builds a unique slug
+        return [existing[name] for name in names]
+
+    def _article(self, rng, user, run, i, publish):
+        company, topic = rng.choice(COMPANIES), rng.choice(TOPICS)
+        title = f"{company}、{topic}{rng.choice(ACTIONS)}"
+        words = {"company": company, "topic": topic, "date": f"{publish.month}月{publish.day}日"}
+        paragraphs = [
+            "".join(
+                rng.choice(SENTENCES).format(**words, amount=rng.randint(50, 5000), pct=rng.randint(1, 40))
+                for _ in range(rng.randint(3, 6))
+            )
+            for _ in range(rng.randint(3, 8))
+        ]
+        text = "".join(f"<p>{p}</p>" for p in paragraphs)
+        url = f"https://example.com/seed/{run}/{i}"
+        article = Article(
+            title=title, slug=f"{slugify(title, allow_unicode=True)}-{run}-{i}",
+            url=url, canonical_key=canonical_key(url), text=text, **text_columns(text),
+            publish=publish, user=user, search_vector=search.article_vector(title, text),
+        )
+        article.seed_words = (company, TOPICS.index(topic))
+        return article
+
+    def _translations(self, rng, article):
+        company, topic_index = article.seed_words
+        out = []
+        for lang, (titles, sentences, topics) in TRANSLATIONS.items():
+            words = {"company": company, "topic": topics[topic_index]}
+            title = rng.choice(titles).format(**words)
+            text = "".join(
+                "<p>" + " ".join(rng.choice(sentences).format(**words, pct=rng.randint(1, 40))
+                                 for _ in range(rng.randint(3, 5))) + "</p>"
+                for _ in range(rng.randint(2, 5))
+            )
+            out.append(ArticleTranslation(
+                article=article, language=lang, title_translated=title, text_translated=text,
+                **text_columns(text), search_vector=search.translation_vector(title, text),
+            ))
+        return out
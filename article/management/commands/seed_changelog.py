@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from article.models import Article, ArticleTranslation, ChangeLogEntry
+from article import changelog
+
+
+class Command(BaseCommand):
+    help = (
+        "Append an 'insert' change log entry for every existing article and translation, "
+        "so replicas syncing from seq 0 also receive rows written before the log existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Rows per chunk (default 1000)."
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Seed even if the log already has entries (replicas will see duplicates)."
+        )
+
+    def handle(self, *args, **options):
+        if ChangeLogEntry.objects.exists() and not options["force"]:
+            raise CommandError("The change log is not empty; use --force to seed anyway.")
+        chunk = max(1, options["chunk_size"])
+
+        for model, name, article_field in (
+            (Article, "article", "id"),
+            (ArticleTranslation, "translation", "article_id"),
+        ):
+            rows = model.objects.order_by("id").values_list("id", article_field)
+            last_id, n = 0, 0
+            while True:
+                batch = list(rows.filter(id__gt=last_id)[:chunk])
+                if not batch:
+                    break
+                changelog.record(name, "insert", batch)
+                last_id = batch[-1][0]
+                n += len(batch)
+            self.stdout.write(f"Seeded {n} {name} entries.")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from article.models import TranslationMemory
+from article import translation_memory as tm
+
+
+class Command(BaseCommand):
+    help = "Show translation-memory statistics, or evict / clear entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--evict", type=int, nargs="?", const=tm.MAX_ENTRIES, default=None,
+            help=f"Trim to N entries, least recently used first (default {tm.MAX_ENTRIES})."
+        )
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Delete every entry."
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            n, _ = TranslationMemory.objects.all().delete()
+            self.stdout.write(f"Deleted {n} entries.")
+            return
+        if options["evict"] is not None:
+            n = tm.evict(options["evict"])
+            self.stdout.write(f"Evicted {n} entries.")
+
+        rows = (
+            TranslationMemory.objects
+            .values("language", "provider")
+            .annotate(entries=Count("id"), hits=Sum("hits"))
+            .order_by("language", "provider")
+        )
+        for r in rows:
+            self.stdout.write(
+                f"{r['language']} {r['provider']}: {r['entries']} entries, {r['hits'] or 0} hits"
+            )
+        self.stdout.write(f"Total: {TranslationMemory.objects.count()} entries (cap {tm.MAX_ENTRIES}).")
@@ -2,21 +2,71 @@
 from django.db import models
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 from django.db.models import Q
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from taggit.managers import TaggableManager
 
+from .canonical import canonical_key
+from .text import text_columns
+
 LANG_CHOICES = (
     ("ja", "Japanese"),
     ("zh", "Chinese"),
     ("en", "English"),
 )
 
-class Article(models.Model):
+class ArticleQuerySet(models.QuerySet):
+    def listing(self):
+        """Rows for title-only pages: the body and search vector stay in the database."""
+        return self.defer("text", "text_plain", "search_vector")
+
+
+class ArticleTranslationQuerySet(models.QuerySet):
+    def listing(self):
+        """Translations without their (raw outerHTML) bodies."""
+        return self.defer("text_translated", "text_plain", "search_vector")
+
+
+class DerivedColumnsMixin:
+    """
+    Stored columns computed from a source field on save():
+    derived_columns maps source field -> fn(value) -> {column: value}
+    (or the name of a method taking the value). Skipped when the source is
+    deferred or not among update_fields.
+    """
+    derived_columns = {}
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        deferred = self.get_deferred_fields()
+        for source, fn in self.derived_columns.items():
+            if source in deferred or (update_fields is not None and source not in update_fields):
+                continue
+            if isinstance(fn, str):
+                fn = getattr(self, fn)
+            values = fn(getattr(self, source))
+            for column, value in values.items():
+                setattr(self, column, value)
+            if update_fields is not None:
+                update_fields = {*update_fields, *values}
+        if update_fields is not None:
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
+
+class Article(DerivedColumnsMixin, models.Model):
     title = models.CharField(max_length=250)    
     language = models.CharField(max_length=2, choices=LANG_CHOICES, default="ja")
     slug = models.SlugField(max_length=250, unique_for_date='publish', allow_unicode=True)
     url = models.URLField(max_length=2000, blank=True)
+    # dedup key derived from url: 'nikkei:<ID>' or 'url:<sha1>' (see article.canonical)
+    canonical_key = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     text = models.TextField()
+    # computed from text on save (article.text.text_columns); NULL = not computed yet
+    text_plain = models.TextField(null=True, blank=True, editable=False)
+    excerpt = models.CharField(max_length=200, null=True, blank=True, editable=False)
     publish = models.DateField()
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -24,13 +74,25 @@ class Article(models.Model):
         on_delete=models.CASCADE
     )
     created = models.DateTimeField(auto_now_add=True)
+    # bumped on save and on translation/tag changes (article.api); the API changefeed's order
+    updated = models.DateTimeField(auto_now=True, db_index=True)
     tags = TaggableManager()
+    # bigram-tokenized title (A) + text (B), maintained by article.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
+
+    derived_columns = {
+        "url": "_canonical_columns",
+        "text": text_columns,
+    }
 
     class Meta:
         ordering = ['-publish', '-created']
         indexes = [
             models.Index(fields=['language']),  
             models.Index(fields=['-publish', '-created']),
+            GinIndex(fields=['search_vector'], name='article_search_gin'),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -52,6 +114,15 @@ class Article(models.Model):
             args=[self.publish.year, self.publish.month, self.publish.day, self.slug]
         )
 
+    def _canonical_columns(self, url):
+        key = canonical_key(url)
+        if key and key != self.canonical_key and (
+            Article.objects.filter(canonical_key=key).exclude(pk=self.pk).exists()
+        ):
+            # another row owns the key (a duplicate backfill_canonical_keys left NULL): stay unkeyed
+            key = None
+        return {"canonical_key": key}
+
     # helpers for translated fields
     def get_translated(self, lang: str):
         """Return (title, text) for the given lang, falling back to source when missing."""
@@ -66,18 +137,28 @@ class Article(models.Model):
         return self.title, self.text
 
 
-class ArticleTranslation(models.Model):
+class ArticleTranslation(DerivedColumnsMixin, models.Model):
     article = models.ForeignKey(Article, related_name="translations", on_delete=models.CASCADE)
     language = models.CharField(max_length=2, choices=LANG_CHOICES)
     title_translated = models.CharField(blank=True, null=True, max_length=300)
     text_translated = models.TextField()
+    # computed from text_translated on save (article.text.text_columns)
+    text_plain = models.TextField(null=True, blank=True, editable=False)
+    excerpt = models.CharField(max_length=200, null=True, blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ArticleTranslationQuerySet.as_manager()
+
+    derived_columns = {"text_translated": text_columns}
 
     class Meta:
         unique_together = ("article", "language")
         indexes = [
             models.Index(fields=["language", "updated"]),
+            models.Index(fields=["updated"]),
+            GinIndex(fields=["search_vector"], name="articletranslation_search_gin"),
         ]
         constraints = [
             models.CheckConstraint(                            # <-- DB-level whitelist
@@ -87,4 +168,119 @@ class ArticleTranslation(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.article.slug} [{self.language}]"
\ No newline at end of file
+        return f"{self.article.slug} [{self.language}]"
+
+class ArticleListing(models.Model):
+    """
+    Denormalized list row per article: titles per language + which
+    translations exist. Read by the list pages, admin changelist and weekly
+    digest instead of joining translations; kept current by article.listing.
+    """
+    article = models.OneToOneField(Article, primary_key=True, related_name="listing", on_delete=models.CASCADE)
+    publish = models.DateField()
+    created = models.DateTimeField()
+    title_ja = models.CharField(max_length=250)
+    title_en = models.CharField(max_length=300, blank=True)
+    title_zh = models.CharField(max_length=300, blank=True)
+    has_ja = models.BooleanField(default=False)
+    has_en = models.BooleanField(default=False)
+    has_zh = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-publish", "-created"]),
+        ]
+
+    def __str__(self):
+        return self.title_ja
+
+    def title_for(self, lang: str) -> str:
+        """Title in lang, falling back to the source title."""
+        return getattr(self, f"title_{lang}", "") or self.title_ja
+
+
+class TranslationJob(models.Model):
+    """Queued machine translation of one article into one language (one row per pair)."""
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    article = models.ForeignKey(Article, related_name="translation_jobs", on_delete=models.CASCADE)
+    language = models.CharField(max_length=2, choices=LANG_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)  # retry backoff
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("article", "language")
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} [{self.language}] {self.status}"
+
+    @property
+    def is_pending(self):
+        return self.status in ("pending", "running")
+
+
+class TranslationMemory(models.Model):
+    """Provider output cached per normalized source text (see article.translation_memory)."""
+    source_hash = models.CharField(max_length=64)
+    language = models.CharField(max_length=2, choices=LANG_CHOICES)
+    provider = models.CharField(max_length=100)
+    source_text = models.TextField()
+    translated = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_hash", "language", "provider"],
+                name="unique_translation_memory_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["last_used"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source_text[:40]} [{self.language}] {self.provider}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only log of writes to articles, translations and tag assignments,
+    read by downstream replicas (see article.changelog). seq increases in
+    commit order, so "everything after seq N" is a stable cursor.
+    """
+    MODEL_CHOICES = (
+        ("article", "Article"),
+        ("translation", "Article translation"),
+        ("tags", "Tag assignments"),
+    )
+    ACTION_CHOICES = (
+        ("insert", "Insert"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+    )
+
+    seq = models.BigAutoField(primary_key=True)
+    at = models.DateTimeField(default=timezone.now)
+    model = models.CharField(max_length=12, choices=MODEL_CHOICES)
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    # plain ids, not foreign keys: entries outlive the rows they describe
+    object_id = models.BigIntegerField()
+    article_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"#{self.seq} {self.model} {self.object_id} {self.action}"
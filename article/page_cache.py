@@ -0,0 +1,236 @@
+# article/page_cache.py
+"""
+Full-page cache for anonymous readers, purged by surrogate key.
+
+The list, detail and weekly pages (see @cached_page in article/views.py)
+are stored per (URL, language, day) in the "digest" cache together with
+the surrogate keys they were built from:
+
+    article:<id>      detail page of the article, list pages showing it
+    date:<YYYY-MM-DD> detail pages of that day, weekly pages covering it
+    tag:<slug>        detail pages carrying the tag, ?tag=<slug> lists
+    lang:<code>       every page rendered in that language
+    list / weekly     every article list / weekly page
+
+Each key has a write stamp ("page:sk:<key>", time_ns of the last purge).
+A page is served only while all its keys still have the stamps it was
+stored with, so a hit costs two cache reads and no query, and purge()
+just sets new stamps: nothing has to be found or deleted. A page whose
+keys were purged while it was rendering is not stored.
+
+Writes purge through signals (ArticleConfig.ready: ingest views, admin,
+taggit) or explicitly on bulk paths. Responses carry the keys in a
+Surrogate-Key header and a short shared-cache lifetime
+(PAGE_CACHE_PROXY_MAX_AGE); with PAGE_CACHE_PURGE_HOOK set, purged keys are
+also passed to that callable after commit, e.g. http_purge below for a
+proxy that purges by surrogate key (Varnish xkey, nginx + lua, a CDN).
+"""
+import hashlib
+import logging
+import time
+import urllib.request
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+
+from . import perf
+from .digest_cache import CACHE_ALIAS
+from .lang import get_lang
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = getattr(settings, "ARTICLE_PAGE_CACHE_TIMEOUT", 24 * 60 * 60)
+PROXY_MAX_AGE = getattr(settings, "PAGE_CACHE_PROXY_MAX_AGE", 60)
+PURGE_HOOK = getattr(settings, "PAGE_CACHE_PURGE_HOOK", "")
+PURGE_URL = getattr(settings, "PAGE_CACHE_PURGE_URL", "")
+
+LIST = "list"
+WEEKLY = "weekly"
+
+
+def article_key(article_id) -> str:
+    return f"article:{article_id}"
+
+
+def date_key(d) -> str:
+    # same conversion DateField applies on save (an aware datetime -> its local date)
+    return f"date:{models.DateField().to_python(d).isoformat()}"
+
+
+def tag_key(slug) -> str:
+    return f"tag:{slug}"
+
+
+def lang_key(lang) -> str:
+    return f"lang:{lang}"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _stamp_key(key) -> str:
+    return f"page:sk:{key}"
+
+
+def _page_key(request, lang) -> str:
+    # the day is part of the key: list facets and the default weekly window move with it
+    url = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return f"page:{url}:{lang}:{timezone.localdate().isoformat()}"
+
+
+# -----------------------------
+# Reading / storing
+# -----------------------------
+def add_keys(request, *keys) -> None:
+    """Tag the page being rendered (no-op outside @cached_page)."""
+    if getattr(request, "surrogate_keys", None) is not None:
+        request.surrogate_keys.update(keys)
+
+
+def skip(request) -> None:
+    """Don't store the page being rendered."""
+    request.surrogate_keys = None
+
+
+def _public(response, keys) -> None:
+    response["Surrogate-Key"] = " ".join(sorted(keys))
+    patch_cache_control(response, public=True, max_age=0, s_maxage=PROXY_MAX_AGE)
+
+
+def get_page(request, lang):
+    """The cached response for this URL/language, or None."""
+    entry = _cache().get(_page_key(request, lang))
+    if entry is not None:
+        stamps = _cache().get_many([_stamp_key(k) for k in entry["stamps"]])
+        if any(stamps.get(_stamp_key(k)) != s for k, s in entry["stamps"].items()):
+            entry = None
+    perf.cache_lookup("page", entry is not None)
+    if entry is None:
+        return None
+    response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    _public(response, entry["stamps"])
+    return response
+
+
+def set_page(request, lang, response, keys, started) -> None:
+    """Store a rendered page unless one of its keys was purged after `started`."""
+    stamp_keys = [_stamp_key(k) for k in keys]
+    for key in set(stamp_keys) - _cache().get_many(stamp_keys).keys():
+        _cache().add(key, 0, None)   # never purged (or evicted): any page built now is current
+    stamps = _cache().get_many(stamp_keys)
+    if len(stamps) != len(stamp_keys) or any(s > started for s in stamps.values()):
+        return
+    _cache().set(_page_key(request, lang), {
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "stamps": {k: stamps[_stamp_key(k)] for k in keys},
+    }, TIMEOUT)
+
+
+def cached_page(view=None, *, unless=None):
+    """
+    Serve anonymous GETs of `view` from the page cache. The view tags what it
+    renders with add_keys(request, ...); `unless(request)` -> True skips the
+    cache (e.g. file exports).
+    """
+    if view is None:
+        return lambda v: cached_page(v, unless=unless)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ("GET", "HEAD")
+            or (unless and unless(request))
+            or request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+        lang = get_lang(request)
+        response = get_page(request, lang)
+        if response is not None:
+            return response
+
+        started = time.time_ns()
+        request.surrogate_keys = {lang_key(lang)}
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if request.surrogate_keys is not None and response.status_code == 200 and not response.streaming:
+            set_page(request, lang, response, request.surrogate_keys, started)
+            _public(response, request.surrogate_keys)
+        return response
+
+    return wrapper
+
+
+# -----------------------------
+# Purging
+# -----------------------------
+def _bump(keys) -> None:
+    now = time.time_ns()
+    _cache().set_many({_stamp_key(k): now for k in keys}, None)
+
+
+def _after_commit(keys) -> None:
+    # stamp again: a page rendered from pre-commit rows after the first bump is dropped too
+    _bump(keys)
+    if PURGE_HOOK:
+        try:
+            import_string(PURGE_HOOK)(sorted(keys))
+        except Exception:
+            logger.exception("page cache purge hook failed for %s", sorted(keys))
+
+
+def purge(*keys) -> None:
+    """Invalidate every cached page tagged with one of these keys (here and, after commit, upstream)."""
+    keys = {k for k in keys if k}
+    if not keys:
+        return
+    _bump(keys)
+    transaction.on_commit(lambda: _after_commit(keys))
+
+
+def touch(*article_ids) -> None:
+    """Purge the pages showing these articles (call after bulk writes that skip signals)."""
+    purge(*(article_key(i) for i in article_ids if i is not None))
+
+
+def http_purge(keys) -> None:
+    """PAGE_CACHE_PURGE_HOOK for proxies that take `PURGE` + a Surrogate-Key header."""
+    if not PURGE_URL:
+        return
+    req = urllib.request.Request(PURGE_URL, method="PURGE", headers={"Surrogate-Key": " ".join(keys)})
+    urllib.request.urlopen(req, timeout=2).close()
+
+
+# signal receivers (connected in ArticleConfig.ready)
+def article_changed(sender, instance, **kwargs):
+    purge(LIST, article_key(instance.pk), instance.publish and date_key(instance.publish))
+
+
+def translation_changed(sender, instance, **kwargs):
+    touch(instance.article_id)
+
+
+def tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    from taggit.models import Tag
+
+    if reverse:
+        # tag.<articles>.add(...): instance is the Tag
+        purge(LIST, tag_key(instance.slug), *(article_key(i) for i in pk_set or ()))
+        return
+    slugs = Tag.objects.filter(pk__in=pk_set).values_list("slug", flat=True) if pk_set else []
+    purge(LIST, article_key(instance.pk), date_key(instance.publish), *(tag_key(s) for s in slugs))
+
+
+def tag_changed(sender, instance, **kwargs):
+    """Tag renamed/deleted (taggit admin): lists, weekly sections and its detail pages."""
+    purge(LIST, WEEKLY, tag_key(instance.slug))
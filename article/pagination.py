@@ -0,0 +1,153 @@
+# article/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET n, a page is "the next page_size rows after this row" in
+the queryset's ordering, so page 500 costs the same index range scan as
+page 1 and no COUNT(*) is needed. The position is carried in an opaque
+token (urlsafe base64 of the boundary row's sort values + direction).
+
+The ordering must be total: the primary key is appended as a tiebreaker.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, direction: str) -> str:
+    raw = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    data = json.dumps([direction, raw], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """-> (direction, values); raises InvalidCursor on garbage."""
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        direction, values = json.loads(data)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if direction not in ("n", "p") or not isinstance(values, list):
+        raise InvalidCursor("malformed cursor")
+    return direction, values
+
+
+def _parse_ordering(ordering):
+    """['-publish', 'id'] -> [('publish', True), ('id', False)]  (True = descending)"""
+    return [(f.lstrip("-"), f.startswith("-")) for f in ordering]
+
+
+def _after(fields, values) -> Q:
+    """Rows strictly after `values` in the given ordering (lexicographic)."""
+    cond = Q(pk__in=[])
+    for i in reversed(range(len(fields))):
+        name, desc = fields[i]
+        step = Q(**{f"{name}__{'lt' if desc else 'gt'}": values[i]})
+        ties = Q(**{name: v for (name, _), v in zip(fields[:i], values[:i])})
+        cond = (ties & step) | cond
+    # redundant bound on the leading column so the planner gets an index range
+    name, desc = fields[0]
+    return Q(**{f"{name}__{'lte' if desc else 'gte'}": values[0]}) & cond
+
+
+class CursorPage:
+    """Duck-types the bits of django.core.paginator.Page the templates use."""
+
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page: int, ordering):
+        ordering = list(ordering)
+        if ordering[-1].lstrip("-") not in ("pk", "id"):
+            ordering.append("-id" if ordering[-1].startswith("-") else "id")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = _parse_ordering(ordering)
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name, _ in self.fields]
+
+    def _output_field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        opts = self.queryset.model._meta
+        return opts.pk if name == "pk" else opts.get_field(name)
+
+    def _coerce(self, values) -> list:
+        """Cursor values -> python values of the ordering fields; InvalidCursor if any doesn't fit."""
+        if len(values) != len(self.fields):
+            raise InvalidCursor("cursor does not match the ordering")
+        out = []
+        for (name, _), value in zip(self.fields, values):
+            try:
+                value = self._output_field(name).to_python(value)
+            except (ValidationError, TypeError, ValueError) as e:
+                raise InvalidCursor(str(e))
+            if value is None:
+                raise InvalidCursor(f"no value for {name}")
+            out.append(value)
+        return out
+
+    def page(self, token: str | None = None) -> CursorPage:
+        """Page after/before the cursor (first page without one). Bad tokens -> first page."""
+        direction, values = "n", None
+        if token:
+            try:
+                direction, values = decode_cursor(token)
+                values = self._coerce(values)
+            except InvalidCursor:
+                direction, values = "n", None
+
+        if direction == "n":
+            qs = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                qs = qs.filter(_after(self.fields, values))
+            rows = list(qs[:self.per_page + 1])
+            more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_prev = values is not None
+            has_next = more
+        else:
+            # walk backwards with the ordering flipped, then restore display order
+            flipped = [(name, not desc) for name, desc in self.fields]
+            qs = self.queryset.order_by(*[("-" if desc else "") + name for name, desc in flipped])
+            qs = qs.filter(_after(flipped, values))
+            rows = list(qs[:self.per_page + 1])
+            more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_prev = more
+            has_next = True
+
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(self._key(rows[-1]), "n") if rows and has_next else None,
+            prev_cursor=encode_cursor(self._key(rows[0]), "p") if rows and has_prev else None,
+        )
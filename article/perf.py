@@ -0,0 +1,376 @@
+# article/perf.py
+"""
+Request-level performance instrumentation.
+
+PerfMiddleware times every request and, through a DB execute wrapper and
+the cache helpers, attributes to it:
+    wall time, DB query count + DB time, response bytes, cache hits/misses
+and then
+    - adds a Server-Timing header (visible in the browser's devtools),
+    - folds the numbers into per-view Prometheus metrics, served at /metrics
+      (along with the psycopg connection pool stats of every pooled alias),
+    - logs queries slower than SLOW_QUERY_MS to the "article.perf.slow_query"
+      logger (off by default).
+
+The per-request state lives in a ContextVar, so it follows the request into
+sync_to_async threads (async views, ASGI) and is re-entered around each chunk
+of a streaming response. The execute wrapper is installed on every new DB
+connection (connection_created, see ArticleConfig.ready) and does nothing
+outside a request.
+
+Each gunicorn worker keeps its own counters and writes them to
+METRICS_DIR/<pid>.json every few seconds; /metrics adds up all files, so
+whichever worker answers the scrape reports totals for the whole server.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger("article.perf.slow_query")
+
+SLOW_QUERY_MS = getattr(settings, "SLOW_QUERY_MS", 0)          # 0 = no slow query log
+SERVER_TIMING = getattr(settings, "SERVER_TIMING", True)
+METRICS_DIR = getattr(settings, "METRICS_DIR", "")             # "" = this process only
+METRICS_TOKEN = getattr(settings, "METRICS_TOKEN", "")         # "" = /metrics is open
+FLUSH_SECONDS = 5
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)          # N+1 regressions show up here
+
+_current = ContextVar("perf_request", default=None)
+
+
+class RequestStats:
+    __slots__ = ("start", "queries", "db_seconds", "cache")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache = {}         # name -> [hits, misses]
+
+
+# -----------------------------
+# Collection hooks
+# -----------------------------
+def execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning("slow query (%.1f ms): %s", elapsed * 1000, sql[:2000])
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver: time every query on this connection."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def cache_lookup(name: str, hit: bool) -> None:
+    """Record a hit/miss of one of our caches (page, digest, facets) for the current request."""
+    stats = _current.get()
+    if stats is not None:
+        stats.cache.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+
+# -----------------------------
+# Metrics (per process, merged across workers on /metrics)
+# -----------------------------
+_lock = threading.Lock()
+_counters = {}          # (name, labels) -> float
+_histograms = {}        # (name, labels) -> [bucket counts..., sum, count]
+_last_flush = 0.0
+
+_HELP = {
+    "clipping_http_requests_total": ("counter", "Requests by view, method and status."),
+    "clipping_http_request_duration_seconds": ("histogram", "Wall time per request."),
+    "clipping_db_queries_per_request": ("histogram", "DB queries per request."),
+    "clipping_db_queries_total": ("counter", "DB queries."),
+    "clipping_db_duration_seconds_total": ("counter", "Time spent in DB queries."),
+    "clipping_http_response_bytes_total": ("counter", "Response body bytes."),
+    "clipping_cache_requests_total": ("counter", "Cache lookups by cache and result."),
+    "clipping_db_pool_size": ("gauge", "Open pooled connections."),
+    "clipping_db_pool_available": ("gauge", "Pooled connections idle in the pool."),
+    "clipping_db_pool_max_size": ("gauge", "Pool size limit."),
+    "clipping_db_pool_requests_waiting": ("gauge", "Requests waiting for a pooled connection."),
+    "clipping_db_pool_requests_total": ("counter", "Connections borrowed from the pool."),
+    "clipping_db_pool_requests_queued_total": ("counter", "Borrows that had to wait."),
+    "clipping_db_pool_wait_seconds_total": ("counter", "Time spent waiting for a pooled connection."),
+    "clipping_db_pool_connections_total": ("counter", "Connections opened by the pool."),
+    "clipping_db_pool_connect_seconds_total": ("counter", "Time spent opening connections."),
+    "clipping_db_pool_connection_errors_total": ("counter", "Failed connection attempts."),
+    "clipping_db_pool_connections_lost_total": ("counter", "Connections found broken by the health check."),
+}
+# psycopg_pool get_stats() field -> (metric, scale)
+_POOL_STATS = {
+    "pool_size": ("clipping_db_pool_size", 1),
+    "pool_available": ("clipping_db_pool_available", 1),
+    "pool_max": ("clipping_db_pool_max_size", 1),
+    "requests_waiting": ("clipping_db_pool_requests_waiting", 1),
+    "requests_num": ("clipping_db_pool_requests_total", 1),
+    "requests_queued": ("clipping_db_pool_requests_queued_total", 1),
+    "requests_wait_ms": ("clipping_db_pool_wait_seconds_total", 0.001),
+    "connections_num": ("clipping_db_pool_connections_total", 1),
+    "connections_ms": ("clipping_db_pool_connect_seconds_total", 0.001),
+    "connections_errors": ("clipping_db_pool_connection_errors_total", 1),
+    "connections_lost": ("clipping_db_pool_connections_lost_total", 1),
+}
+_BUCKETS = {
+    "clipping_http_request_duration_seconds": DURATION_BUCKETS,
+    "clipping_db_queries_per_request": QUERY_COUNT_BUCKETS,
+}
+
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+
+def _inc(name, labels, value=1.0):
+    _counters[(name, labels)] = _counters.get((name, labels), 0.0) + value
+
+
+def _observe(name, labels, value):
+    buckets = _BUCKETS[name]
+    h = _histograms.setdefault((name, labels), [0] * (len(buckets) + 2))
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            h[i] += 1
+    h[-2] += value
+    h[-1] += 1
+
+
+def observe_request(view, method, status, stats, elapsed, size):
+    view_l = _labels(view=view)
+    with _lock:
+        _inc("clipping_http_requests_total", _labels(view=view, method=method, status=str(status)))
+        _observe("clipping_http_request_duration_seconds", view_l, elapsed)
+        _observe("clipping_db_queries_per_request", view_l, stats.queries)
+        _inc("clipping_db_queries_total", view_l, stats.queries)
+        _inc("clipping_db_duration_seconds_total", view_l, stats.db_seconds)
+        _inc("clipping_http_response_bytes_total", view_l, size)
+        for cache_name, (hits, misses) in stats.cache.items():
+            if hits:
+                _inc("clipping_cache_requests_total", _labels(cache=cache_name, result="hit"), hits)
+            if misses:
+                _inc("clipping_cache_requests_total", _labels(cache=cache_name, result="miss"), misses)
+    _maybe_flush()
+
+
+def _pool_stats():
+    """[[name, labels, value]] for each pooled alias (pool stats are per process, like ours)."""
+    out = []
+    for alias in settings.DATABASES:
+        if not connections[alias].settings_dict.get("OPTIONS", {}).get("pool"):
+            continue
+        stats = connections[alias].pool.get_stats()
+        for field, (name, scale) in _POOL_STATS.items():
+            out.append([name, [["alias", alias]], stats.get(field, 0) * scale])
+    return out
+
+
+def _snapshot():
+    with _lock:
+        counters = [[n, list(l), v] for (n, l), v in _counters.items()]
+        histograms = [[n, list(l), list(h)] for (n, l), h in _histograms.items()]
+    # pool gauges and counters are absolute: summing the workers' files gives server totals
+    return {"counters": counters + _pool_stats(), "histograms": histograms}
+
+
+def _maybe_flush(force=False):
+    global _last_flush
+    if not METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_SECONDS:
+        return
+    _last_flush = now
+    path = Path(METRICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f".{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(_snapshot()))
+    os.replace(tmp, path / f"{os.getpid()}.json")   # atomic: readers never see half a file
+
+
+def _collect():
+    """Counters/histograms of this process, or of every worker when METRICS_DIR is set."""
+    if not METRICS_DIR:
+        snapshots = [_snapshot()]
+    else:
+        _maybe_flush(force=True)
+        snapshots = []
+        for f in Path(METRICS_DIR).glob("*.json"):
+            try:
+                snapshots.append(json.loads(f.read_text()))
+            except (OSError, ValueError):
+                continue    # a worker replacing its file right now
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, h in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            acc = histograms.setdefault(key, [0] * len(h))
+            histograms[key] = [a + b for a, b in zip(acc, h)]
+    return counters, histograms
+
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    counters, histograms = _collect()
+    lines = []
+    for name, (kind, help_text) in _HELP.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind in ("counter", "gauge"):
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+        else:
+            buckets = _BUCKETS[name]
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                for bound, count in zip(buckets, h):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', f'{bound:g}')])} {count}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h[-1]}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]:g}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {h[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# -----------------------------
+# Middleware
+# -----------------------------
+def server_timing(stats, elapsed) -> str:
+    parts = [
+        f"app;dur={elapsed * 1000:.1f}",
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+    ]
+    for name, (hits, misses) in sorted(stats.cache.items()):
+        parts.append(f'cache-{name};desc="{hits} hit / {misses} miss"')
+    return ", ".join(parts)
+
+
+class PerfMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unmatched>"
+        elapsed = time.perf_counter() - stats.start
+        if SERVER_TIMING:
+            response["Server-Timing"] = server_timing(stats, elapsed)
+
+        if not response.streaming:
+            observe_request(view, request.method, response.status_code, stats, elapsed, len(response.content))
+            return response
+        if response.has_header("Content-Length"):
+            # a finished file (FileResponse): the server may send it with sendfile, bypassing iteration
+            observe_request(view, request.method, response.status_code, stats, elapsed,
+                            int(response["Content-Length"]))
+            return response
+
+        # streaming: the body (and its queries, e.g. weekly exports) is produced after
+        # we return; count it chunk by chunk and record once it is exhausted
+        if response.is_async:
+            response.streaming_content = self._astream(response.streaming_content, request, response, view, stats)
+        else:
+            response.streaming_content = self._stream(response.streaming_content, request, response, view, stats)
+        return response
+
+    @staticmethod
+    def _stream(content, request, response, view, stats):
+        size, it = 0, iter(content)
+        try:
+            while True:
+                token = _current.set(stats)
+                try:
+                    chunk = next(it, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            elapsed = time.perf_counter() - stats.start
+            observe_request(view, request.method, response.status_code, stats, elapsed, size)
+
+    @staticmethod
+    async def _astream(content, request, response, view, stats):
+        size, it = 0, aiter(content)
+        try:
+            while True:
+                token = _current.set(stats)
+                try:
+                    chunk = await anext(it, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            elapsed = time.perf_counter() - stats.start
+            observe_request(view, request.method, response.status_code, stats, elapsed, size)
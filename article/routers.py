@@ -0,0 +1,149 @@
+# article/routers.py
+"""
+Read replicas with read-your-writes stickiness.
+
+Every database alias other than "default" is a read replica (settings:
+POSTGRES_REPLICA_HOSTS). ReplicaRouter sends writes to the primary and
+reads to a random healthy replica, except when the read has to see the
+primary:
+
+    - inside a transaction on the primary (select_for_update in the
+      translation job queue, read-then-write ingest blocks),
+    - after this request/task wrote anything, or called pin_primary()
+      (the ingest views do, so dedup lookups never miss a fresh row),
+    - for DATABASE_STICKY_SECONDS after a client's write: the middleware
+      hands the client a short-lived cookie, so e.g. the clipper's follow-up
+      receive_translation or an editor's next page sees what they saved,
+    - when a replica lags more than DATABASE_REPLICA_MAX_LAG seconds or is
+      unreachable (checked at most every LAG_CHECK_SECONDS per process).
+
+Without replicas configured every method answers "default".
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = "default"
+STICKY_SECONDS = getattr(settings, "DATABASE_STICKY_SECONDS", 5)
+MAX_LAG = getattr(settings, "DATABASE_REPLICA_MAX_LAG", 5.0)
+LAG_CHECK_SECONDS = 2
+COOKIE_NAME = "db_primary"
+
+_pinned = ContextVar("db_primary_pinned", default=False)
+_wrote = ContextVar("db_primary_wrote", default=None)   # per-request [bool] (see middleware)
+
+_LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+_lag_checked = {}    # alias -> (monotonic time, lag in seconds or None if unreachable)
+
+
+def replicas() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def pin_primary() -> None:
+    """Route the rest of this request/task (reads included) to the primary."""
+    _pinned.set(True)
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind (0 when caught up or not a Postgres standby); None if down."""
+    checked = _lag_checked.get(alias)
+    now = time.monotonic()
+    if checked and now - checked[0] < LAG_CHECK_SECONDS:
+        return checked[1]
+    lag = 0.0
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        except DatabaseError:
+            lag = None
+    _lag_checked[alias] = (now, lag)
+    return lag
+
+
+def _primary_in_transaction() -> bool:
+    return connections[PRIMARY].in_atomic_block
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _pinned.get() or _primary_in_transaction():
+            return PRIMARY
+        healthy = [a for a in replicas() if (lag := replica_lag(a)) is not None and lag <= MAX_LAG]
+        return random.choice(healthy) if healthy else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote[0] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class PrimaryStickinessMiddleware:
+    """Per-request routing state + the sticky-primary cookie after writes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _enter(self, request):
+        try:
+            sticky = float(request.COOKIES.get(COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        return _pinned.set(sticky), _wrote.set([False])
+
+    @staticmethod
+    def _exit(tokens):
+        wrote = _wrote.get()[0]
+        _pinned.reset(tokens[0])
+        _wrote.reset(tokens[1])
+        return wrote
+
+    @staticmethod
+    def _finish(response, wrote):
+        if wrote and replicas():
+            response.set_cookie(COOKIE_NAME, f"{time.time() + STICKY_SECONDS:.0f}",
+                                max_age=STICKY_SECONDS, secure=settings.SESSION_COOKIE_SECURE,
+                                httponly=True, samesite="Lax")
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        tokens = self._enter(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = self._exit(tokens)
+        return self._finish(response, wrote)
+
+    async def __acall__(self, request):
+        tokens = self._enter(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = self._exit(tokens)
+        return self._finish(response, wrote)
@@ -0,0 +1,126 @@
+# article/search.py
+"""
+Full-text search for articles (Postgres tsvector + GIN).
+
+Japanese/Chinese have no word boundaries, so text is tokenized into
+overlapping character bigrams (東京都 -> 東京 京都) before it reaches
+Postgres; latin words and numbers are kept whole. The resulting token
+string is fed to to_tsvector('simple', ...) so Postgres does no stemming
+of its own and query-side tokens line up exactly with the stored ones.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils.html import strip_tags
+
+SEARCH_CONFIG = "simple"
+
+# CJK ideographs, hiragana, katakana (+ prolonged sound mark), hangul
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"([{_CJK}]+)|([^\W_{_CJK}]+)")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into search tokens: CJK runs -> bigrams, other words as-is."""
+    s = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(s):
+        if cjk:
+            if len(cjk) == 1:
+                tokens.append(cjk)
+            else:
+                tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        elif word:
+            tokens.append(word)
+    return tokens
+
+
+def search_document(text: str, html: bool = False) -> str:
+    """Token string ready for to_tsvector('simple', ...)."""
+    if html:
+        text = strip_tags(text or "")
+    return " ".join(tokenize(text))
+
+
+def build_query(q: str) -> SearchQuery | None:
+    """
+    AND of all query tokens. A lone CJK character can't match a bigram,
+    so it becomes a prefix query instead. Returns None for empty queries.
+    """
+    parts = []
+    for tok in tokenize(q):
+        term = "'" + tok.replace("'", "''") + "'"
+        if len(tok) == 1 and re.match(rf"[{_CJK}]", tok):
+            term += ":*"
+        parts.append(term)
+    if not parts:
+        return None
+    return SearchQuery(" & ".join(parts), config=SEARCH_CONFIG, search_type="raw")
+
+
+def _vector(title: str, body: str, html: bool = False):
+    return (
+        SearchVector(Value(search_document(title)), config=SEARCH_CONFIG, weight="A")
+        + SearchVector(Value(search_document(body, html=html)), config=SEARCH_CONFIG, weight="B")
+    )
+
+
+# -----------------------------
+# Incremental index maintenance
+# -----------------------------
+def article_vector(title: str, text: str):
+    """SQL expression for an Article's search_vector (usable in update() and bulk_create())."""
+    return _vector(title, text)
+
+
+def translation_vector(title: str, text: str):
+    """SQL expression for an ArticleTranslation's search_vector (body is HTML)."""
+    return _vector(title or "", text, html=True)
+
+
+def index_article(article) -> None:
+    """Recompute the search vector of one Article (single UPDATE)."""
+    from .models import Article
+    Article.objects.filter(pk=article.pk).update(
+        search_vector=article_vector(article.title, article.text)
+    )
+
+
+def index_translation(tr) -> None:
+    """Recompute the search vector of one ArticleTranslation (single UPDATE)."""
+    from .models import ArticleTranslation
+    ArticleTranslation.objects.filter(pk=tr.pk).update(
+        search_vector=translation_vector(tr.title_translated, tr.text_translated)
+    )
+
+
+# -----------------------------
+# Query side
+# -----------------------------
+def search_articles(queryset, q: str):
+    """
+    Filter an Article queryset by the search string and order by rank.
+    Matches on the article itself or on any of its translations.
+    """
+    from .models import Article, ArticleTranslation
+
+    query = build_query(q)
+    if query is None:
+        # nothing searchable (punctuation only)
+        return queryset.none()
+
+    # UNION of the two GIN lookups: an OR across the tables can't use either index
+    matches = Article.objects.filter(search_vector=query).order_by().values("id").union(
+        ArticleTranslation.objects.filter(search_vector=query).values("article_id")
+    )
+    return (
+        queryset
+        .filter(pk__in=matches)
+        # translation-only matches have no article vector: rank 0, sorted last.
+        # float8 so the value round-trips exactly through pagination cursors
+        .annotate(rank=Coalesce(Cast(SearchRank(F("search_vector"), query), FloatField()), Value(0.0)))
+        .order_by("-rank", "-publish", "-created")
+    )
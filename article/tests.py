@@ -1,3 +1,1391 @@
-from django.test import TestCase
+import hashlib
+import json
+import re
+import tempfile
+import zipfile
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from taggit.models import Tag
+
+from .models import (
+    Article, ArticleListing, ArticleTranslation, ChangeLogEntry, TranslationJob, TranslationMemory,
+)
+from . import (
+    bench, canonical, digest, digest_cache, exports, facets, page_cache, pagination, perf, routers, search,
+    translators, translation_memory, views,
+)
+from . import lang as languages
+from .digest import build_sections
+from .management.commands import bench_endpoints
+
+# settings.CACHES["digest"] is the deployment's shared file cache: tests must never clear it
+TEST_CACHES = {
+    **settings.CACHES,
+    digest_cache.CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "article-tests"},
+}
+
+
+def make_article(user, title, publish, tags=(), **kwargs):
+    a = Article.objects.create(
+        title=title, slug=title, text=kwargs.pop("text", "<p>本文</p>"),
+        publish=publish, user=user, **kwargs
+    )
+    if tags:
+        a.tags.add(*tags)
+    return a
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="clipper")
+        today = timezone.localdate()
+        cls.in_title = make_article(cls.user, "東京都の予算", today - timedelta(days=2))
+        cls.in_body = make_article(cls.user, "予算", today, text="<p>東京都が発表</p>")
+        cls.translated = make_article(cls.user, "大阪", today - timedelta(days=1))
+        cls.other = make_article(cls.user, "大阪の万博", today)
+        for a in (cls.in_title, cls.in_body, cls.translated, cls.other):
+            search.index_article(a)
+        search.index_translation(ArticleTranslation.objects.create(
+            article=cls.translated, language="en", title_translated="Tokyo budget",
+            text_translated="<p>Tokyo-2026</p>",
+        ))
+
+    def search(self, q):
+        return list(search.search_articles(Article.objects.all(), q).values_list("id", flat=True))
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize("東京都 Tokyo-2026！"), ["東京", "京都", "tokyo", "2026"])
+        self.assertEqual(search.tokenize("ＡＢＣ"), ["abc"])    # NFKC + lower
+
+    def test_title_ranks_above_body_and_translation_matches_last(self):
+        self.assertEqual(self.search("東京"), [self.in_title.id, self.in_body.id])
+        self.assertEqual(self.search("tokyo"), [self.translated.id])
+        self.assertEqual(self.search("2026"), [self.translated.id])
+        self.assertEqual(self.search("万"), [self.other.id])    # lone CJK char: prefix match
+        self.assertEqual(self.search("!?"), [])
+
+    def test_both_gin_indexes_are_used(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = search.search_articles(Article.objects.all(), "東京").explain()
+        self.assertIn("article_search_gin", plan)
+        self.assertIn("articletranslation_search_gin", plan)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class WeeklyNewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="clipper")
+        cls.today = timezone.localdate()
+
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+
+    def test_grouping_query_count_is_independent_of_tag_count(self):
+        ContentType.objects.get_for_model(Article)  # warm the CT cache
+        make_article(self.user, "a1", self.today, tags=["トヨタ"])
+        with self.assertNumQueries(2):
+            build_sections(self.today - timedelta(days=7), self.today)
+
+        for i in range(20):
+            make_article(self.user, f"b{i}", self.today - timedelta(days=i % 5), tags=[f"tag{i}", "Sony"])
+        with self.assertNumQueries(2):
+            grouped = build_sections(self.today - timedelta(days=7), self.today)
+        self.assertEqual(len(grouped), 22)
+
+    def test_grouping_order_and_empty_sections(self):
+        old = make_article(self.user, "old", self.today - timedelta(days=30), tags=["Zeta"])
+        a1 = make_article(self.user, "a1", self.today - timedelta(days=2), tags=["alpha", "Beta"])
+        a2 = make_article(self.user, "a2", self.today, tags=["alpha", "unknown"])
+
+        grouped = build_sections(self.today - timedelta(days=7), self.today)
+
+        ids = [[item.article_id for item in s.articles] for s in grouped]
+        self.assertEqual([s.tag_name for s in grouped], ["alpha", "Beta", "Zeta"])
+        self.assertEqual(ids, [[a2.id, a1.id], [a1.id], []])
+        self.assertNotIn(old.id, ids[0])
+
+        resp = self.client.get(reverse("article:weekly_news"), secure=True)
+        self.assertContains(resp, "今週主要なニュースなし", count=1)
+
+    def test_output_matches_the_pre_digest_view(self):
+        # sha256 of the fragment and word/document.xml rendered by the inline weekly_news view
+        # (before digest.build_sections / exports.render_docx) for this dataset
+        make_article(
+            self.user, "トヨタ、\n新型EVを発表", date(2024, 5, 8), tags=["トヨタ", "alpha"],
+            url="https://www.nikkei.com/article/DGXZQOUC0123A0R00C24A5000000/",
+            text="<p>トヨタ自動車は8日、" + "新型の電気自動車を発表した。" * 20 + "</p>",
+        )
+        make_article(self.user, "ソニー 決算", date(2024, 5, 3), tags=["Sony", "alpha"],
+                     url="https://example.com/sony", text="<div>ソニーは\t3日に決算を<br>発表。</div>")
+        make_article(self.user, "同日の記事", date(2024, 5, 3), tags=["alpha", "unknown"], text="")
+        make_article(self.user, "範囲外", date(2024, 4, 1), tags=["Zeta"])
+        url = reverse("article:weekly_news")
+        window = {"start": "2024-05-01", "end": "2024-05-08"}
+
+        html = self.client.get(url, window, secure=True).content.decode()
+        html = html[html.index("<section"):html.rindex("</section>") + len("</section>")]
+        self.assertEqual(hashlib.sha256(html.encode()).hexdigest(),
+                         "1af5a8d9b749212146325017985de147759a4cba3730312cbd335146e1af58e4", html)
+
+        resp = self.client.get(url, {**window, "export": "docx"}, secure=True)
+        with zipfile.ZipFile(BytesIO(b"".join(resp.streaming_content))) as z:
+            xml = z.read("word/document.xml").decode()
+        excerpt = ("トヨタ自動車は8日、" + "新型の電気自動車を発表した。" * 20)[:180] + " …"
+        links = ["原文", " (", "English translation", " / ", "中訳", ")"]
+        sony = ["2024-05-03", "ソニー 決算", "ソニーは 3日に決算を発表。", "原文"]
+        self.assertEqual(re.findall(r"<w:t(?: [^>]*)?>([^<]*)</w:t>", xml), [
+            "CP提携先企業動向まとめ", "2024年5月1日～8日", "日本正大光明 投資部",
+            "alpha", "2024-05-08", "トヨタ、 新型EVを発表", excerpt, *links,
+            "2024-05-03", "同日の記事", *sony,
+            "Sony", *sony,
+            "Zeta", "今週主要なニュースなし",
+            "トヨタ", "2024-05-08", "トヨタ、 新型EVを発表", excerpt, *links,
+        ])
+        self.assertEqual(hashlib.sha256(xml.encode()).hexdigest(),
+                         "f485c0459329ad0df9b38857605900b20662fecab600b752164326d2c373c9fb")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class WeeklyDigestCacheTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create(username="clipper")
+        self.today = timezone.localdate()
+        self.url = reverse("article:weekly_news")
+
+    def test_repeated_requests_hit_the_cache(self):
+        make_article(self.user, "a1", self.today, tags=["トヨタ"])
+        self.client.get(self.url, {"export": "docx"}, secure=True)
+        with self.assertNumQueries(0):
+            resp = self.client.get(self.url, {"export": "docx"}, secure=True)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_invalidate_only_rebuilds_windows_containing_the_date(self):
+        make_article(self.user, "a1", self.today, tags=["トヨタ"])
+        old_window = {"start": "2020-01-01", "end": "2020-01-08"}
+        self.client.get(self.url, secure=True)
+        self.client.get(self.url, old_window, secure=True)
+
+        make_article(self.user, "fresh-news", self.today, tags=["トヨタ"])
+        digest_cache.invalidate(self.today)
+
+        self.assertContains(self.client.get(self.url, secure=True), "fresh-news")
+        with self.assertNumQueries(0):
+            self.client.get(self.url, old_window, secure=True)
+
+    def test_new_tag_invalidates_every_window(self):
+        old_window = {"start": "2020-01-01", "end": "2020-01-08"}
+        self.client.get(self.url, old_window, secure=True)
+        make_article(self.user, "a1", self.today, tags=["BrandNew"])
+        digest_cache.invalidate(self.today, new_tag=True)
+        self.assertContains(self.client.get(self.url, old_window, secure=True), "BrandNew")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class WeeklyDocxExportTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        user = get_user_model().objects.create(username="clipper")
+        self.today = timezone.localdate()
+        for i in range(6):
+            make_article(user, f"記事{i}", self.today - timedelta(days=i), tags=["alpha", "beta"])
+        self.url = reverse("article:weekly_news")
+
+    def export_text(self, resp):
+        from docx import Document
+        self.assertTrue(resp.streaming)
+        return "\n".join(p.text for p in Document(BytesIO(b"".join(resp.streaming_content))).paragraphs)
+
+    def test_large_exports_stream_from_a_spooled_file_uncached(self):
+        with mock.patch.object(views, "WEEKLY_EXPORT_CACHE_MAX_BYTES", 0):
+            resp = self.client.get(self.url, {"export": "docx"}, secure=True)
+            text = self.export_text(resp)
+            self.assertIn("記事5", text)
+            self.assertEqual(resp["Content-Disposition"],
+                             f'attachment; filename="weekly_news_ja_{self.today:%Y%m%d}.docx"')
+            with self.assertNumQueries(2):  # not cached: rebuilt from the cursor
+                self.client.get(self.url, {"export": "docx"}, secure=True)
+
+    def test_row_cap_truncates(self):
+        with mock.patch.object(views, "WEEKLY_EXPORT_MAX_ROWS", 8):
+            text = self.export_text(self.client.get(self.url, {"export": "docx"}, secure=True))
+        self.assertIn("truncated after 8 articles", text)
+        self.assertEqual(text.count("記事"), 8)
+        sections = list(digest.iter_sections(self.today - timedelta(days=7), self.today, limit=8))
+        self.assertEqual([len(s.articles) for s in sections], [6, 2])
+        self.assertTrue(sections[-1].truncated)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class WeeklyExportFormatTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        user = get_user_model().objects.create(username="clipper")
+        self.today = timezone.localdate()
+        make_article(user, "記事*1", self.today, tags=["alpha"],
+                     url="https://www.nikkei.com/article/DGXZQOUC000001/")
+        Tag.objects.create(name="beta")
+        make_article(user, "unrelated", self.today - timedelta(days=30), tags=["beta"])
+        self.url = reverse("article:weekly_news")
+
+    def export(self, fmt):
+        resp = self.client.get(self.url, {"export": fmt}, secure=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp["Content-Type"], exports.RENDERERS[fmt].content_type)
+        self.assertIn(f'.{exports.RENDERERS[fmt].extension}"', resp["Content-Disposition"])
+        return b"".join(resp.streaming_content).decode("utf-8")
+
+    def test_json(self):
+        data = json.loads(self.export("json"))
+        self.assertEqual([s["tag_name"] for s in data["sections"]], ["alpha", "beta"])
+        item = data["sections"][0]["articles"][0]
+        self.assertEqual((item["title"], item["publish"]), ("記事*1", self.today.isoformat()))
+        self.assertEqual(item["url_zh"], "https://www.nikkei.com/news/article-translation/?ng=DGXZQOUC000001&mta=c")
+        self.assertEqual(data["sections"][1]["articles"], [])
+        self.assertFalse(data["truncated"])
+
+    def test_csv_markdown_and_eml(self):
+        import csv
+        from email import message_from_string
+
+        rows = list(csv.reader(StringIO(self.export("csv").lstrip("﻿"))))
+        self.assertEqual(rows[0], list(exports.CSV_COLUMNS))
+        self.assertEqual(rows[1][:3], ["alpha", self.today.isoformat(), "記事*1"])
+        self.assertEqual(len(rows), 2)
+
+        md = self.export("md")
+        self.assertIn("## alpha\n", md)
+        self.assertIn("**記事\\*1**", md)
+        self.assertIn("## beta\n\n今週主要なニュースなし", md)
+
+        msg = message_from_string(self.export("eml"))
+        self.assertEqual(msg.get_content_type(), "text/html")
+        self.assertIn("<h2>alpha</h2>", msg.get_payload())
+
+    def test_unknown_format_is_rejected(self):
+        resp = self.client.get(self.url, {"export": "pdf"}, secure=True)
+        self.assertEqual(resp.status_code, 400)
+
+
+def stub_translator(title, body, lang):
+    return f"[{lang}] {title}", f"[{lang}] {body}"
+
+
+def record_purge(keys):
+    pass
+
+
+def failing_translator(title, body, lang):
+    raise RuntimeError("provider down")
+
+
+@override_settings(CACHES=TEST_CACHES)
+@override_settings(ARTICLE_TRANSLATOR="article.tests.stub_translator")
+class TranslationJobTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create(username="staff", is_staff=True)
+        self.article = make_article(self.staff, "記事", timezone.localdate(), text="<p>本文</p>")
+        self.client.force_login(self.staff)
+        self.client.get(reverse("article:set_lang"), {"lang": "en"}, secure=True)
+
+    def test_view_enqueues_and_worker_fills_in_translation(self):
+        url = self.article.get_absolute_url()
+        resp = self.client.get(url, secure=True)
+        self.assertTrue(resp.context["translation_pending"])
+        self.assertEqual(resp.context["display_title"], "記事")
+        self.client.get(url, secure=True)  # second open shares the job
+        self.assertEqual(TranslationJob.objects.filter(article=self.article, language="en").count(), 1)
+
+        call_command("run_translation_jobs", "--once", stdout=StringIO())
+
+        job = TranslationJob.objects.get(article=self.article, language="en")
+        self.assertEqual(job.status, "done")
+        resp = self.client.get(url, secure=True)
+        self.assertFalse(resp.context["translation_pending"])
+        self.assertEqual(resp.context["display_title"], "[en] 記事")
+
+    @override_settings(ARTICLE_TRANSLATOR="article.tests.failing_translator")
+    def test_failed_job_is_retried_then_marked_failed(self):
+        self.client.get(self.article.get_absolute_url(), secure=True)
+        for attempt in range(1, 4):
+            call_command("run_translation_jobs", "--once", stdout=StringIO(), stderr=StringIO())
+            job = TranslationJob.objects.get(article=self.article, language="en")
+            self.assertEqual(job.attempts, attempt)
+            # backoff: not claimable again until run_after
+            self.assertGreater(job.run_after, timezone.now())
+            TranslationJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+        call_command("run_translation_jobs", "--once", stdout=StringIO(), stderr=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.attempts, 3)
+        self.assertFalse(ArticleTranslation.objects.filter(article=self.article).exists())
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions: echoes 'T:<text>' (or a JSON array of them)."""
+    calls = []
+    fail_next = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        cls.calls.append(body)
+        if cls.fail_next:
+            cls.fail_next -= 1
+            self.send_response(500)
+            self.end_headers()
+            return
+        text = body["messages"][-1]["content"]
+        if text.startswith("["):
+            content = json.dumps([f"T:{t}" for t in json.loads(text)], ensure_ascii=False)
+        else:
+            content = f"T:{text}"
+        payload = json.dumps({
+            "id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BatchTranslateTitlesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubLLMHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubLLMHandler.calls = []
+        StubLLMHandler.fail_next = 0
+        user = get_user_model().objects.create(username="clipper")
+        self.rows = []
+        for i in range(23):
+            a = make_article(user, f"見出し{i}", timezone.localdate())
+            self.rows.append(ArticleTranslation.objects.create(
+                article=a, language="zh" if i % 2 else "en", text_translated="<div>x</div>"))
+        for patch in (
+            mock.patch.object(translators, "DEEPSEEK_BASE_URL", self.base_url),
+            mock.patch.object(translators, "OPENAI_BASE_URL", self.base_url),
+            mock.patch.object(translators, "OPENAI_API_KEY", "test"),
+            mock.patch.object(translators, "_openai_client", None),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command("batch_translate_titles", "--rate", "0", "--backoff", "0", *args,
+                     stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_titles_are_packed_per_call_and_bulk_written(self):
+        self.run_command("--limit", "0", "--batch-size", "5", "--chunk-size", "10")
+        for tr in ArticleTranslation.objects.select_related("article__listing"):
+            self.assertEqual(tr.title_translated, f"T:{tr.article.title}")
+            # the read model follows the bulk update
+            self.assertEqual(getattr(tr.article.listing, f"title_{tr.language}"), tr.title_translated)
+        # chunks of 10/10/3 rows, split per language into batches of <= 5 titles
+        self.assertEqual(len(StubLLMHandler.calls), 6)
+
+    def test_translation_memory_skips_provider_for_known_titles(self):
+        self.run_command("--limit", "0", "--batch-size", "50")
+        self.assertEqual(len(StubLLMHandler.calls), 2)
+        self.assertEqual(TranslationMemory.objects.count(), 23)
+
+        # a re-clip of the same headline (full-width digits, extra spaces) on another date
+        user = get_user_model().objects.get(username="clipper")
+        a = make_article(user, " 見出し１ ", timezone.localdate() - timedelta(days=3))
+        ArticleTranslation.objects.create(article=a, language="zh", text_translated="x")
+        ArticleTranslation.objects.update(title_translated=None)
+        self.run_command("--limit", "0")
+
+        self.assertEqual(len(StubLLMHandler.calls), 2)
+        self.assertEqual(ArticleTranslation.objects.get(article=a).title_translated, "T:見出し1")
+        self.assertEqual(TranslationMemory.objects.get(source_text="見出し1").hits, 1)
+
+    def test_memory_eviction_drops_least_recently_used(self):
+        for i in range(5):
+            translation_memory.store(f"t{i}", f"x{i}", "en", "p")
+        translation_memory.lookup("t0", "en", "p")
+        self.assertEqual(translation_memory.evict(2), 3)
+        self.assertEqual(
+            sorted(TranslationMemory.objects.values_list("source_text", flat=True)), ["t0", "t4"]
+        )
+
+    def test_memory_is_trimmed_every_n_stores_not_every_write(self):
+        translation_memory._stored[0] = 0
+        with (
+            mock.patch.object(translation_memory, "EVICT_EVERY", 3),
+            mock.patch.object(translation_memory, "MAX_ENTRIES", 2),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                translation_memory.store_many([("a", "A"), ("b", "B")], "en", "p")
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+            translation_memory.store("c", "C", "en", "p")
+        self.assertEqual(TranslationMemory.objects.count(), 2)
+        self.assertEqual(translation_memory._stored[0], 0)
+
+    def test_retry_and_resume_from_state_file(self):
+        StubLLMHandler.fail_next = 1
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = f"{tmp}/state.json"
+            self.run_command("--limit", "10", "--chunk-size", "10", "--state-file", state_file)
+            self.assertEqual(ArticleTranslation.objects.filter(title_translated__isnull=True).count(), 13)
+            with open(state_file) as f:
+                self.assertEqual(json.load(f)["last_id"], self.rows[9].id)
+
+            # rows reset behind the checkpoint are not revisited on resume
+            ArticleTranslation.objects.filter(pk=self.rows[0].pk).update(title_translated=None)
+            self.run_command("--limit", "0", "--state-file", state_file)
+        self.assertEqual(
+            list(ArticleTranslation.objects.filter(title_translated__isnull=True)), [self.rows[0]]
+        )
+
+    def test_failed_batch_is_retried_on_resume(self):
+        def down(prompt, text):
+            raise ConnectionError("provider down")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state_file = f"{tmp}/state.json"
+            with mock.patch.dict(translators.PROVIDERS, {"en": (down, translators.PROVIDERS["en"][1])}):
+                self.run_command("--limit", "0", "--chunk-size", "10", "--retries", "0",
+                                 "--state-file", state_file)
+            empty = ArticleTranslation.objects.filter(title_translated__isnull=True).order_by("id")
+            self.assertEqual(list(empty), self.rows[::2])      # the en rows; zh rows were written
+            with open(state_file) as f:
+                self.assertEqual(json.load(f)["last_id"], self.rows[0].id - 1)
+            self.run_command("--limit", "0", "--state-file", state_file)
+        self.assertFalse(ArticleTranslation.objects.filter(title_translated__isnull=True).exists())
+        # vectors are written by the bulk update itself
+        self.assertFalse(ArticleTranslation.objects.filter(search_vector__isnull=True).exists())
+
+    def test_every_fallback_call_is_throttled(self):
+        calls = []
+
+        def chat(prompt, text):
+            calls.append(text)
+            return "not a JSON array" if text.startswith("[") else f"T:{text}"
+
+        tokens = []
+        with mock.patch.dict(translators.PROVIDERS, {"en": (chat, "stub")}):
+            out = translators.translate_titles(["a", "b", "c"], "en", throttle=lambda: tokens.append(1))
+        self.assertEqual(out, ["T:a", "T:b", "T:c"])
+        self.assertEqual(len(calls), 4)    # the batch call + one per title
+        self.assertEqual(len(tokens), 4)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BatchIngestTests(TestCase):
+    def setUp(self):
+        get_user_model().objects.create(id=1, username="clipper")
+        self.url = reverse("article:receive_articles")
+
+    def post(self, items, **extra):
+        return self.client.post(self.url, json.dumps(items), content_type="application/json", **extra, secure=True)
+
+    def test_batch_dedupes_and_inserts_in_bulk(self):
+        items = [
+            {"title": f"記事 {i}", "text": "本文", "url": f"https://example.com/{i}",
+             "publish": "2025/8/8付", "tag": "Sony" if i % 2 else "トヨタ"}
+            for i in range(50)
+        ]
+        items.append(dict(items[0], tag="extra"))  # same url -> merged into item 0
+        for name in ("Sony", "トヨタ", "extra"):
+            Tag.objects.create(name=name)
+        ContentType.objects.get_for_model(Article)
+        with self.assertNumQueries(11):  # fixed, whatever the batch size (incl. change log lock + insert)
+            resp = self.post(items, HTTP_X_SECRET_TOKEN=settings.ARTICLE_SECRET_TOKEN)
+        data = resp.json()
+
+        self.assertEqual(data["created"], 50)
+        self.assertEqual(data["results"][50], {"index": 50, "status": "duplicate",
+                                               "article_id": data["results"][0]["article_id"]})
+        self.assertEqual(Article.objects.count(), 50)
+        first = Article.objects.get(pk=data["results"][0]["article_id"])
+        self.assertEqual(sorted(first.tags.names()), ["extra", "トヨタ"])
+
+        again = self.post(items[:2], HTTP_X_SECRET_TOKEN=settings.ARTICLE_SECRET_TOKEN).json()
+        self.assertEqual([r["status"] for r in again["results"]], ["updated", "updated"])
+        self.assertEqual(Article.objects.count(), 50)
+
+    def test_ndjson_with_per_item_token(self):
+        lines = [
+            json.dumps({"title": "a", "secret_token": settings.ARTICLE_SECRET_TOKEN}),
+            json.dumps({"title": "b", "secret_token": "wrong"}),
+        ]
+        resp = self.client.post(self.url, "\n".join(lines), content_type="application/x-ndjson", secure=True)
+        self.assertEqual([r["status"] for r in resp.json()["results"]], ["created", "error"])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CanonicalKeyTests(TestCase):
+    def setUp(self):
+        get_user_model().objects.create(id=1, username="clipper")
+        self.url = reverse("article:receive_article")
+
+    def post(self, **item):
+        item["secret_token"] = settings.ARTICLE_SECRET_TOKEN
+        return self.client.post(self.url, json.dumps(item), content_type="application/json", secure=True).json()
+
+    def test_url_variants_share_a_key(self):
+        nikkei = "nikkei:DGXZQOUC123ABC"
+        self.assertEqual(canonical.canonical_key("https://www.nikkei.com/article/DGXZQOUC123ABC/"), nikkei)
+        self.assertEqual(canonical.canonical_key(
+            "https://www.nikkei.com/news/article-translation/?ng=DGXZQOUC123ABC&mta=c"), nikkei)
+        self.assertEqual(
+            canonical.canonical_key("https://Example.com/a/b/?utm_source=x&z=1&a=2#top"),
+            canonical.canonical_key("http://example.com/a/b?a=2&z=1"),
+        )
+        self.assertIsNone(canonical.canonical_key(""))
+
+    def test_receive_dedupes_on_canonical_key(self):
+        first = self.post(title="A", url="https://www.nikkei.com/article/DGXZQOUC123ABC/", publish="2026/1/1付")
+        again = self.post(title="A (updated)", url="https://www.nikkei.com/article/DGXZQOUC123ABC/?n_cid=x",
+                          publish="2026/1/1付")
+        self.assertTrue(first["created"])
+        self.assertEqual((again["article_id"], again["created"]), (first["article_id"], False))
+
+        # no url: same slug only dedupes within a publish date
+        self.assertTrue(self.post(title="B", publish="2026/1/1付")["created"])
+        self.assertTrue(self.post(title="B", publish="2026/1/2付")["created"])
+        self.assertFalse(self.post(title="B", publish="2026/1/2付")["created"])
+
+    def test_backfill_skips_colliding_rows(self):
+        user = get_user_model().objects.get(id=1)
+        a = make_article(user, "a", timezone.now(), url="https://www.nikkei.com/article/DGXZQOUC1/")
+        b = make_article(user, "b", timezone.now(), url="https://example.com/b")
+        # rows from before the column existed: no key, and b is really the same story as a
+        Article.objects.filter(pk=b.pk).update(url="https://nikkei.com/article/DGXZQOUC1")
+        Article.objects.update(canonical_key=None)
+
+        call_command("backfill_canonical_keys", stdout=StringIO())
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual(a.canonical_key, "nikkei:DGXZQOUC1")
+        self.assertIsNone(b.canonical_key)
+
+        # saving the duplicate later (admin edit) keeps it unkeyed instead of violating the constraint
+        b.title = "b (edited)"
+        b.save()
+        b.refresh_from_db()
+        self.assertIsNone(b.canonical_key)
+        a.save()
+        a.refresh_from_db()
+        self.assertEqual(a.canonical_key, "nikkei:DGXZQOUC1")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SidebarFacetTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create(id=1, username="clipper")
+        self.today = timezone.now()
+        make_article(self.user, "a", self.today, tags=["Sony"])
+        make_article(self.user, "b", self.today - timedelta(days=400), tags=["Sony", "トヨタ"])
+
+    def test_counts(self):
+        data = facets.compute(timezone.localdate())
+        self.assertEqual(data["periods"][0], ("", "- Any time", 2))
+        self.assertEqual(data["periods"][1][2], 1)
+        self.assertEqual({t["name"]: t["article_count"] for t in data["tags"]}, {"Sony": 2, "トヨタ": 1})
+
+    def test_cached_until_ingest(self):
+        url = reverse("article:article_list")
+        self.client.get(url, secure=True)
+        with self.assertNumQueries(0):
+            facets.get_facets()
+
+        self.client.post(reverse("article:receive_article"), json.dumps({
+            "title": "c", "tag": "Sony", "secret_token": settings.ARTICLE_SECRET_TOKEN,
+        }), content_type="application/json", secure=True)
+        resp = self.client.get(url, secure=True)
+        self.assertEqual(resp.context["publish_filters"][0][2], 3)
+        self.assertEqual({t["name"]: t["article_count"] for t in resp.context["tag_list"]}["Sony"], 3)
+
+        Tag.objects.filter(name="トヨタ").get().delete()
+        self.assertEqual([t["name"] for t in facets.get_facets()["tags"]], ["Sony"])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        user = get_user_model().objects.create(id=1, username="clipper")
+        today = timezone.localdate()
+        # several articles per day so ties on publish are resolved by created/id
+        for i in range(40):
+            make_article(user, f"記事{i}", today - timedelta(days=i // 3), tags=["Sony"] if i % 2 else [])
+        self.url = reverse("article:article_list")
+
+    def walk(self, params):
+        seen, pages, resp = [], 0, self.client.get(self.url, params, secure=True)
+        while True:
+            pages += 1
+            seen += [a.id for a in resp.context["articles"]]
+            if not resp.context["next_url"]:
+                return seen, pages, resp
+            resp = self.client.get(self.url + resp.context["next_url"], secure=True)
+
+    def test_walks_every_row_once_in_order(self):
+        seen, pages, last = self.walk({})
+        self.assertEqual(seen, list(Article.objects.values_list("id", flat=True)))
+        self.assertEqual(pages, 3)
+
+        back = self.client.get(self.url + last.context["prev_url"], secure=True)
+        self.assertEqual([a.id for a in back.context["articles"]], seen[15:30])
+        self.assertEqual(last.context["result_count"], 40)
+
+    def test_filters_are_kept_and_count_is_free(self):
+        seen, _, resp = self.walk({"tag": "sony"})
+        self.assertEqual(len(seen), 20)
+        self.assertEqual(resp.context["result_count"], 20)
+        with self.assertNumQueries(1):  # just the page: no COUNT(*), no facet queries
+            self.client.get(self.url + resp.context["prev_url"], secure=True)
+
+    def test_ranked_search_pages(self):
+        for a in Article.objects.all():
+            a.text = "東京" * (a.id % 4 + 1)
+            a.save()
+            search.index_article(a)
+        seen, pages, _ = self.walk({"q": "東京"})
+        expected = search.search_articles(Article.objects.all(), "東京").order_by("-rank", "-publish", "-created", "-id")
+        self.assertEqual(seen, list(expected.values_list("id", flat=True)))
+        self.assertEqual(pages, 3)
+
+    def test_garbage_cursor_falls_back_to_first_page(self):
+        first = self.client.get(self.url, secure=True).context["articles"]
+        # undecodable, and well-formed but with values that don't fit the ordering fields
+        for values in (None, ["x", "y", "z"], [[1], {"a": 1}, 3], ["2026-01-01", None, 1]):
+            cursor = "not-a-cursor" if values is None else pagination.encode_cursor(values, "n")
+            resp = self.client.get(self.url, {"cursor": cursor}, secure=True)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(list(resp.context["articles"]), list(first))
+            self.assertIsNone(resp.context["prev_url"])
+        api = self.client.get(reverse("article:api_article_list"),
+                              {"cursor": pagination.encode_cursor(["x", "y", "z"], "p")}, secure=True)
+        self.assertEqual(api.status_code, 200)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleDetailCacheTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        user = get_user_model().objects.create(id=1, username="clipper")
+        self.article = make_article(user, "記事", timezone.localdate(), tags=["Sony", "トヨタ"])
+        ArticleTranslation.objects.create(article=self.article, language="en",
+                                          title_translated="Article", text_translated="<p>body</p>")
+        self.url = self.article.get_absolute_url()
+
+    def set_lang(self, lang):
+        self.client.cookies["lang"] = languages._signer.sign(lang)
+
+    def test_cold_is_one_query_warm_is_zero(self):
+        ContentType.objects.get_for_model(Article)
+        with self.assertNumQueries(1):
+            cold = self.client.get(self.url, secure=True)
+        self.assertContains(cold, "トヨタ")
+        with self.assertNumQueries(0):
+            warm = self.client.get(self.url, secure=True)
+        self.assertEqual(warm.content, cold.content)
+
+    def test_translation_joined_and_writes_invalidate(self):
+        self.set_lang("en")
+        self.assertContains(self.client.get(self.url, secure=True), "Article")
+
+        ArticleTranslation.objects.filter(article=self.article).get().delete()
+        self.assertNotContains(self.client.get(self.url, secure=True), "Article</")
+        self.article.tags.add("extra")
+        self.assertContains(self.client.get(self.url, secure=True), "extra")
+
+    def test_bad_dates_and_slugs_404(self):
+        self.assertEqual(self.client.get("/article/2025/2/30/x/", secure=True).status_code, 404)
+        d = self.article.publish
+        url = reverse("article:article_detail", args=[d.year, d.month, d.day, "nope"])
+        self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ArticleListingTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create(id=1, username="clipper", is_staff=True, is_superuser=True)
+        self.article = make_article(self.user, "記事\n タイトル", timezone.localdate())
+
+    def test_kept_in_sync_with_translations(self):
+        row = ArticleListing.objects.get(pk=self.article.pk)
+        self.assertEqual((row.title_ja, row.has_en), ("記事 タイトル", False))
+
+        tr = ArticleTranslation.objects.create(article=self.article, language="en",
+                                               title_translated="Title", text_translated="x")
+        row.refresh_from_db()
+        self.assertEqual((row.title_for("en"), row.has_en, row.title_for("zh")), ("Title", True, "記事 タイトル"))
+
+        tr.delete()
+        row.refresh_from_db()
+        self.assertEqual((row.title_en, row.has_en), ("", False))
+
+        self.article.delete()
+        self.assertFalse(ArticleListing.objects.exists())
+
+    def test_rebuild_command(self):
+        ArticleListing.objects.all().delete()
+        call_command("rebuild_listing", "--missing-only", stdout=StringIO())
+        self.assertEqual(ArticleListing.objects.get().title_ja, "記事 タイトル")
+
+    def test_list_page_reads_translated_titles_from_listing(self):
+        ArticleTranslation.objects.create(article=self.article, language="zh",
+                                          title_translated="标题", text_translated="x")
+        self.client.cookies["lang"] = languages._signer.sign("zh")
+        facets.get_facets()
+        with self.assertNumQueries(1):  # page (listing joined), no session
+            resp = self.client.get(reverse("article:article_list"), secure=True)
+        self.assertEqual(resp.context["articles"][0].display_title, "标题")
+
+    def test_admin_changelist_flags(self):
+        ArticleTranslation.objects.create(article=self.article, language="en",
+                                          title_translated="Title", text_translated="x")
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse("admin:article_article_changelist"), secure=True)
+        self.assertContains(resp, '<td class="field-col_en">1</td>', html=True)
+        self.assertContains(resp, '<td class="field-col_zh">0</td>', html=True)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LeanQuerysetTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create(id=1, username="clipper", is_staff=True, is_superuser=True)
+        self.today = timezone.localdate()
+        self.article = make_article(self.user, "記事", self.today, tags=["Sony"],
+                                    text="<p>" + "本文" * 200 + "</p>")
+        ArticleTranslation.objects.create(article=self.article, language="en",
+                                          title_translated="Title", text_translated="<div>body</div>")
+
+    def assertNoBodies(self, queries):
+        for q in queries:
+            self.assertNotIn('"text"', q["sql"])
+            self.assertNotIn('"text_translated"', q["sql"])
+
+    def test_excerpt_stored_on_save(self):
+        self.assertEqual(self.article.excerpt, "本文" * 90 + " …")
+        a = Article.objects.listing().get(pk=self.article.pk)
+        self.assertEqual(a.get_deferred_fields(), {"text", "text_plain", "search_vector"})
+        a.title = "renamed"
+        with CaptureQueriesContext(connection) as ctx:  # saving a lean row doesn't fetch the body
+            a.save()
+        self.assertNoBodies(ctx.captured_queries)
+
+    def test_text_columns_backfill(self):
+        tr = ArticleTranslation.objects.get()
+        self.assertEqual((tr.text_plain, tr.excerpt), ("body", "body"))
+
+        Article.objects.update(text_plain=None, excerpt=None)
+        ArticleTranslation.objects.update(text_plain=None, excerpt=None)
+        ArticleListing.objects.all().delete()
+        call_command("backfill_text_columns", "--chunk-size", "1", stdout=StringIO())
+
+        a = Article.objects.get()
+        self.assertEqual((a.text_plain, a.excerpt), ("本文" * 200, "本文" * 90 + " …"))
+        self.assertEqual(ArticleTranslation.objects.get().text_plain, "body")
+        self.assertEqual(ArticleListing.objects.get().title_en, "Title")
+
+    def test_weekly_and_list_never_select_bodies(self):
+        with CaptureQueriesContext(connection) as ctx:
+            groups = build_sections(self.today - timedelta(days=6), self.today)
+            self.client.get(reverse("article:article_list"), secure=True)
+        self.assertEqual(groups[0].articles[0].excerpt, self.article.excerpt)
+        self.assertNoBodies(ctx.captured_queries)
+
+    def test_weekly_falls_back_for_rows_without_excerpt(self):
+        for i in range(5):
+            make_article(self.user, f"記事{i}", self.today, tags=["Sony"], text="<p>" + "本文" * 200 + "</p>")
+        Article.objects.update(excerpt=None)
+        with self.assertNumQueries(3):   # tags, rows, one body lookup for the whole section
+            groups = build_sections(self.today - timedelta(days=6), self.today)
+        self.assertEqual({item.excerpt for item in groups[0].articles}, {self.article.excerpt})
+        self.assertEqual(len(groups[0].articles), 6)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.user)
+        for name in ("admin:article_article_changelist", "admin:article_articletranslation_changelist"):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(reverse(name), secure=True).status_code, 200)
+            self.assertNoBodies([q for q in ctx.captured_queries if "COUNT" not in q["sql"]])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReadApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="clipper")
+        self.today = timezone.localdate()
+        self.a1 = make_article(self.user, "記事一", self.today - timedelta(days=1), tags=["alpha"])
+        self.a2 = make_article(self.user, "記事二", self.today, tags=["beta"])
+        ArticleTranslation.objects.create(article=self.a2, language="en",
+                                          title_translated="Article two", text_translated="<p>two</p>")
+
+    def test_list_filters_and_languages(self):
+        data = self.client.get(reverse("article:api_article_list"), {"tag": "beta", "lang": "en"}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a2.id])
+        self.assertEqual(data["results"][0]["titles"], {"en": "Article two"})
+        self.assertEqual(data["results"][0]["languages"], ["ja", "en"])
+        self.assertEqual(data["results"][0]["tags"], ["beta"])
+
+        data = self.client.get(reverse("article:api_article_list"), {"limit": 1}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a2.id])
+        data = self.client.get(
+            reverse("article:api_article_list"), {"limit": 1, "cursor": data["next"]}, secure=True
+        ).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a1.id])
+
+    def test_list_every_period(self):
+        today, articles = self.today, [self.a2, self.a1]    # newest first
+        expected = {
+            "": articles,
+            "today": [a for a in articles if a.publish == today],
+            "7days": articles,
+            "month": [a for a in articles if (a.publish.year, a.publish.month) == (today.year, today.month)],
+            "year": [a for a in articles if a.publish.year == today.year],
+            "bogus": articles,
+        }
+        for period, want in expected.items():
+            resp = self.client.get(reverse("article:api_article_list"), {"period": period}, secure=True)
+            self.assertEqual(resp.status_code, 200, period)
+            self.assertEqual([r["id"] for r in resp.json()["results"]], [a.id for a in want], period)
+
+    def test_detail_conditional_get(self):
+        url = reverse("article:api_article_detail", args=[self.a2.id])
+        resp = self.client.get(url, {"lang": "en"}, secure=True)
+        self.assertEqual(resp.json()["translations"], {
+            "en": {"title": "Article two", "text": "<p>two</p>", "updated": mock.ANY},
+        })
+        self.assertTrue(resp["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", resp)
+
+        again = self.client.get(url, {"lang": "en"}, HTTP_IF_NONE_MATCH=resp["ETag"], secure=True)
+        self.assertEqual((again.status_code, again.content), (304, b""))
+        since = self.client.get(url, {"lang": "en"}, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"], secure=True)
+        self.assertEqual(since.status_code, 304)
+
+        tr = self.a2.translations.get()
+        tr.title_translated = "Article 2"
+        tr.save()
+        changed = self.client.get(url, {"lang": "en"}, HTTP_IF_NONE_MATCH=resp["ETag"], secure=True)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], resp["ETag"])
+        self.assertEqual(self.client.get(reverse("article:api_article_detail", args=[0]), secure=True).status_code, 404)
+
+    @override_settings(API_CHANGES_OVERLAP_SECONDS=0)    # exactly-once paging; overlap tested below
+    def test_changes_feed(self):
+        url = reverse("article:api_changes")
+        self.assertEqual(self.client.get(url, secure=True).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}, secure=True).status_code, 400)
+
+        data = self.client.get(url, {"since": "2000-01-01", "limit": 1}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a1.id])
+        data = self.client.get(url, {"cursor": data["next"]}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a2.id])
+        cursor = data["next"]
+        self.assertEqual(self.client.get(url, {"cursor": cursor}, secure=True).json()["results"], [])
+
+        # translation writes and tag changes move an article to the head of the feed
+        self.a1.tags.add("gamma")
+        data = self.client.get(url, {"cursor": cursor}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a1.id])
+        self.assertEqual(data["results"][0]["tags"], ["alpha", "gamma"])
+        ArticleTranslation.objects.create(article=self.a2, language="zh", title_translated="二",
+                                          text_translated="<p>二</p>")
+        data = self.client.get(url, {"cursor": data["next"]}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a2.id])
+
+    def test_changes_resend_late_commits_behind_the_cursor(self):
+        url = reverse("article:api_changes")
+        data = self.client.get(url, {"since": "2000-01-01"}, secure=True).json()
+        self.assertEqual([r["id"] for r in data["results"]], [self.a1.id, self.a2.id])
+        head = data["next"]
+        at = pagination.decode_cursor(head)[1][0]
+
+        # stamped before the poll above, committed after it
+        late = make_article(self.user, "遅延", self.today)
+        Article.objects.filter(pk=late.pk).update(updated=parse_datetime(at) - timedelta(seconds=5))
+        stale = make_article(self.user, "古い", self.today)
+        Article.objects.filter(pk=stale.pk).update(updated=parse_datetime(at) - timedelta(minutes=5))
+
+        data = self.client.get(url, {"cursor": head}, secure=True).json()
+        ids = [r["id"] for r in data["results"]]
+        self.assertIn(late.id, ids)
+        self.assertNotIn(stale.id, ids)      # older than the overlap window
+        self.assertEqual(data["next"], head)  # re-sent rows never move the cursor back
+
+    def test_changes_scan_only_articles_updated_since(self):
+        future = (timezone.now() + timedelta(days=1)).isoformat()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse("article:api_changes"), {"since": future}, secure=True).json()
+        self.assertEqual(data["results"], [])
+        feed = [q["sql"] for q in ctx.captured_queries if 'FROM "article_article"' in q["sql"]]
+        self.assertEqual(len(feed), 1)
+        self.assertNotIn("article_articletranslation", feed[0])   # no OR branch, no correlated subquery
+        self.assertIn('ORDER BY "article_article"."updated" ASC', feed[0])
+
+    def test_backfill_change_times(self):
+        tr = self.a2.translations.get()
+        Article.objects.update(updated=timezone.now() - timedelta(days=30))
+        call_command("backfill_change_times", "--chunk-size", "1", stdout=StringIO())
+        self.a1.refresh_from_db()
+        self.a2.refresh_from_db()
+        self.assertEqual(self.a2.updated, tr.updated)
+        self.assertLess(self.a1.updated, tr.updated - timedelta(days=29))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ChangeLogTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="clipper")
+        self.today = timezone.localdate()
+
+    def test_writes_are_logged_in_order(self):
+        a = make_article(self.user, "記事", self.today, tags=["alpha"])
+        tr = ArticleTranslation.objects.create(article=a, language="en", text_translated="<p>x</p>")
+        a.title = "記事2"
+        a.save()
+        tr_id = tr.id
+        tr.delete()
+
+        entries = list(ChangeLogEntry.objects.order_by("seq").values_list("model", "action", "object_id"))
+        self.assertEqual(entries, [
+            ("article", "insert", a.id), ("tags", "update", a.id), ("translation", "insert", tr_id),
+            ("article", "update", a.id), ("translation", "delete", tr_id),
+        ])
+
+    def test_pull_endpoint_pages_by_seq_with_current_state(self):
+        a = make_article(self.user, "記事", self.today, tags=["alpha"])
+        a.title = "記事2"
+        a.save()
+        url = reverse("article:api_changelog")
+
+        data = self.client.get(url, {"limit": 2}, secure=True).json()
+        self.assertEqual([e["model"] for e in data["results"]], ["article", "tags"])
+        self.assertEqual(data["results"][0]["data"]["title"], "記事2")  # current state, not a snapshot
+        self.assertEqual(data["results"][1]["data"], {"tags": ["alpha"]})
+
+        rest = self.client.get(url, {"after": data["next"]}, secure=True).json()
+        self.assertEqual([(e["model"], e["action"]) for e in rest["results"]], [("article", "update")])
+        self.assertEqual(self.client.get(url, {"after": rest["next"]}, secure=True).json()["results"], [])
+        self.assertEqual(self.client.get(url, {"after": "x"}, secure=True).status_code, 400)
+
+        # within one page only the object's last entry carries its data
+        full = self.client.get(url, secure=True).json()["results"]
+        self.assertEqual([e["data"] is None for e in full], [True, False, False])
+
+    def test_dump_changes_streams_ndjson(self):
+        make_article(self.user, "a", self.today)
+        b = make_article(self.user, "b", self.today)
+        first = ChangeLogEntry.objects.order_by("seq").first().seq
+
+        out, err = StringIO(), StringIO()
+        call_command("dump_changes", "--since", str(first), "--chunk-size", "1", stdout=out, stderr=err)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(e["model"], e["object_id"]) for e in lines], [("article", b.id)])
+        self.assertEqual(lines[0]["data"]["title"], "b")
+        self.assertIn(f"last seq {lines[0]['seq']}", err.getvalue())
+
+    def test_seed_changelog(self):
+        a = make_article(self.user, "x", self.today)
+        with self.assertRaises(CommandError):
+            call_command("seed_changelog", stdout=StringIO())
+        ChangeLogEntry.objects.all().delete()
+        call_command("seed_changelog", "--chunk-size", "1", stdout=StringIO())
+        self.assertEqual(list(ChangeLogEntry.objects.values_list("model", "action", "object_id")),
+                         [("article", "insert", a.id)])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AsyncIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.create(id=1, username="clipper")
+
+    async def test_article_then_large_translation(self):
+        resp = await self.async_client.post(reverse("article:receive_article"), json.dumps({
+            "title": "記事", "text": "<p>本文</p>", "url": "https://example.com/a", "tag": "Sony",
+            "secret_token": settings.ARTICLE_SECRET_TOKEN,
+        }), content_type="application/json", secure=True)
+        self.assertEqual(resp.status_code, 201)
+        article_id = resp.json()["article_id"]
+
+        html = "<div>" + "訳文" * (views.INGEST_INLINE_JSON_BYTES // 3) + "</div>"  # parsed off the loop
+        resp = await self.async_client.post(reverse("article:receive_translation"), json.dumps({
+            "article_id": article_id, "language": "en", "html": html,
+            "secret_token": settings.ARTICLE_SECRET_TOKEN,
+        }), content_type="application/json", secure=True)
+        self.assertEqual(resp.status_code, 201)
+
+        tr = await ArticleTranslation.objects.select_related("article").aget(article_id=article_id)
+        self.assertEqual(tr.text_translated, html)
+        self.assertEqual(await tr.article.tags.values_list("name", flat=True).aget(), "Sony")
+
+        resp = await self.async_client.post(reverse("article:receive_translation"), json.dumps({
+            "article_id": 0, "language": "en", "html": "x", "secret_token": settings.ARTICLE_SECRET_TOKEN,
+        }), content_type="application/json", secure=True)
+        self.assertEqual(resp.status_code, 404)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AsgiExportStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create(username="clipper")
+        for i in range(3):
+            make_article(user, f"記事{i}", timezone.localdate(), tags=[f"tag{i}"])
+
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+
+    async def export(self, fmt):
+        resp = await self.async_client.get(reverse("article:weekly_news"), {"export": fmt}, secure=True)
+        self.assertEqual(resp.status_code, 200)
+        # an async body: Django's ASGI handler would buffer a sync one whole (sync_to_async(list))
+        self.assertTrue(resp.is_async)
+        return resp, [chunk async for chunk in resp.streaming_content]
+
+    async def test_text_exports_stream_chunk_by_chunk(self):
+        resp, chunks = await self.export("md")
+        self.assertGreater(len(chunks), 3)      # header + one per section
+        self.assertIn("## tag2", b"".join(chunks).decode())
+
+    async def test_large_docx_is_sent_in_blocks(self):
+        with (
+            mock.patch.object(views, "WEEKLY_EXPORT_CACHE_MAX_BYTES", 0),
+            mock.patch.object(exports, "FILE_BLOCK_BYTES", 1024),
+        ):
+            resp, chunks = await self.export("docx")
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(int(resp["Content-Length"]), sum(map(len, chunks)))
+        self.assertTrue(b"".join(chunks).startswith(b"PK"))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PerfMiddlewareTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        perf._counters.clear()
+        perf._histograms.clear()
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        patcher = mock.patch.object(perf, "METRICS_DIR", self.metrics_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = get_user_model().objects.create(username="clipper")
+        self.article = make_article(user, "記事", timezone.localdate(), tags=["alpha"])
+
+    def counter(self, name, **labels):
+        return perf._counters.get((name, perf._labels(**labels)), 0)
+
+    def test_server_timing_matches_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("article:article_list"), secure=True)
+        self.assertIn('db;dur=', resp["Server-Timing"])
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', resp["Server-Timing"])
+        self.assertEqual(self.counter("clipping_db_queries_total", view="article:article_list"),
+                         len(ctx.captured_queries))
+        self.assertEqual(self.counter("clipping_http_requests_total", view="article:article_list",
+                                      method="GET", status="200"), 1)
+
+    def test_cache_hits_and_streamed_exports(self):
+        url = self.article.get_absolute_url()
+        self.client.get(url, secure=True)
+        resp = self.client.get(url, secure=True)
+        self.assertIn('cache-page;desc="1 hit / 0 miss"', resp["Server-Timing"])
+        self.assertEqual(self.counter("clipping_cache_requests_total", cache="page", result="hit"), 1)
+
+        resp = self.client.get(reverse("article:weekly_news"), {"export": "md"}, secure=True)
+        self.assertEqual(self.counter("clipping_db_queries_total", view="article:weekly_news"), 0)
+        size = len(b"".join(resp.streaming_content))
+        self.assertEqual(self.counter("clipping_db_queries_total", view="article:weekly_news"), 2)
+        self.assertEqual(self.counter("clipping_http_response_bytes_total", view="article:weekly_news"), size)
+
+    def test_metrics_endpoint_merges_workers(self):
+        self.client.get(reverse("article:article_list"), secure=True)
+        other = {"counters": [["clipping_http_requests_total",
+                               [["method", "GET"], ["status", "200"], ["view", "article:article_list"]], 4]],
+                 "histograms": []}
+        with open(f"{self.metrics_dir.name}/999999.json", "w") as f:
+            json.dump(other, f)
+
+        body = self.client.get("/metrics", secure=True).content.decode()
+        self.assertIn("# TYPE clipping_http_request_duration_seconds histogram", body)
+        self.assertIn('clipping_http_requests_total{method="GET",status="200",view="article:article_list"} 5',
+                      body)
+        self.assertIn('clipping_db_queries_per_request_bucket{view="article:article_list",le="+Inf"} 1', body)
+
+        with mock.patch.object(perf, "METRICS_TOKEN", "s3cret"):
+            self.assertEqual(self.client.get("/metrics", secure=True).status_code, 403)
+            resp = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret", secure=True)
+            self.assertEqual(resp.status_code, 200)
+
+    def test_slow_query_log(self):
+        with mock.patch.object(perf, "SLOW_QUERY_MS", 1e-9), \
+                self.assertLogs("article.perf.slow_query", "WARNING") as logs:
+            self.client.get(reverse("article:article_list"), secure=True)
+        self.assertIn("slow query", logs.output[0])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SessionFreeLanguageTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        user = get_user_model().objects.create(id=1, username="clipper")
+        self.article = make_article(user, "記事", timezone.localdate())
+        ArticleTranslation.objects.create(article=self.article, language="en",
+                                          title_translated="Article", text_translated="<p>body</p>")
+        facets.get_facets()
+
+    def vary(self, response):
+        return {v.strip() for v in response.get("Vary", "").split(",") if v.strip()}
+
+    def test_url_language_sets_cookie_and_does_not_vary(self):
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse("article:article_list"), {"lang": "en"}, secure=True)
+        self.assertEqual(resp.context["articles"][0].display_title, "Article")
+        self.assertEqual(resp["Content-Language"], "en")
+        self.assertNotIn("Cookie", self.vary(resp))
+        self.assertNotIn("sessionid", resp.cookies)
+        self.assertEqual(languages._signer.unsign(resp.cookies["lang"].value), "en")
+
+        # the cookie now picks the language; the response says it depends on it
+        resp = self.client.get(self.article.get_absolute_url(), secure=True)
+        self.assertContains(resp, "Article")
+        self.assertIn("Cookie", self.vary(resp))
+        self.assertNotIn("lang", resp.cookies)
+
+    def test_default_and_bad_cookie(self):
+        self.client.cookies["lang"] = "en:forged"
+        resp = self.client.get(reverse("article:weekly_news"), secure=True)
+        self.assertEqual(resp["Content-Language"], "ja")
+        self.assertIn("Cookie", self.vary(resp))
+
+    def test_switcher_sets_cookie_only(self):
+        resp = self.client.get(reverse("article:set_lang"), {"lang": "zh-Hans"}, HTTP_REFERER="/article/", secure=True)
+        self.assertRedirects(resp, "/article/", fetch_redirect_response=False)
+        self.assertEqual(languages._signer.unsign(resp.cookies["lang"].value), "zh")
+        self.assertNotIn("sessionid", resp.cookies)
+
+    def test_logged_in_pages_still_vary_on_session(self):
+        self.client.force_login(get_user_model().objects.get())
+        resp = self.client.get(self.article.get_absolute_url(), {"lang": "en"}, secure=True)
+        self.assertIn("Cookie", self.vary(resp))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches[digest_cache.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create(id=1, username="clipper")
+        self.article = make_article(self.user, "記事", timezone.localdate(), tags=["Sony"])
+        ContentType.objects.get_for_model(Article)
+        facets.get_facets()
+
+    def keys(self, response):
+        return set(response["Surrogate-Key"].split())
+
+    def test_list_is_served_from_cache_until_a_key_is_purged(self):
+        url = reverse("article:article_list")
+        cold = self.client.get(url, {"lang": "en"}, secure=True)
+        self.assertTrue({"list", "lang:en", f"article:{self.article.id}"} <= self.keys(cold))
+        self.assertIn("s-maxage=", cold["Cache-Control"])
+        with self.assertNumQueries(0):
+            warm = self.client.get(url, {"lang": "en"}, secure=True)
+        self.assertEqual(warm.content, cold.content)
+        self.assertEqual(self.keys(warm), self.keys(cold))
+
+        # a translation purges article:<id> only
+        ArticleTranslation.objects.create(article=self.article, language="en",
+                                          title_translated="Article", text_translated="x")
+        self.assertContains(self.client.get(url, {"lang": "en"}, secure=True), "Article")
+
+        tagged = self.client.get(url, {"tag": "sony"}, secure=True)
+        self.assertIn("tag:sony", self.keys(tagged))
+        self.assertEqual(self.client.get(url, {"tag": "sony"}, secure=True).content, tagged.content)
+
+    def test_weekly_page_keyed_by_dates(self):
+        url = reverse("article:weekly_news")
+        cold = self.client.get(url, secure=True)
+        self.assertIn(f"date:{timezone.localdate().isoformat()}", self.keys(cold))
+        # a new article outside the window leaves it cached; one inside purges it
+        make_article(self.user, "昔", timezone.localdate() - timedelta(days=30), tags=["Sony"])
+        with self.assertNumQueries(0):
+            self.client.get(url, secure=True)
+        make_article(self.user, "新着", timezone.localdate(), tags=["Sony"])
+        self.assertContains(self.client.get(url, secure=True), "新着")
+
+        export = self.client.get(url, {"export": "md"}, secure=True)
+        self.assertFalse(export.has_header("Surrogate-Key"))
+        long_window = self.client.get(url, {"start": "2020-01-01", "end": "2020-12-31"}, secure=True)
+        self.assertFalse(long_window.has_header("Surrogate-Key"))
+
+    def test_tag_rename_purges_detail_and_hook_runs_after_commit(self):
+        url = self.article.get_absolute_url()
+        self.assertIn("tag:sony", self.keys(self.client.get(url, secure=True)))
+        hook = mock.Mock()
+        with mock.patch.object(page_cache, "PURGE_HOOK", "article.tests.record_purge"), \
+                mock.patch("article.tests.record_purge", hook), \
+                self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.filter(name="Sony").update(name="SONY")
+            Tag.objects.get(name="SONY").save()
+        hook.assert_called_once_with(["list", "tag:sony", "weekly"])
+        self.assertContains(self.client.get(url, secure=True), "SONY")
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.force_login(self.user)
+        resp = self.client.get(self.article.get_absolute_url(), secure=True)
+        self.assertFalse(resp.has_header("Surrogate-Key"))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        patches = [
+            mock.patch.object(routers, "replicas", return_value=["replica_1", "replica_2"]),
+            mock.patch.object(routers, "replica_lag", side_effect=lambda alias: self.lag[alias]),
+            mock.patch.object(routers, "_primary_in_transaction", side_effect=lambda: self.in_tx),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.lag = {"replica_1": 0.0, "replica_2": 0.0}
+        self.in_tx = False
+        # each test starts unpinned, like a fresh request
+        token = routers._pinned.set(False)
+        self.addCleanup(routers._pinned.reset, token)
+
+    def test_reads_spread_over_healthy_replicas(self):
+        self.lag["replica_2"] = routers.MAX_LAG + 1
+        self.assertEqual({self.router.db_for_read(Article) for _ in range(20)}, {"replica_1"})
+        self.lag["replica_1"] = None    # unreachable
+        self.assertEqual(self.router.db_for_read(Article), "default")
+
+    def test_transactions_and_writes_stay_on_primary(self):
+        self.in_tx = True
+        self.assertEqual(self.router.db_for_read(Article), "default")
+        self.in_tx = False
+        self.assertEqual(self.router.db_for_write(Article), "default")
+        self.assertEqual(self.router.db_for_read(Article), "default")   # read-your-writes
+        self.assertFalse(self.router.allow_migrate("replica_1", "article"))
+
+    def test_sticky_cookie_after_a_write(self):
+        def view(request):
+            if request.method == "POST":
+                self.router.db_for_write(Article)
+            return HttpResponse(self.router.db_for_read(Article))
+
+        middleware = routers.PrimaryStickinessMiddleware(view)
+        factory = RequestFactory()
+        resp = middleware(factory.post("/"))
+        self.assertEqual(resp.content, b"default")
+        self.assertIn(routers.COOKIE_NAME, resp.cookies)
+        self.assertEqual(resp.cookies[routers.COOKIE_NAME]["secure"], settings.SESSION_COOKIE_SECURE)
+        self.assertEqual(resp.cookies[routers.COOKIE_NAME]["samesite"], "Lax")
+        self.assertFalse(routers._pinned.get())     # state doesn't leak past the request
+
+        sticky = factory.get("/")
+        sticky.COOKIES[routers.COOKIE_NAME] = resp.cookies[routers.COOKIE_NAME].value
+        self.assertEqual(middleware(sticky).content, b"default")
+        self.assertTrue(middleware(factory.get("/")).content.startswith(b"replica_"))
+
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConnectionPoolBenchTests(TestCase):
+    def test_percentiles(self):
+        timings = [float(i) for i in range(1, 101)]
+        self.assertEqual((bench.percentile(timings, 50), bench.percentile(timings, 95)), (50.0, 95.0))
+        self.assertEqual(bench.summarize([3.0])["p95_ms"], 3.0)
+
+    def test_child_run_times_list_and_ingest(self):
+        user = get_user_model().objects.create(id=1, username="clipper")
+        make_article(user, "記事", timezone.localdate(),
+                     url="https://www.nikkei.com/article/DGXZQOUC000001A00C25A8000000/")
+        out = StringIO()
+        with mock.patch("article.bench.close_old_connections"):
+            call_command("bench_db_pool", "--child", "--requests", "3", "--warmup", "1", stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result["list"]["requests"], 3)
+        self.assertEqual(result["ingest"]["requests"], 3)
+        self.assertEqual(Article.objects.count(), 1)     # re-ingest only, nothing written
+
+    def test_pool_stats_on_metrics(self):
+        if not connection.settings_dict["OPTIONS"].get("pool"):
+            self.skipTest("DB_POOL is off")
+        self.assertIn('clipping_db_pool_max_size{alias="default"}', perf.render_metrics())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SeedAndBenchEndpointsTests(TestCase):
+    def test_seed_articles_fills_derived_rows(self):
+        call_command("seed_articles", "--articles", "12", "--tags", "5", "--translated", "1",
+                     "--chunk-size", "5", "--seed", "1", stdout=StringIO())
+        self.assertEqual(Article.objects.count(), 12)
+        self.assertEqual(ArticleListing.objects.count(), 12)
+        self.assertEqual(ArticleTranslation.objects.count(), 24)
+        self.assertFalse(Article.objects.filter(search_vector__isnull=True).exists())
+        self.assertFalse(Article.objects.filter(canonical_key__isnull=True).exists())
+        self.assertEqual(ArticleListing.objects.exclude(title_en="").count(), 12)
+        self.assertTrue(Article.objects.filter(tags__isnull=False).exists())
+
+    def test_bench_endpoints_reports_every_scenario(self):
+        get_user_model().objects.create(id=1, username="clipper")    # receive_article writes as id 1
+        call_command("seed_articles", "--articles", "5", "--tags", "3", "--seed", "2", stdout=StringIO())
+        out = StringIO()
+        with mock.patch("article.bench.close_old_connections"):
+            call_command("bench_endpoints", "--requests", "2", "--warmup", "0", "--json",
+                         stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report["results"]), set(bench_endpoints.SCENARIOS))
+        self.assertEqual(report["meta"]["articles"], 5)
+        self.assertEqual(report["results"]["detail"]["requests"], 2)
+        self.assertIn("queries_p50", report["results"]["list"])
+        self.assertEqual(Article.objects.count(), 5)     # receive_article re-ingests only
+
+    def test_bench_endpoints_needs_articles(self):
+        with self.assertRaises(CommandError):
+            call_command("bench_endpoints", "--requests", "1", stdout=StringIO())
@@ -0,0 +1,34 @@
+# article/text.py
+"""
+Plain-text helpers shared by models (computed columns) and views.
+Kept free of model imports so models.py can use them in save().
+"""
+from django.utils.html import strip_tags
+
+EXCERPT_CHARS = 180                     # JA excerpt length (~90 English words)
+
+
+def plain_text(html: str) -> str:
+    """Body as one line of plain text: strips HTML & collapses whitespace."""
+    s = strip_tags(html or "")
+    return " ".join(s.split())  # collapse all whitespace/newlines/tabs
+
+
+def truncate(plain: str, n_chars: int = EXCERPT_CHARS) -> str:
+    return plain[:n_chars] + (" …" if len(plain) > n_chars else "")
+
+
+def excerpt_ja(text: str, n_chars: int = EXCERPT_CHARS) -> str:
+    """Simple JA excerpt by characters; strips HTML & collapses whitespace."""
+    return truncate(plain_text(text), n_chars)
+
+
+def text_columns(html: str) -> dict:
+    """Stored columns derived from a body: {"text_plain", "excerpt"}."""
+    plain = plain_text(html)
+    return {"text_plain": plain, "excerpt": truncate(plain)}
+
+
+def clean_title(title: str) -> str:
+    """Collapse whitespace so titles never include newlines/tabs."""
+    return " ".join((title or "").split())
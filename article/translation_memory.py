@@ -0,0 +1,93 @@
+# article/translation_memory.py
+"""
+Translation memory: provider output keyed by (normalized source hash,
+target language, provider/model), checked before any provider call.
+
+Normalization is NFKC + whitespace collapsing, so full-width/half-width
+variants and re-clipped titles with different spacing share one entry.
+The kind ('title' / 'body') is part of the hash because the prompts differ.
+
+Per-entry hit counts live on the rows; STATS holds this process's
+hit/miss counters. The table is capped at TRANSLATION_MEMORY_MAX_ENTRIES,
+least recently used rows are evicted first. Eviction counts the whole
+table, so it runs every TRANSLATION_MEMORY_EVICT_EVERY stored entries per
+process (and from `manage.py translation_memory --evict`), not per write.
+"""
+import hashlib
+import unicodedata
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TranslationMemory
+
+MAX_ENTRIES = getattr(settings, "TRANSLATION_MEMORY_MAX_ENTRIES", 200_000)
+EVICT_EVERY = getattr(settings, "TRANSLATION_MEMORY_EVICT_EVERY", 1000)
+
+STATS = {"hits": 0, "misses": 0}
+_stored = [0]   # entries stored by this process since the last evict()
+
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def source_hash(text: str, kind: str = "title") -> str:
+    return hashlib.sha256(f"{kind}\n{normalize(text)}".encode()).hexdigest()
+
+
+def lookup_many(texts, language: str, provider: str, kind: str = "title") -> dict[str, str]:
+    """Return {text: translation} for the texts already in memory (one SELECT + one UPDATE)."""
+    keyed = {t: source_hash(t, kind) for t in set(texts)}
+    entries = TranslationMemory.objects.filter(
+        source_hash__in=set(keyed.values()), language=language, provider=provider
+    )
+    rows = dict(entries.values_list("source_hash", "translated"))
+    if rows:
+        entries.filter(source_hash__in=rows).update(hits=F("hits") + 1, last_used=timezone.now())
+
+    found = {t: rows[h] for t, h in keyed.items() if h in rows}
+    STATS["hits"] += len(found)
+    STATS["misses"] += len(keyed) - len(found)
+    return found
+
+
+def lookup(text: str, language: str, provider: str, kind: str = "title") -> str | None:
+    return lookup_many([text], language, provider, kind).get(text)
+
+
+def store_many(pairs, language: str, provider: str, kind: str = "title") -> None:
+    """Remember [(source, translation)] pairs; existing keys are left alone."""
+    objs = {}
+    for src, translated in pairs:
+        if src and translated:
+            h = source_hash(src, kind)
+            objs[h] = TranslationMemory(
+                source_hash=h, language=language, provider=provider,
+                source_text=src, translated=translated,
+            )
+    if not objs:
+        return
+    TranslationMemory.objects.bulk_create(objs.values(), ignore_conflicts=True)
+    _stored[0] += len(objs)
+    if EVICT_EVERY and _stored[0] >= EVICT_EVERY:
+        evict()
+
+
+def store(text: str, translated: str, language: str, provider: str, kind: str = "title") -> None:
+    store_many([(text, translated)], language, provider, kind)
+
+
+def evict(max_entries: int = None) -> int:
+    """Trim the table to max_entries, dropping the least recently used rows."""
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    _stored[0] = 0
+    excess = TranslationMemory.objects.count() - max_entries
+    if excess <= 0:
+        return 0
+    ids = list(
+        TranslationMemory.objects.order_by("last_used", "id").values_list("id", flat=True)[:excess]
+    )
+    TranslationMemory.objects.filter(id__in=ids).delete()
+    return len(ids)
@@ -0,0 +1,173 @@
+# article/translators.py
+"""
+LLM translation providers: OpenAI for English, DeepSeek for Chinese.
+
+The translator used by the background job worker is configurable with
+settings.ARTICLE_TRANSLATOR (dotted path to a callable with the signature
+of translate_title_body) so tests and local runs can plug in a stub.
+"""
+import json
+import os
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import translation_memory as tm
+
+# ==============================
+# Load keys and configs from .env
+# ==============================
+OPENAI_API_KEY    = os.getenv("OPENAI_API_KEY", "")
+OPENAI_MODEL      = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL   = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+DEEPSEEK_API_KEY  = os.getenv("DEEPSEEK_API_KEY", "")
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+DEEPSEEK_MODEL    = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+
+TITLE_PROMPTS = {
+    "en": "Translate the following Japanese news title into natural English.",
+    "zh": "Translate the following Japanese news title into Simplified Chinese.",
+}
+BATCH_TITLE_PROMPTS = {
+    "en": "Translate each Japanese news title in the JSON array into natural English. "
+          "Reply with only a JSON array of strings: one translation per title, same order.",
+    "zh": "Translate each Japanese news title in the JSON array into Simplified Chinese. "
+          "Reply with only a JSON array of strings: one translation per title, same order.",
+}
+BODY_PROMPTS = {
+    "en": "Translate the following Japanese news article into natural English. Keep any HTML tags as they are.",
+    "zh": "Translate the following Japanese news article into Simplified Chinese. Keep any HTML tags as they are.",
+}
+
+_openai_client = None
+
+
+def _get_openai_client():
+    """OpenAI client for English (created on first use)."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    return _openai_client
+
+
+def chat_openai(system: str, text: str) -> str:
+    resp = _get_openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": text},
+        ],
+        temperature=0.3,
+    )
+    return resp.choices[0].message.content.strip()
+
+
+def chat_deepseek(system: str, text: str) -> str:
+    url = f"{DEEPSEEK_BASE_URL}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": DEEPSEEK_MODEL,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": text},
+        ],
+        "temperature": 0.3,
+    }
+    resp = requests.post(url, headers=headers, json=payload, timeout=30)
+    resp.raise_for_status()
+    data = resp.json()
+    return data["choices"][0]["message"]["content"].strip()
+
+
+# language -> (chat function, provider label)
+PROVIDERS = {
+    "en": (chat_openai, f"OpenAI:{OPENAI_MODEL}"),
+    "zh": (chat_deepseek, f"DeepSeek:{DEEPSEEK_MODEL}"),
+}
+
+
+def translate_title_openai(japanese_title: str) -> str:
+    """Translate Japanese news title into English using OpenAI API."""
+    return chat_openai(TITLE_PROMPTS["en"], japanese_title)
+
+
+def translate_title_deepseek(japanese_title: str) -> str:
+    """Translate Japanese news title into Chinese using DeepSeek API."""
+    return chat_deepseek(TITLE_PROMPTS["zh"], japanese_title)
+
+
+def _parse_json_list(content: str, n: int) -> list[str] | None:
+    """Parse a model reply that should be a JSON array of n strings (``` fences tolerated)."""
+    s = (content or "").strip()
+    if s.startswith("```"):
+        s = s.strip("`")
+        s = s.split("\n", 1)[1] if "\n" in s else ""
+    try:
+        items = json.loads(s)
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != n:
+        return None
+    return [str(x).strip() for x in items]
+
+
+def translate_titles(titles: list[str], lang: str, throttle=None) -> list[str]:
+    """
+    Translate several titles with a single provider call (JSON array in,
+    JSON array out). If the reply does not line up with the input, falls
+    back to one call per title. Provider only: no DB access, so it is safe
+    to call from worker threads (callers consult translation memory).
+    throttle(), if given, is called before every provider call (e.g. a
+    rate limiter's wait).
+    """
+    if lang not in PROVIDERS:
+        raise ValueError(f"no translation provider for {lang!r}")
+    chat, _ = PROVIDERS[lang]
+
+    def call(prompt, text):
+        if throttle is not None:
+            throttle()
+        return chat(prompt, text)
+
+    if len(titles) == 1:
+        return [call(TITLE_PROMPTS[lang], titles[0])]
+    reply = call(BATCH_TITLE_PROMPTS[lang], json.dumps(titles, ensure_ascii=False))
+    out = _parse_json_list(reply, len(titles))
+    if out is None:
+        out = [call(TITLE_PROMPTS[lang], t) for t in titles]
+    return out
+
+
+def translate_title_body(title: str, body: str, lang: str) -> tuple[str, str]:
+    """Translate a Japanese (title, body) pair into lang ('en' or 'zh'), via translation memory."""
+    if lang not in PROVIDERS:
+        raise ValueError(f"no translation provider for {lang!r}")
+    chat, provider = PROVIDERS[lang]
+
+    def remembered(text, kind, prompt):
+        # translation memory first; only misses reach the provider
+        if not text:
+            return ""
+        hit = tm.lookup(text, lang, provider, kind)
+        if hit is not None:
+            return hit
+        out = chat(prompt, text)
+        tm.store(text, out, lang, provider, kind)
+        return out
+
+    return (
+        remembered(title, "title", TITLE_PROMPTS[lang]),
+        remembered(body, "body", BODY_PROMPTS[lang]),
+    )
+
+
+def get_translator():
+    """The (title, body, lang) -> (title, body) callable configured for this site."""
+    path = getattr(settings, "ARTICLE_TRANSLATOR", "article.translators.translate_title_body")
+    return import_string(path)
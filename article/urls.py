@@ -3,6 +3,7 @@ from django.urls import path
 from . import views
 # from .views import ArticleListView, ArticleDetailView, receive_article, cors_test_view
 from . import views_lang
+from . import api
 
 app_name = 'article'
 
@@ -13,8 +14,15 @@ urlpatterns = [
     path('<int:year>/<int:month>/<int:day>/<str:slug>/', views.ArticleDetailView.as_view(), name='article_detail'),
     
     path('receive/', views.receive_article, name='receive_article'),
+    path('receive/batch/', views.receive_articles, name='receive_articles'),
     path('receive-translation/', views.receive_translation, name='receive_translation'),
 
     path("news/weekly/", views.weekly_news, name="weekly_news"),
 
+    # read-only JSON API (see article/api.py)
+    path("api/articles/", api.article_list, name="api_article_list"),
+    path("api/articles/<int:pk>/", api.article_detail, name="api_article_detail"),
+    path("api/changes/", api.changes, name="api_changes"),
+    path("api/changelog/", api.changelog_feed, name="api_changelog"),
+
  ]
\ No newline at end of file
@@ -3,66 +3,97 @@ from datetime import datetime, timedelta, date
 import json
 import re
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.expressions import ArraySubquery
 from django.db import IntegrityError
-from django.db.models import Count, Q
-from django.http import JsonResponse, HttpResponseBadRequest
-from django.shortcuts import get_object_or_404, redirect
+from django.db.models import F, FilteredRelation, OuterRef, Q
+from django.http import Http404, JsonResponse, HttpResponseBadRequest
+from django.shortcuts import redirect
+from django.utils.http import content_disposition_header
 from django.utils.text import slugify
 from django.utils.timezone import now
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import ListView, DetailView
 
 from taggit.models import Tag, TaggedItem
 
 from .models import Article, ArticleTranslation
+from .canonical import canonical_key
+from .text import text_columns
+from . import search, changelog, digest, digest_cache, exports, facets, jobs, listing, page_cache, routers
+from .lang import SUPPORTED, get_lang
+from .pagination import KeysetPaginator
 
 from io import BytesIO
 
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse
 from django.shortcuts import render
 from django.utils import timezone
-from django.utils.html import strip_tags
 from django.db import transaction
 
-from urllib.parse import urlparse, parse_qs
 
 
 # -----------------------------
 # Language helpers
 # -----------------------------
-SUPPORTED_LANGS = {"ja", "zh", "en"}
+SUPPORTED_LANGS = set(SUPPORTED)
 
 def _get_lang(request):
-    """Get session language; default ja."""
-    lang = request.session.get("lang", "ja")
-    return lang if lang in SUPPORTED_LANGS else "ja"
+    """?lang= / signed cookie language (see article/lang.py); default ja."""
+    return get_lang(request)
 
 
 # -----------------------------
 # Article views
 # -----------------------------
+@method_decorator(page_cache.cached_page, name="get")
 class ArticleDetailView(DetailView):
     model = Article
     template_name = 'article/article_detail.html'
     context_object_name = 'article'
 
+    def _publish_date(self):
+        try:
+            return date(self.kwargs["year"], self.kwargs["month"], self.kwargs["day"])
+        except (KeyError, ValueError):
+            raise Http404("No article found matching the query")
+
     def get_object(self, queryset=None):
-        # Support URLs with year/month/day/slug
-        year = self.kwargs.get("year")
-        month = self.kwargs.get("month")
-        day = self.kwargs.get("day")
-        slug = self.kwargs.get("slug")
-        if year and month and day and slug:
-            return get_object_or_404(
-                Article,
-                publish__year=year,
-                publish__month=month,
-                publish__day=day,
-                slug=slug
+        # exact (publish, slug) match: served by the unique_slug_per_publish_date index.
+        # Translation + tag names/slugs come back in the same query.
+        lang = _get_lang(self.request)
+        ct = ContentType.objects.get_for_model(Article)
+        queryset = Article.objects.filter(
+            publish=self._publish_date(), slug=self.kwargs["slug"]
+        ).annotate(
+            tag_names=ArraySubquery(
+                TaggedItem.objects.filter(content_type=ct, object_id=OuterRef("pk"))
+                .order_by("tag__name").values("tag__name")
+            ),
+            tag_slugs=ArraySubquery(
+                TaggedItem.objects.filter(content_type=ct, object_id=OuterRef("pk")).values("tag__slug")
+            ),
+        )
+        if lang != "ja":
+            queryset = queryset.annotate(
+                tr=FilteredRelation("translations", condition=Q(translations__language=lang)),
+                tr_id=F("tr__id"),
+                tr_title=F("tr__title_translated"),
+                tr_text=F("tr__text_translated"),
             )
-        return super().get_object(queryset)
+        obj = queryset.first()
+        if obj is None:
+            raise Http404("No article found matching the query")
+        page_cache.add_keys(
+            self.request, page_cache.article_key(obj.id), page_cache.date_key(obj.publish),
+            *map(page_cache.tag_key, obj.tag_slugs),
+        )
+        return obj
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -72,123 +103,150 @@ class ArticleDetailView(DetailView):
 
         display_title = article.title
         display_body = article.text
+        translation_pending = False
 
         if lang != "ja":
-            tr = ArticleTranslation.objects.filter(article=article, language=lang).first()
-            if not tr and request.user.is_authenticated and request.user.is_staff:
-                # Staff-only auto-translation
-                try:
-                    t_title, t_body = translate_title_body(article.title, article.text, lang)
-                    tr = ArticleTranslation.objects.create(
-                        article=article,
-                        language=lang,
-                        title_translated=t_title,
-                        text_translated=t_body
-                    )
-                except Exception:
-                    tr = None
-            if tr:
-                display_title = tr.title_translated or display_title
-                display_body = tr.text_translated or display_body
+            has_tr = article.tr_id is not None
+            if not has_tr and request.user.is_authenticated and request.user.is_staff:
+                # Staff-only auto-translation: queue it for run_translation_jobs
+                # and show the source text until the worker is done.
+                job = jobs.enqueue_translation(article, lang)
+                translation_pending = job.is_pending
+            if has_tr:
+                display_title = article.tr_title or display_title
+                display_body = article.tr_text or display_body
 
         ctx.update({
             "lang": lang,
             "display_title": display_title,
             "display_body": display_body,
+            "translation_pending": translation_pending,
+            "tag_names": article.tag_names,
         })
         return ctx
 
 
+def filter_articles(queryset, params):
+    """The list page filters (?q= / ?tag= / ?period=), shared with the JSON API."""
+    # 🔍 search (ranked, uses the GIN index; see article/search.py)
+    query = params.get('q')
+    if query:
+        queryset = search.search_articles(queryset, query)
+
+    # tag filter
+    tag_slug = params.get('tag')
+    if tag_slug:
+        queryset = queryset.filter(tags__slug=tag_slug)
+
+    # date filters
+    period = params.get('period')
+    today = now().date()
+    if period == 'today':
+        queryset = queryset.filter(publish=today)
+    elif period == '7days':
+        queryset = queryset.filter(publish__gte=today - timedelta(days=7))
+    elif period == 'month':
+        queryset = queryset.filter(publish__year=today.year, publish__month=today.month)
+    elif period == 'year':
+        queryset = queryset.filter(publish__year=today.year)
+
+    return queryset
+
+
+@method_decorator(page_cache.cached_page, name="get")
 class ArticleListView(ListView):
     model = Article
     paginate_by = 15
     template_name = 'article/article_list.html'
     context_object_name = 'articles'
+    # "keyset": ?cursor= tokens, no COUNT/OFFSET (see article/pagination.py); "offset": ?page=N
+    pagination_mode = getattr(settings, 'ARTICLE_LIST_PAGINATION', 'keyset')
 
     def get_queryset(self):
-        queryset = Article.objects.all().select_related('user').prefetch_related('tags')
-
-        # 🔍 search
-        query = self.request.GET.get('q')
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) | Q(text__icontains=query)
-            )
+        # titles only: bodies stay in the DB; user/tags aren't shown on the list
+        queryset = Article.objects.listing().select_related('listing')
+        return filter_articles(queryset, self.request.GET)
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+        ordering = ['-publish', '-created']
+        if 'rank' in queryset.query.annotations:
+            ordering.insert(0, '-rank')
+        paginator = KeysetPaginator(queryset, page_size, ordering)
+        page = paginator.page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def _estimated_count(self, sidebar):
+        """Result count when the cached facets already know it (no query/tag+period combos)."""
+        GET = self.request.GET
+        tag, period = GET.get('tag'), GET.get('period') or ''
+        if GET.get('q') or (tag and period):
+            return None
+        if tag:
+            return next((t['article_count'] for t in sidebar['tags'] if t['slug'] == tag), 0)
+        return next((count for code, _, count in sidebar['periods'] if code == period), None)
 
-        # tag filter
-        tag_slug = self.request.GET.get('tag')
-        if tag_slug:
-            queryset = queryset.filter(tags__slug=tag_slug)
-
-        # date filters
-        period = self.request.GET.get('period')
-        today = now().date()
-        if period == 'today':
-            queryset = queryset.filter(publish__date=today)
-        elif period == '7days':
-            queryset = queryset.filter(publish__gte=today - timedelta(days=7))
-        elif period == 'month':
-            queryset = queryset.filter(publish__year=today.year, publish__month=today.month)
-        elif period == 'year':
-            queryset = queryset.filter(publish__year=today.year)
-
-        return queryset
+    def _cursor_url(self, cursor):
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        params['cursor'] = cursor
+        return '?' + params.urlencode()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         request = self.request
         lang = _get_lang(request)
-        today = now().date()
-        content_type = ContentType.objects.get_for_model(Article)
-
-        # only tags linked to Article
-        tag_ids = TaggedItem.objects.filter(
-            content_type=content_type
-        ).values_list('tag_id', flat=True)
 
-        tag_list = Tag.objects.filter(id__in=tag_ids).annotate(
-            article_count=Count('taggit_taggeditem_items')
-        )
-        context['tag_list'] = tag_list
-
-        # sidebar date filters
-        context['publish_filters'] = [
-            ('',     '- Any time', Article.objects.count()),
-            ('7days','- Past 7 days', Article.objects.filter(publish__gte=today - timedelta(days=7)).count()),
-            ('month','- This month',     Article.objects.filter(publish__year=today.year, publish__month=today.month).count()),
-            ('year', '- This year',     Article.objects.filter(publish__year=today.year).count()),
-        ]
+        # sidebar: tag counts + date filters, one cache read (see article/facets.py)
+        sidebar = facets.get_facets()
+        context['tag_list'] = sidebar['tags']
+        context['publish_filters'] = sidebar['periods']
+
+        if self.pagination_mode == 'keyset':
+            page_obj = context['page_obj']
+            first = request.GET.copy()
+            first.pop('cursor', None)
+            context['cursor_mode'] = True
+            context['first_url'] = '?' + first.urlencode()
+            context['next_url'] = page_obj.next_cursor and self._cursor_url(page_obj.next_cursor)
+            context['prev_url'] = page_obj.prev_cursor and self._cursor_url(page_obj.prev_cursor)
+            context['result_count'] = self._estimated_count(sidebar)
 
         context['selected_tag'] = request.GET.get('tag')
         context['selected_period'] = request.GET.get('period')
         context['lang'] = lang
 
-        # attach translated titles for list
-        page_obj = context.get("page_obj")
-        if page_obj and lang != "ja":
-            ids = [a.id for a in page_obj.object_list]
-            tr_map = {
-                t.article_id: t
-                for t in ArticleTranslation.objects.filter(article_id__in=ids, language=lang)
-            }
-            for a in page_obj.object_list:
-                tr = tr_map.get(a.id)
-                a.display_title = tr.title_translated if tr else a.title
-        else:
-            for a in context.get("page_obj", []).object_list:
-                a.display_title = a.title
+        # translated titles come from the ArticleListing read model (joined above)
+        for a in context["page_obj"].object_list:
+            row = getattr(a, "listing", None)
+            a.display_title = row.title_for(lang) if row else a.title
+
+        page_cache.add_keys(request, page_cache.LIST, *(
+            page_cache.article_key(a.id) for a in context["page_obj"].object_list
+        ))
+        if context['selected_tag']:
+            page_cache.add_keys(request, page_cache.tag_key(context['selected_tag']))
 
         return context
 
 
 
+# -----------------------------
+# Ingest (async: under ASGI a burst of clipper posts waits on sockets and the
+# DB without holding a worker thread each; see gunicorn.conf.py)
+# -----------------------------
+INGEST_INLINE_JSON_BYTES = 64 * 1024   # larger bodies are parsed in a worker thread
+
+
 @csrf_exempt  # Needed for cross-origin form posts
-def receive_article(request):
+async def receive_article(request):
     if request.method != 'POST':
         return JsonResponse({"error": "Only POST allowed"}, status=405)
+    routers.pin_primary()  # dedup lookups must see rows written a moment ago (article/routers.py)
 
     try:
-        data = json.loads(request.body)
+        data = await _aload_json(request.body)
         title   = data.get('title') or ''
         text    = data.get('text') or ''
         url     = data.get('url') or ''
@@ -200,7 +258,7 @@ def receive_article(request):
             return HttpResponseBadRequest("Invalid token.")
 
         User = get_user_model()
-        user = User.objects.get(id=1)
+        user = await User.objects.aget(id=1)
 
         slug = slugify(title, allow_unicode=True)
         try:
@@ -208,27 +266,34 @@ def receive_article(request):
         except Exception:
             publish_dt = now()
 
-        # Try to find by slug OR url
-        article = Article.objects.filter(Q(slug=slug) | Q(url=url)).first()
+        # Dedup on the indexed canonical key derived from the url;
+        # without a url, on (slug, publish) which is unique anyway.
+        key = canonical_key(url)
+        publish_date = Article._meta.get_field("publish").to_python(publish_dt)
+        same = Q(canonical_key=key) if key else Q(slug=slug, publish=publish_date)
+        article = await Article.objects.listing().filter(same).afirst()
         created = False
 
         if not article:
-            with transaction.atomic():
-                # Re-check in case of race
-                article = Article.objects.filter(Q(slug=slug) | Q(url=url)).select_for_update().first()
-                if not article:
-                    article = Article.objects.create(
-                        title=title,
-                        slug=slug,
-                        url=url,
-                        text=text,
-                        publish=publish_dt,
-                        user=user,
-                    )
-                    created = True
-
+            try:
+                article = await sync_to_async(_create_article)(
+                    title=title, slug=slug, url=url, text=text, publish=publish_dt, user=user,
+                )
+                created = True
+            except IntegrityError:
+                # concurrent ingest of the same article, or same title on the same day
+                article = await Article.objects.listing().filter(same | Q(slug=slug, publish=publish_date)).afirst()
+                if article is None:
+                    raise
+
+        new_tag = False
         if tag:
-            article.tags.add(tag)
+            ct = await sync_to_async(ContentType.objects.get_for_model)(Article)
+            new_tag = not await TaggedItem.objects.filter(content_type=ct, tag__name=tag).aexists()
+            await sync_to_async(article.tags.add)(tag)
+
+        if created or tag:
+            await sync_to_async(_invalidate_after_ingest)(article.publish, new_tag)
 
         return JsonResponse(
             {"message": "Article ready", "article_id": article.id, "created": created},
@@ -238,8 +303,230 @@ def receive_article(request):
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
 
+async def _aload_json(body: bytes):
+    """json.loads, off the event loop for large bodies (translations are whole HTML pages)."""
+    if len(body) < INGEST_INLINE_JSON_BYTES:
+        return json.loads(body)
+    return await sync_to_async(json.loads, thread_sensitive=False)(body)
+
+
+def _create_article(**fields):
+    with transaction.atomic():
+        article = Article.objects.create(**fields)
+        search.index_article(article)
+    return article
+
+
+def _invalidate_after_ingest(publish, new_tag):
+    digest_cache.invalidate(publish, new_tag=new_tag)
+    facets.invalidate()
+    if new_tag:
+        page_cache.purge(page_cache.WEEKLY)   # a new section on every weekly page
+
+
+def _read_batch(request):
+    """
+    Items of a batch ingest body: a JSON array, {"articles": [...]} or
+    NDJSON (one JSON object per line). Returns (items, top-level token).
+    """
+    body = request.body.decode("utf-8")
+    if request.content_type not in ("application/x-ndjson", "application/jsonl"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            pass  # not a single JSON document -> try NDJSON
+        else:
+            if isinstance(data, dict):
+                return data.get("articles") or [], data.get("secret_token")
+            return data, None
+    return [json.loads(line) for line in body.splitlines() if line.strip()], None
+
+
 @csrf_exempt
-def receive_translation(request):
+async def receive_articles(request):
+    """
+    Batch version of receive_article for the clipper's backlog pushes.
+
+    Body: JSON array / {"articles": [...], "secret_token": ...} / NDJSON of
+    receive_article payloads. The token may be given once at the top level,
+    in an X-Secret-Token header, or per item.
+
+    Items are deduped within the batch (same canonical key or slug+date ->
+    one article, tags merged), existing rows are resolved with one lookup, new
+    ones inserted with bulk_create and tags attached with one TaggedItem
+    bulk insert. Response: per-item {"index", "status", "article_id"}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+    routers.pin_primary()
+
+    try:
+        items, token = await sync_to_async(_read_batch, thread_sensitive=False)(request)
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({"status": "error", "message": f"invalid body: {e}"}, status=400)
+    if not isinstance(items, list):
+        return HttpResponseBadRequest("Expected a list of articles.")
+    token = request.headers.get("X-Secret-Token") or token
+    # the dedupe + bulk insert + tag attach run in one transaction: one sync call
+    return await sync_to_async(_ingest_batch)(items, token)
+
+
+def _ingest_batch(items, token):
+    User = get_user_model()
+    user = User.objects.get(id=1)
+
+    results = [None] * len(items)
+    entries = []           # unique articles of this batch: dicts with title/slug/url/...
+    by_key, by_slug = {}, {}
+    for i, data in enumerate(items):
+        if not isinstance(data, dict):
+            results[i] = {"index": i, "status": "error", "message": "item must be an object"}
+            continue
+        if (token or data.get("secret_token")) != settings.ARTICLE_SECRET_TOKEN:
+            results[i] = {"index": i, "status": "error", "message": "Invalid token."}
+            continue
+
+        title = data.get('title') or ''
+        url = data.get('url') or ''
+        slug = slugify(title, allow_unicode=True)
+        tag = data.get('tag') or ''
+        key = canonical_key(url)
+        try:
+            publish_dt = parse_japanese_date(data.get('publish') or '')
+        except Exception:
+            publish_dt = now()
+        publish_date = Article._meta.get_field("publish").to_python(publish_dt)
+
+        # dedupe inside the batch on canonical key, or (slug, publish) like the DB does
+        entry = (by_key.get(key) if key else None) or by_slug.get((slug, publish_date))
+        if entry is None:
+            entry = {
+                "title": title, "slug": slug, "url": url, "key": key, "text": data.get('text') or '',
+                "publish": publish_date, "tags": set(), "indexes": [], "article": None,
+            }
+            entries.append(entry)
+            by_slug.setdefault((slug, publish_date), entry)
+            if key:
+                by_key.setdefault(key, entry)
+        else:
+            results[i] = {"index": i, "status": "duplicate"}
+        if tag:
+            entry["tags"].add(tag)
+        entry["indexes"].append(i)
+
+    if entries:
+        for attempt in (1, 2):
+            try:
+                with transaction.atomic():
+                    _resolve_and_insert(entries, user)
+                    new_tags = _attach_tags(entries)
+                    changelog.record("tags", "update", [
+                        (e["article"].id, e["article"].id) for e in entries if not e["created"] and e["tags"]
+                    ])
+                break
+            except IntegrityError:
+                # a concurrent ingest inserted one of our slugs: resolve again
+                if attempt == 2:
+                    raise
+
+        if new_tags:
+            digest_cache.invalidate(new_tag=True)
+        else:
+            for d in {e["publish"] for e in entries if e["created"] or e["tags"]}:
+                digest_cache.invalidate(d)
+        facets.invalidate()
+        # existing articles may have gained tags (bulk insert: no m2m signals)
+        retagged = [e["article"].id for e in entries if not e["created"] and e["tags"]]
+        page_cache.purge(
+            page_cache.LIST,
+            new_tags and page_cache.WEEKLY,
+            *(page_cache.date_key(e["publish"]) for e in entries if e["created"] or e["tags"]),
+            *(page_cache.article_key(i) for i in retagged),
+        )
+        if retagged:
+            Article.objects.filter(id__in=retagged).update(updated=now())
+
+        for entry in entries:
+            first, *dups = entry["indexes"]
+            results[first] = {
+                "index": first,
+                "status": "created" if entry["created"] else "updated",
+                "article_id": entry["article"].id,
+            }
+            for i in dups:
+                results[i]["article_id"] = entry["article"].id
+
+    created = sum(1 for e in entries if e["created"])
+    return JsonResponse({
+        "message": f"{len(items)} items, {created} created",
+        "created": created,
+        "results": results,
+    })
+
+
+def _resolve_and_insert(entries, user):
+    """Match entries to existing articles (one query), bulk-insert the rest."""
+    keys = {e["key"] for e in entries if e["key"]}
+    slugs = {e["slug"] for e in entries}
+    dates = {e["publish"] for e in entries}
+    existing = Article.objects.filter(
+        Q(canonical_key__in=keys) | Q(slug__in=slugs, publish__in=dates)
+    ).only("id", "slug", "canonical_key", "publish")
+    ex_key, ex_slug = {}, {}
+    for a in existing:
+        ex_slug[(a.slug, a.publish)] = a
+        if a.canonical_key:
+            ex_key[a.canonical_key] = a
+
+    to_create = []
+    for e in entries:
+        a = (ex_key.get(e["key"]) if e["key"] else None) or ex_slug.get((e["slug"], e["publish"]))
+        e["created"] = a is None
+        if a is None:
+            a = Article(
+                title=e["title"], slug=e["slug"], url=e["url"], canonical_key=e["key"],
+                text=e["text"], **text_columns(e["text"]), publish=e["publish"], user=user,
+                search_vector=search.article_vector(e["title"], e["text"]),
+            )
+            to_create.append(a)
+        else:
+            e["publish"] = a.publish
+        e["article"] = a
+
+    if to_create:
+        Article.objects.bulk_create(to_create)
+        for a in to_create:
+            a.search_vector = None  # written by the INSERT; drop the expression
+        listing.create_for(to_create)  # bulk_create sends no post_save
+        changelog.record("article", "insert", [(a.id, a.id) for a in to_create])
+
+
+def _attach_tags(entries) -> set[str]:
+    """Attach all tags with one TaggedItem bulk insert; returns names new to Article."""
+    names = set().union(*(e["tags"] for e in entries))
+    if not names:
+        return set()
+    ct = ContentType.objects.get_for_model(Article)
+    used = set(
+        TaggedItem.objects.filter(content_type=ct, tag__name__in=names)
+        .values_list("tag__name", flat=True).distinct()
+    )
+    tags = {t.name: t for t in Tag.objects.filter(name__in=names)}
+    for name in names - tags.keys():
+        tags[name], _ = Tag.objects.get_or_create(name=name)  # save() builds a unique slug
+
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(content_type=ct, object_id=e["article"].id, tag=tags[name])
+            for e in entries for name in e["tags"]
+        ],
+        ignore_conflicts=True,
+    )
+    return names - used
+
+
+@csrf_exempt
+async def receive_translation(request):
     """
     Body: {article_id: int, language: 'en'|'zh', html: '<div id="engDiffBox">...</div>', secret_token: '...'}
     Stores:
@@ -248,9 +535,10 @@ def receive_translation(request):
     """
     if request.method != 'POST':
         return JsonResponse({"error": "Only POST allowed"}, status=405)
+    routers.pin_primary()
 
     try:
-        data = json.loads(request.body)
+        data = await _aload_json(request.body)
         token      = data.get('secret_token')
         article_id = int(data.get('article_id'))
         language   = (data.get('language') or '').lower()
@@ -263,15 +551,16 @@ def receive_translation(request):
         if not html:
             return HttpResponseBadRequest("html required.")
 
-        article = Article.objects.get(id=article_id)
+        article = await Article.objects.listing().aget(id=article_id)
 
-        obj, created = ArticleTranslation.objects.update_or_create(
+        obj, created = await ArticleTranslation.objects.aupdate_or_create(
             article=article, language=language,
             defaults=dict(
                 # title_translated = None,
                 text_translated  = html,  # store raw outerHTML
             )
         )
+        await sync_to_async(search.index_translation)(obj)
         return JsonResponse(
             {"message": f"translation {language} saved", "article_id": article.id, "created": created},
             status=201 if created else 200
@@ -301,232 +590,18 @@ def parse_japanese_date(date_str):
 
     return now()
 
-# added for weekly news export
-EXCLUDED_TAGS = {"unknown", "unknow"}   # case-insensitive
-EXCERPT_CHARS = 180                     # JA excerpt length (~90 English words)
-
-# --- Helpers ---
-def excerpt_ja(text: str, n_chars: int = EXCERPT_CHARS) -> str:
-    """Simple JA excerpt by characters; strips HTML & collapses whitespace."""
-    s = strip_tags(text or "")
-    s = " ".join(s.split())  # collapse all whitespace/newlines/tabs
-    return s[:n_chars] + (" …" if len(s) > n_chars else "")
-
-def clean_title(title: str) -> str:
-    """Collapse whitespace so titles never include newlines/tabs."""
-    return " ".join((title or "").split())
-
-def derive_nikkei_translation_urls(url: str):
-    """
-    Build Nikkei translation URLs from the original article URL.
-    Returns (en_url, zh_url) or (None, None) if not recognized.
-    """
-    if not url:
-        return (None, None)
-    try:
-        u = urlparse(url)
-    except Exception:
-        return (None, None)
-
-    if not u.netloc.endswith("nikkei.com"):
-        return (None, None)
-
-    # 1) from query ?ng=ID (already a translation link or similar)
-    qs = parse_qs(u.query or "")
-    article_id = qs.get("ng", [None])[0]
-
-    # 2) from path /article/<ID>/
-    if not article_id:
-        m = re.search(r"/article/([A-Z0-9]+)/?", u.path or "")
-        if m:
-            article_id = m.group(1)
-
-    # 3) last fallback: look for DGXZ*-style ID anywhere
-    if not article_id:
-        m = re.search(r"(DGXZ[A-Z0-9]+)", url)
-        if m:
-            article_id = m.group(1)
-
-    if not article_id:
-        return (None, None)
-
-    base = f"https://www.nikkei.com/news/article-translation/?ng={article_id}"
-    en = base
-    zh = base + "&mta=c"
-    return (en, zh)
-
-def add_hyperlink(paragraph, url: str, text: str | None = None):
-    """Insert a clickable hyperlink into a python-docx paragraph."""
-    if not url:
-        return
-    from docx.oxml.shared import OxmlElement, qn
-    from docx.opc.constants import RELATIONSHIP_TYPE
-
-    if text is None:
-        text = url
-
-    part = paragraph.part
-    r_id = part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
-
-    hyperlink = OxmlElement("w:hyperlink")
-    hyperlink.set(qn("r:id"), r_id)
-
-    run = OxmlElement("w:r")
-    rPr = OxmlElement("w:rPr")
-
-    # underline + blue
-    u = OxmlElement("w:u"); u.set(qn("w:val"), "single"); rPr.append(u)
-    color = OxmlElement("w:color"); color.set(qn("w:val"), "0000FF"); rPr.append(color)
-
-    run.append(rPr)
-    t = OxmlElement("w:t"); t.text = text
-    run.append(t)
-    hyperlink.append(run)
-
-    paragraph._p.append(hyperlink)
-
-def format_jp_range(start, end) -> str:
-    """Format date range like '2025年7月21日～27日' (handles cross-month/year)."""
-    if start.year == end.year:
-        if start.month == end.month:
-            return f"{start.year}年{start.month}月{start.day}日～{end.day}日"
-        return f"{start.year}年{start.month}月{start.day}日～{end.month}月{end.day}日"
-    return f"{start.year}年{start.month}月{start.day}日～{end.year}年{end.month}月{end.day}日"
+WEEKLY_EXPORT_MAX_ROWS = getattr(settings, "WEEKLY_EXPORT_MAX_ROWS", 5000)
+WEEKLY_EXPORT_CACHE_MAX_BYTES = 2 * 1024 * 1024   # larger exports aren't worth cache space
+WEEKLY_PAGE_CACHE_MAX_DAYS = 31
 
 
-# def weekly_news(request):
-    """
-    8-day JA weekly view:
-      (1) list all tags for article.Article (sorted, excluding 'unknown'/'unknow'),
-      (2) for each tag, fetch past-8-days JA news newest-first, or '今週主要なニュースなし',
-      (3) HTML view and matching DOCX export (with clickable original / EN / ZH links).
-    """
-    # ---- Window: past 8 days including today ----
-    today = timezone.localdate()
-    start_date = today - timedelta(days=7)
-
-    # ---- All tags for this content type (sorted by name), excluding unknown/unknow ----
-    ct = ContentType.objects.get_for_model(Article)
-    all_tags = (
-        Tag.objects.filter(taggit_taggeditem_items__content_type=ct)
-        .distinct()
-    )
-
-    def keep_tag(t: Tag) -> bool:
-        return (t.name or "").strip().casefold() not in EXCLUDED_TAGS
-
-    tags_sorted = sorted(
-        (t for t in all_tags if keep_tag(t)),
-        key=lambda t: (t.name or "").strip().casefold()
-    )
-
-    # ---- Build grouped data: one section per tag ----
-    grouped = []  # list of dicts: {"tag_name": str, "articles": [Article]}
-    for tag in tags_sorted:
-        qs = (
-            Article.objects
-            .filter(
-                language="ja",
-                publish__range=(start_date, today),
-                tags__in=[tag],
-            )
-            .order_by("-publish", "-created")
-            .distinct()
-        )
-        arts = list(qs)
-
-        # annotate each article
-        for a in arts:
-            a.display_title = clean_title(a.title)
-            a.snippet = excerpt_ja(a.text)
-            a.url_en, a.url_zh = derive_nikkei_translation_urls(a.url)
-
-        grouped.append({"tag_name": tag.name, "articles": arts})
-
-    # ---- DOCX export ----
-    if request.GET.get("export") == "docx":
-        from docx import Document
-        from docx.shared import Pt  # <- for tight paragraph spacing
-
-        doc = Document()
-
-        # 3-line bold header with correct dates
-        date_line = format_jp_range(start_date, today)
-        for line in ("CP提携先企業動向まとめ", date_line, "日本正大光明 投資部"):
-            p = doc.add_paragraph()
-            p.add_run(line).bold = True
-
-        for section in grouped:
-            tag_name = section["tag_name"]
-            arts = section["articles"]
-
-            doc.add_heading(tag_name, level=2)
-
-            if not arts:
-                doc.add_paragraph("今週主要なニュースなし")
-                continue
-
-            for a in arts:
-                # date (bold) + NEW line + title (bold)
-                p = doc.add_paragraph()
-                r1 = p.add_run(a.publish.strftime("%Y-%m-%d"))
-                r1.add_break()
-                p.add_run(a.display_title).bold = True
-                p.paragraph_format.space_after = Pt(3)   #
-                # excerpt with no extra spacing after
-                if a.snippet:
-                    p_snip = doc.add_paragraph(a.snippet)
-                    p_snip.paragraph_format.space_after = Pt(0)   # ↓ tighten gap to next line
-
-                # ONE LINE: 原文 (English translation / 中訳)
-                if a.url or a.url_en or a.url_zh:
-                    p_links = doc.add_paragraph()
-                    fmt = p_links.paragraph_format
-                    fmt.space_before = Pt(0)  # no extra gap above
-                    fmt.space_after = Pt(0)   # no extra gap below
-
-                    first = True
-                    if a.url:
-                        add_hyperlink(p_links, a.url, "原文")
-                        first = False
-
-                    # only add parentheses if we have at least one translation link
-                    if a.url_en or a.url_zh:
-                        p_links.add_run(" (")
-                        wrote_any = False
-                        if a.url_en:
-                            add_hyperlink(p_links, a.url_en, "English translation")
-                            wrote_any = True
-                        if a.url_zh:
-                            if wrote_any:
-                                p_links.add_run(" / ")
-                            add_hyperlink(p_links, a.url_zh, "中訳")
-                        p_links.add_run(")")
-                    p_links.paragraph_format.space_after = Pt(10)  # small gap after links
-
-        buf = BytesIO()
-        doc.save(buf); buf.seek(0)
-        filename = f"weekly_news_ja_{today.strftime('%Y%m%d')}.docx"
-        resp = HttpResponse(
-            buf.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        )
-        resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return resp
-
-    # ---- HTML render ----
-    return render(request, "article/weekly_news.html", {
-        "grouped": grouped,          # list of {"tag_name": str, "articles": [Article]}
-        "start_date": start_date,
-        "end_date": today,
-    })
-    
+@page_cache.cached_page(unless=lambda request: "export" in request.GET)
 def weekly_news(request):
     """
     8-day JA weekly view (now with optional date window):
       (1) list all tags for article.Article (sorted, excluding 'unknown'/'unknow'),
       (2) for each tag, fetch news within [start_date, end_date] newest-first, or '今週主要なニュースなし',
-      (3) HTML view and matching DOCX export (with clickable original / EN / ZH links).
+      (3) HTML view and matching exports (?export=md|csv|json|eml|docx, see article/exports.py).
 
     Optional query params:
       - ?start=YYYY-MM-DD
@@ -565,118 +640,59 @@ def weekly_news(request):
     if start_date > end_date:
         start_date, end_date = end_date, start_date
 
-    # ---- All tags for this content type (sorted by name), excluding unknown/unknow ----
-    ct = ContentType.objects.get_for_model(Article)
-    all_tags = (
-        Tag.objects.filter(taggit_taggeditem_items__content_type=ct)
-        .distinct()
-    )
-
-    def keep_tag(t: Tag) -> bool:
-        return (t.name or "").strip().casefold() not in EXCLUDED_TAGS
-
-    tags_sorted = sorted(
-        (t for t in all_tags if keep_tag(t)),
-        key=lambda t: (t.name or "").strip().casefold()
+    # ---- Exports: ?export=md|csv|json|eml|docx (see article/exports.py) ----
+    fmt = request.GET.get("export")
+    if fmt:
+        renderer = exports.RENDERERS.get(fmt)
+        if renderer is None:
+            return HttpResponseBadRequest(f"Unknown export format: {fmt}")
+        filename = f"weekly_news_ja_{end_date.strftime('%Y%m%d')}.{renderer.extension}"
+
+        def respond(content, size=None):
+            if isinstance(request, ASGIRequest) and not isinstance(content, BytesIO):
+                # ASGI reads a sync body whole before sending its first byte
+                content = exports.aiter_chunks(content)
+            response = FileResponse(content, content_type=renderer.content_type)
+            # FileResponse only derives these for file objects, not for iterators
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+            if size is not None:
+                response["Content-Length"] = size
+            return response
+
+        data = digest_cache.get(start_date, end_date, fmt)
+        if data is not None:
+            return respond(BytesIO(data))
+        # rows streamed from a DB cursor; text formats are rendered while the
+        # response is being sent, section by section
+        sections = digest.iter_sections(start_date, end_date, limit=WEEKLY_EXPORT_MAX_ROWS)
+        content = renderer.render(sections, start_date, end_date)
+        if hasattr(content, "read"):
+            # file renderers (DOCX) have finished already: keep small results
+            size = content.seek(0, 2)
+            content.seek(0)
+            if size <= WEEKLY_EXPORT_CACHE_MAX_BYTES:
+                data = content.read()
+                content.close()
+                digest_cache.set(start_date, end_date, fmt, data)
+                return respond(BytesIO(data))
+            return respond(content, size)
+        return respond(content)
+
+    grouped = digest_cache.get_or_build(
+        start_date, end_date, "sections",
+        lambda: digest.build_sections(start_date, end_date),
     )
 
-    # ---- Build grouped data: one section per tag ----
-    grouped = []  # list of dicts: {"tag_name": str, "articles": [Article]}
-    for tag in tags_sorted:
-        qs = (
-            Article.objects
-            .filter(
-                language="ja",
-                publish__range=(start_date, end_date),
-                tags__in=[tag],
-            )
-            .order_by("-publish", "-created")
-            .distinct()
-        )
-        arts = list(qs)
-
-        # annotate each article
-        for a in arts:
-            a.display_title = clean_title(a.title)
-            a.snippet = excerpt_ja(a.text)
-            a.url_en, a.url_zh = derive_nikkei_translation_urls(a.url)
-
-        grouped.append({"tag_name": tag.name, "articles": arts})
-
-    # ---- DOCX export ----
-    if request.GET.get("export") == "docx":
-        from docx import Document
-        from docx.shared import Pt  # <- for tight paragraph spacing
-        from io import BytesIO
-        from django.http import HttpResponse
-
-        doc = Document()
-
-        # 3-line bold header with selected dates
-        date_line = format_jp_range(start_date, end_date)
-        for line in ("CP提携先企業動向まとめ", date_line, "日本正大光明 投資部"):
-            p = doc.add_paragraph()
-            p.add_run(line).bold = True
-
-        for section in grouped:
-            tag_name = section["tag_name"]
-            arts = section["articles"]
-
-            doc.add_heading(tag_name, level=2)
-
-            if not arts:
-                doc.add_paragraph("今週主要なニュースなし")
-                continue
-
-            for a in arts:
-                # date (bold) + NEW line + title (bold)
-                p = doc.add_paragraph()
-                r1 = p.add_run(a.publish.strftime("%Y-%m-%d"))
-                r1.add_break()
-                p.add_run(a.display_title).bold = True
-                p.paragraph_format.space_after = Pt(3)
-                # excerpt with no extra spacing after
-                if a.snippet:
-                    p_snip = doc.add_paragraph(a.snippet)
-                    p_snip.paragraph_format.space_after = Pt(0)
-
-                # ONE LINE: 原文 (English translation / 中訳)
-                if a.url or a.url_en or a.url_zh:
-                    p_links = doc.add_paragraph()
-                    fmt = p_links.paragraph_format
-                    fmt.space_before = Pt(0)
-                    fmt.space_after = Pt(0)
-
-                    first = True
-                    if a.url:
-                        add_hyperlink(p_links, a.url, "原文")
-                        first = False
-
-                    if a.url_en or a.url_zh:
-                        p_links.add_run(" (")
-                        wrote_any = False
-                        if a.url_en:
-                            add_hyperlink(p_links, a.url_en, "English translation")
-                            wrote_any = True
-                        if a.url_zh:
-                            if wrote_any:
-                                p_links.add_run(" / ")
-                            add_hyperlink(p_links, a.url_zh, "中訳")
-                        p_links.add_run(")")
-                    p_links.paragraph_format.space_after = Pt(10)
-
-        buf = BytesIO()
-        doc.save(buf); buf.seek(0)
-        filename = f"weekly_news_ja_{end_date.strftime('%Y%m%d')}.docx"
-        resp = HttpResponse(
-            buf.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        )
-        resp["Content-Disposition"] = f'attachment; filename=\"{filename}\"'
-        return resp
     # ---- HTML render ----
+    days = (end_date - start_date).days + 1
+    if days <= WEEKLY_PAGE_CACHE_MAX_DAYS:
+        page_cache.add_keys(request, page_cache.WEEKLY, *(
+            page_cache.date_key(start_date + timedelta(days=i)) for i in range(days)
+        ))
+    else:
+        page_cache.skip(request)   # one purge key per day: long custom windows aren't worth it
     return render(request, "article/weekly_news.html", {
-        "grouped": grouped,          # list of {"tag_name": str, "articles": [Article]}
+        "grouped": grouped,          # list of digest.DigestSection
         "start_date": start_date,
         "end_date": today,
-    })
\ No newline at end of file
+    })
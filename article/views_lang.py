@@ -2,13 +2,14 @@
 from django.shortcuts import redirect
 from django.http import HttpRequest
 
-SUPPORTED = {"ja", "zh", "en"}
+from . import lang as languages
+
+SUPPORTED = set(languages.SUPPORTED)
 
 def set_lang(request: HttpRequest):
-    lang = request.GET.get("lang", "ja")
-    if lang not in SUPPORTED:
-        lang = "ja"
-    request.session["lang"] = lang
+    lang = languages.normalize(request.GET.get("lang")) or languages.DEFAULT
     # go back
     referer = request.META.get("HTTP_REFERER") or "/"
-    return redirect(referer)
\ No newline at end of file
+    response = redirect(referer)
+    languages.set_cookie(response, lang)
+    return response
@@ -10,8 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import copy
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     'corsheaders',
     'article.apps.ArticleConfig',
@@ -46,8 +48,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # must be at the top
+    'article.perf.PerfMiddleware',            # timings/metrics for everything below
 
     'django.middleware.security.SecurityMiddleware',
+    'article.lang.LanguageMiddleware',        # request.lang from ?lang= / cookie; above sessions
+    'article.routers.PrimaryStickinessMiddleware',  # read-your-writes with replicas
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -95,6 +100,84 @@ DATABASES = {
 }
 
 
+# Connections: a psycopg3 pool per worker process, so a request borrows an open
+# connection instead of paying the TCP + auth handshake (DB_POOL=False: one
+# connection per request, or persistent ones with DB_CONN_MAX_AGE).
+# Health checks: the pool tests a connection before lending it; max_lifetime
+# recycles connections so server-side memory and failovers don't stick.
+# Pool stats are exported on /metrics (article/perf.py).
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+if DB_POOL:
+    DATABASES['default']['OPTIONS'] = {'pool': {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10.0, cast=float),              # wait for a free one
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=30 * 60.0, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=5 * 60.0, cast=float),
+    }}
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=0, cast=int)
+
+# Read replicas: hosts sharing the primary's credentials become aliases replica_1, replica_2, ...
+# Writes, transactions and recently-writing clients stay on "default" (see article/routers.py).
+for _i, _host in enumerate(config('POSTGRES_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    DATABASES[f'replica_{_i}'] = {
+        **copy.deepcopy(DATABASES['default']), 'HOST': _host, 'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['article.routers.ReplicaRouter']
+DATABASE_REPLICA_MAX_LAG = config('DATABASE_REPLICA_MAX_LAG', default=5.0, cast=float)   # seconds
+DATABASE_STICKY_SECONDS = config('DATABASE_STICKY_SECONDS', default=5, cast=int)
+
+
+# Cache
+# The weekly digest cache must be shared by all gunicorn workers so that
+# ingest invalidation is seen everywhere -> file-based by default.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'digest': {
+        'BACKEND': config('DIGEST_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('DIGEST_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'digest')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+WEEKLY_DIGEST_CACHE_TIMEOUT = config('WEEKLY_DIGEST_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+# Article rows per weekly DOCX export (bounds worker memory for long ?start=/?end= ranges)
+WEEKLY_EXPORT_MAX_ROWS = config('WEEKLY_EXPORT_MAX_ROWS', default=5000, cast=int)
+FACET_CACHE_TIMEOUT = config('FACET_CACHE_TIMEOUT', default=10 * 60, cast=int)
+ARTICLE_PAGE_CACHE_TIMEOUT = config('ARTICLE_PAGE_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+# anonymous pages: s-maxage for nginx/CDN, and an optional purge-by-Surrogate-Key hook (article/page_cache.py)
+PAGE_CACHE_PROXY_MAX_AGE = config('PAGE_CACHE_PROXY_MAX_AGE', default=60, cast=int)
+PAGE_CACHE_PURGE_HOOK = config('PAGE_CACHE_PURGE_HOOK', default='')    # e.g. article.page_cache.http_purge
+PAGE_CACHE_PURGE_URL = config('PAGE_CACHE_PURGE_URL', default='')
+# Article list paging: 'keyset' (cursor tokens, no COUNT/OFFSET) or 'offset' (?page=N)
+ARTICLE_LIST_PAGINATION = config('ARTICLE_LIST_PAGINATION', default='keyset')
+# api/changes/ re-sends rows this far behind the cursor (writes that committed after a poll read past them)
+API_CHANGES_OVERLAP_SECONDS = config('API_CHANGES_OVERLAP_SECONDS', default=60, cast=int)
+
+
+# Performance instrumentation (article/perf.py)
+SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)
+# log queries slower than this (ms) to the "article.perf.slow_query" logger; 0 = off
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=0, cast=int)
+# per-worker metric snapshots merged by /metrics; '' = only the answering process
+METRICS_DIR = config('METRICS_DIR', default=str(BASE_DIR / 'cache' / 'metrics'))
+# if set, /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+
+# Translation
+# Callable used by the run_translation_jobs worker: (title, body, lang) -> (title, body)
+ARTICLE_TRANSLATOR = config('ARTICLE_TRANSLATOR', default='article.translators.translate_title_body')
+# Translation memory cap (least recently used entries are evicted beyond this)
+TRANSLATION_MEMORY_MAX_ENTRIES = config('TRANSLATION_MEMORY_MAX_ENTRIES', default=200000, cast=int)
+# ...checked every N stored entries per process (0 = only via `manage.py translation_memory --evict`)
+TRANSLATION_MEMORY_EVICT_EVERY = config('TRANSLATION_MEMORY_EVICT_EVERY', default=1000, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
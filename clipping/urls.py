@@ -17,7 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from article import perf
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', perf.metrics_view, name='metrics'),
     path('article/', include('article.urls', namespace='article')),
 ]
@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings for the web container (`gunicorn -c gunicorn.conf.py`).
+
+SERVER_MODE=asgi (default): clipping.asgi under uvicorn workers. The ingest
+views are async, so a burst of clipper posts (translations are whole HTML
+pages) waits on sockets and the database without pinning one worker each,
+and the list/detail pages keep getting served.
+SERVER_MODE=wsgi: the previous setup, sync workers on clipping.wsgi.
+
+Worker count comes from WEB_CONCURRENCY (gunicorn's own variable).
+"""
+import os
+import shutil
+from pathlib import Path
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+if os.getenv("SERVER_MODE", "asgi") == "asgi":
+    wsgi_app = "clipping.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "clipping.wsgi:application"
+
+
+def on_starting(server):
+    # per-worker metric files of the previous run (article/perf.py) would be summed in
+    metrics_dir = os.getenv("METRICS_DIR", str(Path(__file__).resolve().parent / "cache" / "metrics"))
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)